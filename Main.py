@@ -2,8 +2,9 @@ from agents.research_agent import ResearchAgentNodes
 from agents.fin_agent import FinAgentNodes
 from agents.operations_agent import OpsAgentNodes
 from agents.states import MnAagentState
+from agents.resources import get_resource_registry
 from datetime import datetime
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from langgraph.channels.last_value import LastValue
 import os
 import logging 
@@ -12,6 +13,15 @@ from RAG.rag_llama import RAG
 from langchain_core.runnables.graph import CurveStyle, MermaidDrawMethod, NodeStyles
 from agents.legal_agent import MergerLegalAgent
 from agents.report_agent import ReportAgentNodes
+from agents.artifact_agent import ArtifactAgentNodes
+from utils.chat_test import Chat
+from utils.analyzer_utils import timed_node, format_run_summary, format_search_summary, format_scheduler_summary
+from utils.checkpointing import get_checkpointer, run_with_checkpoints
+from utils.node_memo import get_node_memo
+from utils.llm_scheduler import get_scheduler
+import argparse
+import uuid
+from typing import List
 
 # Configure logging
 logging.basicConfig(
@@ -24,214 +34,151 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def create_sequential_workflow(mn_agent_state: MnAagentState):
+def add_timed_node(workflow: StateGraph, name: str, node_fn) -> None:
+    """Register a node that records its timing in its update"""
+    workflow.add_node(name, timed_node(name)(node_fn))
+
+
+def add_company_branch(workflow: StateGraph, company: str, research_agent: ResearchAgentNodes,
+                       fin_agent: FinAgentNodes, ops_agent: OpsAgentNodes,
+                       artifact_agent: ArtifactAgentNodes) -> str:
     """
-    Create a comprehensive workflow for multi-company analysis and merger valuation
+    Add the research -> financial -> operations pipeline for one company
+
+    Nodes return only the fields (and, for dict fields, the company keys) they
+    own, so the two company branches, and the sibling analysis nodes inside
+    each branch, can run in the same supersteps without overwriting each
+    other's fields. The branch first looks the company's
+    document up in the artifact store and skips straight to its end on a hit;
+    a freshly generated analysis is saved there for later deals.
+
+    Returns:
+        str: Name of the branch's last node
     """
-    # Initialize agent nodes for both companies
-    research_agent_a = ResearchAgentNodes(mn_agent_state, 'a', approval=True)
-    fin_agent_a = FinAgentNodes(mn_agent_state, 'a', approval=True)
-    ops_agent_a = OpsAgentNodes(mn_agent_state, 'a', approval=True)
-    
-    research_agent_b = ResearchAgentNodes(mn_agent_state, 'b', approval=True)
-    fin_agent_b = FinAgentNodes(mn_agent_state, 'b', approval=True)
-    ops_agent_b = OpsAgentNodes(mn_agent_state, 'b', approval=True)
-    
-    # Create merger valuation agent
-    merger_agent = MergerValuationAgent(mn_agent_state)
-    legal_agent = MergerLegalAgent(mn_agent_state)
-    report_agent = ReportAgentNodes(mn_agent_state)
-    # Define the graph workflow
-    workflow = StateGraph(MnAagentState)
-    
-    # Add nodes for comprehensive workflow
-    # Company A Workflow Nodes
-    workflow.add_node("generate_queries_a", research_agent_a.generate_queries)
-    workflow.add_node("research_human_approval_a", research_agent_a.human_approval)
-    workflow.add_node("web_search_a", research_agent_a.web_search)
-    workflow.add_node("DCF_modelling_a", fin_agent_a.DCF_modelling)
-    workflow.add_node("financial_ratio_a", fin_agent_a.financial_ratios)
-    workflow.add_node("fin_human_approval_a", fin_agent_a.human_approval)
-    workflow.add_node("financial_reporting_a", fin_agent_a.financial_reporting)
-    workflow.add_node("supply_chain_analysis_a", ops_agent_a.supply_chain_analysis)
-    workflow.add_node("industry_positioning_a", ops_agent_a.industry_positioning)
-    workflow.add_node("ops_human_approval_a", ops_agent_a.human_approval)
-    workflow.add_node("operations_reporting_a", ops_agent_a.operations_reporting)
-    workflow.add_node("assess_regulatory_compliance", legal_agent.assess_regulatory_compliance)
-    workflow.add_node("conduct_legal_due_diligence", legal_agent.conduct_legal_due_diligence)
-    workflow.add_node("assess_potential_legal_risks", legal_agent.assess_potential_legal_risks)
-    workflow.add_node("finalize_legal_report", lambda state: state)
+    add_timed_node(workflow, f"load_artifacts_{company}", artifact_agent.load_artifacts)
+    add_timed_node(workflow, f"save_artifacts_{company}", artifact_agent.save_artifacts)
+    add_timed_node(workflow, f"generate_queries_{company}", research_agent.generate_queries)
+    add_timed_node(workflow, f"research_human_approval_{company}", research_agent.human_approval)
+    add_timed_node(workflow, f"web_search_{company}", research_agent.batch_web_search)
+    add_timed_node(workflow, f"DCF_modelling_{company}", fin_agent.DCF_modelling)
+    add_timed_node(workflow, f"financial_ratio_{company}", fin_agent.financial_ratios)
+    add_timed_node(workflow, f"fin_human_approval_{company}", fin_agent.human_approval)
+    add_timed_node(workflow, f"financial_reporting_{company}", fin_agent.financial_reporting)
+    add_timed_node(workflow, f"supply_chain_analysis_{company}", ops_agent.supply_chain_analysis)
+    add_timed_node(workflow, f"industry_positioning_{company}", ops_agent.industry_positioning)
+    add_timed_node(workflow, f"ops_human_approval_{company}", ops_agent.human_approval)
+    add_timed_node(workflow, f"operations_reporting_{company}", ops_agent.operations_reporting)
 
-    
-    # Company B Workflow Nodes
-    workflow.add_node("generate_queries_b", research_agent_b.generate_queries)
-    workflow.add_node("research_human_approval_b", research_agent_b.human_approval)
-    workflow.add_node("web_search_b", research_agent_b.web_search)
-    workflow.add_node("DCF_modelling_b", fin_agent_b.DCF_modelling)
-    workflow.add_node("financial_ratio_b", fin_agent_b.financial_ratios)
-    workflow.add_node("fin_human_approval_b", fin_agent_b.human_approval)
-    workflow.add_node("financial_reporting_b", fin_agent_b.financial_reporting)
-    workflow.add_node("supply_chain_analysis_b", ops_agent_b.supply_chain_analysis)
-    workflow.add_node("industry_positioning_b", ops_agent_b.industry_positioning)
-    workflow.add_node("ops_human_approval_b", ops_agent_b.human_approval)
-    workflow.add_node("operations_reporting_b", ops_agent_b.operations_reporting)
-    
-    # Merger Valuation Nodes
-    workflow.add_node("validate_merger_feasibility", merger_agent.validate_merger_feasibility)
-    workflow.add_node("calculate_merger_valuation", merger_agent.calculate_merger_valuation)
-    workflow.add_node("assess_integration_risks", merger_agent.assess_integration_risks)
-    workflow.add_node("finalize_merger_report", lambda state: state)
-    workflow.add_node("report_structure_creator", report_agent.report_structure_creator)
-    workflow.add_node("section_template_generator", report_agent.section_template_generator)
-    workflow.add_node("rag_summary_generator", report_agent.rag_summary_generator)
-    workflow.add_node("consistency_checker", report_agent.consistency_checker)
-    workflow.add_node("report_formatter", report_agent.report_formatter)
-    
-    
-    # Set entry point
-    workflow.set_entry_point("generate_queries_a")
-    
-    # Define sequential workflow for Company A
-    workflow.add_edge("generate_queries_a", "research_human_approval_a")
-    
+    workflow.add_edge(START, f"load_artifacts_{company}")
     workflow.add_conditional_edges(
-        "research_human_approval_a",
-        lambda state: "continue_search" if state.current_step == "human_approval_confirmed" else END,
+        f"load_artifacts_{company}",
+        artifact_agent.route_after_load,
         {
-            "continue_search": "web_search_a",
-            END: END
+            "loaded": f"save_artifacts_{company}",
+            "generate": f"generate_queries_{company}"
         }
     )
-    
-    def web_search_condition_a(state):
-        if not hasattr(state, 'iteration_tracker'):
-            state.iteration_tracker = {'a': 0, 'b': 0}
-        
-        state.iteration_tracker['a'] += 1
-        
-        search_result = research_agent_a.should_continue(state)
-        
-        if state.iteration_tracker['a'] >= 26:
-            return "fully_completed"
-        
-        if search_result == END and state.iteration_tracker['a'] > 0:
-            return "fully_completed"
-        
-        return search_result
+    workflow.add_edge(f"generate_queries_{company}", f"research_human_approval_{company}")
 
     workflow.add_conditional_edges(
-        "web_search_a",
-        web_search_condition_a,
-        {
-            "continue_search": "web_search_a",
-            "fully_completed": "DCF_modelling_a",
-            END: END
-        }
-    )
-    
-    # Financial workflow for A
-    workflow.add_edge("DCF_modelling_a", "financial_ratio_a")
-    workflow.add_edge("financial_ratio_a", "fin_human_approval_a")
-    
-    workflow.add_conditional_edges(
-        "fin_human_approval_a",
-        lambda state: "save_report" if state.current_step == "human_approval_confirmed" else END,
-        {
-            "save_report": "financial_reporting_a",
-            END: END
-        }
-    )
-    
-    # Operations workflow for A
-    workflow.add_edge("financial_reporting_a", "supply_chain_analysis_a")
-    workflow.add_edge("supply_chain_analysis_a", "industry_positioning_a")
-    workflow.add_edge("industry_positioning_a", "ops_human_approval_a")
-    
-    workflow.add_conditional_edges(
-        "ops_human_approval_a",
-        lambda state: "save_report" if state.current_step == "human_approval_confirmed" else END,
-        {
-            "save_report": "operations_reporting_a",
-            END: END
-        }
-    )
-    
-    # Transition from Company A to Company B workflow
-    workflow.add_edge("operations_reporting_a", "generate_queries_b")
-    
-    # Workflow for Company B (similar structure to A)
-    workflow.add_edge("generate_queries_b", "research_human_approval_b")
-    
-    workflow.add_conditional_edges(
-        "research_human_approval_b",
+        f"research_human_approval_{company}",
         lambda state: "continue_search" if state.current_step == "human_approval_confirmed" else END,
         {
-            "continue_search": "web_search_b",
+            "continue_search": f"web_search_{company}",
             END: END
         }
     )
-    
-    def web_search_condition_b(state):
-        if not hasattr(state, 'iteration_tracker'):
-            state.iteration_tracker = {'a': 0, 'b': 0}
-        
-        state.iteration_tracker['b'] += 1
-        
-        search_result = research_agent_b.should_continue(state)
-        
-        if state.iteration_tracker['b'] >= 26:
-            return "fully_completed"
-        
-        if search_result == END and state.iteration_tracker['b'] > 0:
-            return "fully_completed"
-        
-        return search_result
+
+    # Financial workflow: DCF and ratios only read the retriever, run them side by side
+    workflow.add_edge(f"web_search_{company}", f"DCF_modelling_{company}")
+    workflow.add_edge(f"web_search_{company}", f"financial_ratio_{company}")
+    workflow.add_edge([f"DCF_modelling_{company}", f"financial_ratio_{company}"], f"fin_human_approval_{company}")
 
     workflow.add_conditional_edges(
-        "web_search_b",
-        web_search_condition_b,
-        {
-            "continue_search": "web_search_b",
-            "fully_completed": "DCF_modelling_b",
-            END: END
-        }
-    )
-    
-    # Financial workflow for B
-    workflow.add_edge("DCF_modelling_b", "financial_ratio_b")
-    workflow.add_edge("financial_ratio_b", "fin_human_approval_b")
-    
-    workflow.add_conditional_edges(
-        "fin_human_approval_b",
+        f"fin_human_approval_{company}",
         lambda state: "save_report" if state.current_step == "human_approval_confirmed" else END,
         {
-            "save_report": "financial_reporting_b",
+            "save_report": f"financial_reporting_{company}",
             END: END
         }
     )
-    
-    # Operations workflow for B
-    workflow.add_edge("financial_reporting_b", "supply_chain_analysis_b")
-    workflow.add_edge("supply_chain_analysis_b", "industry_positioning_b")
-    workflow.add_edge("industry_positioning_b", "ops_human_approval_b")
-    
+
+    # Operations workflow: supply chain and industry positioning are independent too
+    workflow.add_edge(f"financial_reporting_{company}", f"supply_chain_analysis_{company}")
+    workflow.add_edge(f"financial_reporting_{company}", f"industry_positioning_{company}")
+    workflow.add_edge(
+        [f"supply_chain_analysis_{company}", f"industry_positioning_{company}"],
+        f"ops_human_approval_{company}"
+    )
+
     workflow.add_conditional_edges(
-        "ops_human_approval_b",
+        f"ops_human_approval_{company}",
         lambda state: "save_report" if state.current_step == "human_approval_confirmed" else END,
         {
-            "save_report": "operations_reporting_b",
+            "save_report": f"operations_reporting_{company}",
             END: END
         }
     )
-    
-    workflow.add_edge("operations_reporting_b", "validate_merger_feasibility")
-    workflow.add_edge("validate_merger_feasibility", "calculate_merger_valuation")
-    workflow.add_edge("calculate_merger_valuation", "assess_integration_risks")
-    workflow.add_edge("assess_integration_risks", "finalize_merger_report")
-    workflow.add_edge("finalize_merger_report", "assess_regulatory_compliance")
-    workflow.add_edge("assess_regulatory_compliance", "conduct_legal_due_diligence")
-    workflow.add_edge("conduct_legal_due_diligence", "assess_potential_legal_risks")
-    workflow.add_edge("assess_potential_legal_risks", "finalize_legal_report")
+    workflow.add_edge(f"operations_reporting_{company}", f"save_artifacts_{company}")
+
+    return f"save_artifacts_{company}"
+
+
+def add_deal_stages(workflow: StateGraph, mn_agent_state: MnAagentState, llm, upstream: List[str]) -> None:
+    """
+    Add the pair-level merger -> legal -> report stages
+
+    The three merger nodes and the three legal nodes each run concurrently
+    between join nodes; the report chain runs last.
+
+    Args:
+        workflow (StateGraph): Graph to extend
+        mn_agent_state (MnAagentState): State the agents are built from
+        llm (Chat): Shared Chat client
+        upstream (List[str]): Nodes the merger stage waits for (START for a deal-only graph)
+    """
+    merger_agent = MergerValuationAgent(mn_agent_state, llm=llm)
+    legal_agent = MergerLegalAgent(mn_agent_state, llm=llm)
+    report_agent = ReportAgentNodes(mn_agent_state)
+
+    merger_nodes = {
+        "validate_merger_feasibility": merger_agent.validate_merger_feasibility,
+        "calculate_merger_valuation": merger_agent.calculate_merger_valuation,
+        "assess_integration_risks": merger_agent.assess_integration_risks,
+    }
+    legal_nodes = {
+        "assess_regulatory_compliance": legal_agent.assess_regulatory_compliance,
+        "conduct_legal_due_diligence": legal_agent.conduct_legal_due_diligence,
+        "assess_potential_legal_risks": legal_agent.assess_potential_legal_risks,
+    }
+
+    # Merger Valuation Nodes
+    for name, node_fn in merger_nodes.items():
+        add_timed_node(workflow, name, node_fn)
+    add_timed_node(workflow, "finalize_merger_report", lambda state: {})
+
+    # Legal Nodes
+    for name, node_fn in legal_nodes.items():
+        add_timed_node(workflow, name, node_fn)
+    add_timed_node(workflow, "finalize_legal_report", lambda state: {})
+
+    add_timed_node(workflow, "report_structure_creator", report_agent.report_structure_creator)
+    add_timed_node(workflow, "section_template_generator", report_agent.section_template_generator)
+    add_timed_node(workflow, "rag_summary_generator", report_agent.rag_summary_generator)
+    add_timed_node(workflow, "consistency_checker", report_agent.consistency_checker)
+    add_timed_node(workflow, "report_formatter", report_agent.report_formatter)
+
+    # Merger nodes wait for every upstream node, then run concurrently
+    source = upstream if len(upstream) > 1 else upstream[0]
+    for name in merger_nodes:
+        workflow.add_edge(source, name)
+    workflow.add_edge(list(merger_nodes), "finalize_merger_report")
+
+    # Legal nodes fan out from the merger join and meet again before reporting
+    for name in legal_nodes:
+        workflow.add_edge("finalize_merger_report", name)
+    workflow.add_edge(list(legal_nodes), "finalize_legal_report")
+
     # Define workflow edges
     workflow.add_edge("finalize_legal_report", "report_structure_creator")
     workflow.add_edge("report_structure_creator", "section_template_generator")
@@ -239,9 +186,75 @@ def create_sequential_workflow(mn_agent_state: MnAagentState):
     workflow.add_edge("rag_summary_generator", "consistency_checker")
     workflow.add_edge("consistency_checker", "report_formatter")
     workflow.add_edge("report_formatter", END)
+
+
+def create_company_workflow(mn_agent_state: MnAagentState, llm=None, checkpointer=None):
+    """
+    Standalone research -> financial -> operations analysis of company A only
+
+    Used by batch screening, where each company's analysis is computed once and
+    shared by every pair it appears in.
+    """
+    llm = llm if llm is not None else Chat()
+    workflow = StateGraph(MnAagentState)
+    last_node = add_company_branch(
+        workflow,
+        'a',
+        ResearchAgentNodes(mn_agent_state, 'a', approval=True),
+        FinAgentNodes(mn_agent_state, 'a', approval=True, llm=llm),
+        OpsAgentNodes(mn_agent_state, 'a', approval=True, llm=llm),
+        ArtifactAgentNodes(mn_agent_state, 'a'),
+    )
+    workflow.add_edge(last_node, END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def create_deal_workflow(mn_agent_state: MnAagentState, llm=None, checkpointer=None):
+    """
+    Merger, legal and report stages for one pair whose standalone analyses are
+    already in mn_agent_state
+    """
+    llm = llm if llm is not None else Chat()
+    workflow = StateGraph(MnAagentState)
+    add_deal_stages(workflow, mn_agent_state, llm, [START])
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def create_sequential_workflow(mn_agent_state: MnAagentState, llm=None, checkpointer=None):
+    """
+    Create a comprehensive workflow for multi-company analysis and merger valuation
+
+    Company A and company B run as parallel branches that join before the
+    merger stage; the three merger nodes and the three legal nodes each run
+    concurrently between join nodes. Pass a checkpointer (see
+    utils.checkpointing.get_checkpointer) to make runs resumable by thread id.
+    """
+    # One pooled Chat client shared by every agent
+    llm = llm if llm is not None else Chat()
+
+    # Initialize agent nodes for both companies
+    research_agent_a = ResearchAgentNodes(mn_agent_state, 'a', approval=True)
+    fin_agent_a = FinAgentNodes(mn_agent_state, 'a', approval=True, llm=llm)
+    ops_agent_a = OpsAgentNodes(mn_agent_state, 'a', approval=True, llm=llm)
+    artifact_agent_a = ArtifactAgentNodes(mn_agent_state, 'a')
+    
+    research_agent_b = ResearchAgentNodes(mn_agent_state, 'b', approval=True)
+    fin_agent_b = FinAgentNodes(mn_agent_state, 'b', approval=True, llm=llm)
+    ops_agent_b = OpsAgentNodes(mn_agent_state, 'b', approval=True, llm=llm)
+    artifact_agent_b = ArtifactAgentNodes(mn_agent_state, 'b')
+    
+    # Define the graph workflow
+    workflow = StateGraph(MnAagentState)
+    
+    # Company A and Company B pipelines, fanned out from START
+    last_node_a = add_company_branch(workflow, 'a', research_agent_a, fin_agent_a, ops_agent_a, artifact_agent_a)
+    last_node_b = add_company_branch(workflow, 'b', research_agent_b, fin_agent_b, ops_agent_b, artifact_agent_b)
+
+    # Merger, legal and report stages wait for both company branches
+    add_deal_stages(workflow, mn_agent_state, llm, [last_node_a, last_node_b])
     
     # Compile the workflow
-    compiled_graph =  workflow.compile()
+    compiled_graph =  workflow.compile(checkpointer=checkpointer)
     try:
         output_dir = "assets"
         os.makedirs(output_dir, exist_ok=True)
@@ -265,6 +278,13 @@ def create_sequential_workflow(mn_agent_state: MnAagentState):
 
 # Main execution remains the same as in your original script
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the M&A analysis workflow")
+    parser.add_argument("--thread-id", default=None, help="Run id; pass an earlier run's id to resume it")
+    args = parser.parse_args()
+    thread_id = args.thread_id or str(uuid.uuid4())
+    logger.info(f"Run id: {thread_id} (pass --thread-id {thread_id} to resume)")
+
+    llm = Chat()
     rag_instances = {}
     indexes = {}
     retrievers = {}
@@ -276,21 +296,25 @@ if __name__ == "__main__":
     
     for company, text_path in company_docs.items():
         logger.info(f"Initializing RAG for {company} with document: {text_path}")
-        rag_instances[company] = RAG(text_path)
+        rag_instances[company] = RAG(text_path, llm=llm)
         indexes[company] = rag_instances[company].create_db(db_name=str(company))
-        retrievers[company] = indexes[company].as_retriever()
+        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
     
-    # Initialize MnAagentState with RAG instances
+    get_resource_registry().register_many(rag_instances, indexes, retrievers)
+
+    # Initialize MnAagentState
     initial_state = MnAagentState(
         company_a_name="Reliance_Industries_Limited",
         company_b_name="180_Degree_Consulting",
         company_a_doc="/home/naba/Desktop/backend/RIL-Integrated-Annual-Report-2023-24_parsed.txt",
         company_b_doc="/home/naba/Desktop/backend/dc.txt",
-        rag_instances=rag_instances,
-        indexes=indexes,
-        retrievers=retrievers
     )
     
     # Create and invoke the sequential workflow
-    research_graph = create_sequential_workflow(initial_state)
-    final_state = research_graph.invoke(initial_state, config={"recursion_limit": 1000})
\ No newline at end of file
+    research_graph = create_sequential_workflow(initial_state, llm=llm, checkpointer=get_checkpointer())
+    get_node_memo().start_run()
+    final_state = run_with_checkpoints(research_graph, initial_state, thread_id)
+    logger.info(format_run_summary(final_state["node_timings"]))
+    logger.info(format_search_summary(final_state["search_stats"]))
+    logger.info(format_scheduler_summary(get_scheduler().stats()))
+    logger.info(get_node_memo().run_report())
\ No newline at end of file
@@ -0,0 +1,173 @@
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from RAG.keyword_index import HybridRetriever
+
+logger = logging.getLogger(__name__)
+
+ADAPTIVE_MODES = ("gap", "mass")
+# Smallest relative score drop that counts as the edge of the relevant set
+SCORE_GAP_THRESHOLD = 0.1
+# Share of the candidates' total relative score the kept chunks must cover
+SCORE_MASS = 0.8
+
+
+def choose_k(scores: Sequence[Optional[float]], min_k: int, max_k: int, mode: str = "gap",
+             gap_threshold: float = SCORE_GAP_THRESHOLD, mass: float = SCORE_MASS) -> int:
+    """
+    Number of ranked candidates to keep for one query
+
+    Scores are taken relative to the best one, so their scale does not
+    matter, but they must reflect relevance: rank-based fused scores (RRF)
+    barely vary between queries, so for a hybrid retriever pass the vector
+    similarities from before fusion.
+
+    "gap" cuts at the largest drop between neighbouring candidates once it
+    reaches gap_threshold; a flat distribution (a broad question that many
+    chunks answer equally well) keeps max_k. "mass" keeps the shortest prefix
+    holding `mass` of the candidates' total relative score, so a few dominant
+    chunks give a small k and an even spread a large one.
+
+    Args:
+        scores (Sequence[float]): Candidate scores in ranked order, best first
+        min_k (int): Fewest candidates kept
+        max_k (int): Most candidates kept
+        mode (str): "gap" or "mass"
+        gap_threshold (float): Smallest relative drop treated as a cut
+        mass (float): Share of the total relative score to cover
+
+    Returns:
+        int: k within [min_k, max_k], at most len(scores)
+    """
+    scores = [max(score or 0.0, 0.0) for score in scores[:max_k]]
+    if len(scores) <= min_k or scores[0] <= 0:
+        return min(min_k, len(scores))
+    relative = [score / scores[0] for score in scores]
+
+    if mode == "mass":
+        target, covered = mass * sum(relative), 0.0
+        for k, value in enumerate(relative, start=1):
+            covered += value
+            if covered >= target:
+                return max(min_k, k)
+        return len(relative)
+
+    # Candidate cut after position k for k in [min_k, len - 1]
+    gaps = [(relative[k - 1] - relative[k], k) for k in range(max(min_k, 1), len(relative))]
+    largest_gap, k = max(gaps)
+    return k if largest_gap >= gap_threshold else len(relative)
+
+
+class AdaptiveTopKRetriever(BaseRetriever):
+    """
+    Keeps a per-query number of chunks from a retriever that returns up to max_k.
+
+    A narrow lookup whose best chunk clearly stands out gets few chunks; a
+    broad question with many similarly scored chunks gets up to max_k, so the
+    prompt grows only with the context a question needs. Behind a
+    HybridRetriever, k is chosen from the vector similarities and applied to
+    the fused ranking.
+    """
+
+    def __init__(self, retriever: BaseRetriever, min_k: int = 1, max_k: int = 8, mode: str = "gap",
+                 gap_threshold: float = SCORE_GAP_THRESHOLD, mass: float = SCORE_MASS):
+        super().__init__()
+        if mode not in ADAPTIVE_MODES:
+            raise ValueError(f"Unknown adaptive top-k mode {mode!r}, expected one of {ADAPTIVE_MODES}")
+        self.retriever = retriever
+        self.min_k = max(1, min_k)
+        self.max_k = max(self.min_k, max_k)
+        self.mode = mode
+        self.gap_threshold = gap_threshold
+        self.mass = mass
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if isinstance(self.retriever, HybridRetriever):
+            candidates, scores = self.retriever.retrieve_with_similarities(query_bundle)
+        else:
+            candidates = sorted(self.retriever.retrieve(query_bundle), key=lambda node: node.score or 0.0, reverse=True)
+            scores = [node.score for node in candidates]
+        k = choose_k(scores, self.min_k, self.max_k, self.mode, gap_threshold=self.gap_threshold, mass=self.mass)
+        logger.debug(f"Adaptive top-k ({self.mode}) kept {k}/{len(candidates)} chunks for '{query_bundle.query_str[:60]}'")
+        return candidates[:k]
+
+
+if __name__ == "__main__":
+    # Tokens sent versus answer coverage for fixed and adaptive top-k on a
+    # fixed mix of narrow and broad questions
+    from benchmarks.annual_report import synthetic_annual_report
+    from RAG.rag_llama import RAG, RETRIEVAL_MODE, count_tokens, get_chroma_client
+
+    parser = argparse.ArgumentParser(description="Benchmark fixed versus adaptive top-k retrieval")
+    parser.add_argument("--retrieval", choices=["vector", "hybrid"], default=RETRIEVAL_MODE)
+    parser.add_argument("--min-k", type=int, default=1)
+    parser.add_argument("--max-k", type=int, default=8)
+    parser.add_argument("--fixed-k", type=int, default=2, help="Baseline fixed k besides max-k")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    db_name = "adaptive_top_k_benchmark"
+    # Narrow lookups answered by one sentence, broad trend questions by one sentence per year
+    text, facts = synthetic_annual_report(
+        metrics=["EBITDA", "capital expenditure", "free cash flow", "net debt", "working capital"]
+    )
+    narrow = [
+        (f"What was the {fact['metric']} of segment {fact['segment']} in {fact['fiscal_year']}?", [fact["answer"]])
+        for fact in facts
+    ]
+    trends: Dict[tuple, List[str]] = {}
+    for fact in facts:
+        trends.setdefault((fact["metric"], fact["segment"]), []).append(fact["answer"])
+    broad = [
+        (f"How did the {metric} of segment {segment} develop over the years?", answers)
+        for (metric, segment), answers in trends.items()
+    ]
+    questions = narrow[::9] + broad[::3]
+
+    rag = RAG(text)
+    get_chroma_client().get_or_create_collection(db_name)
+    get_chroma_client().delete_collection(db_name)
+    rag.keyword_index.delete_collection(db_name)
+    index = rag.create_db(db_name)
+
+    def base_retriever(k):
+        if args.retrieval == "hybrid":
+            return rag.hybrid_retriever(db_name, index, similarity_top_k=k, candidate_k=max(10, k))
+        return index.as_retriever(similarity_top_k=k)
+
+    strategies: Dict[str, BaseRetriever] = {
+        f"fixed k={args.fixed_k}": base_retriever(args.fixed_k),
+        f"fixed k={args.max_k}": base_retriever(args.max_k),
+    }
+    for mode in ADAPTIVE_MODES:
+        strategies[f"adaptive {mode}"] = AdaptiveTopKRetriever(
+            base_retriever(args.max_k), min_k=args.min_k, max_k=args.max_k, mode=mode
+        )
+
+    narrow_count = sum(len(answers) == 1 for _, answers in questions)
+    print(f"{len(questions)} questions ({narrow_count} narrow, {len(questions) - narrow_count} broad), "
+          f"{args.retrieval} retrieval, k in [{args.min_k}, {args.max_k}]")
+    print(f"{'strategy':<14} {'tokens/query':>12} {'narrow cov':>11} {'broad cov':>10} {'overall':>8} {'ms/query':>9}")
+    query_embeddings = rag.embed_model.embed_queries([question for question, _ in questions])
+    for name, retriever in strategies.items():
+        tokens, coverage, start = 0, {"narrow": [], "broad": []}, time.perf_counter()
+        for (question, answers), embedding in zip(questions, query_embeddings):
+            nodes = retriever.retrieve(QueryBundle(query_str=question, embedding=embedding))
+            # Verbatim context, so the numbers reflect retrieval alone
+            context, _ = rag._build_context(nodes, max_tokens=0)
+            tokens += count_tokens(context)
+            found = sum(answer in context for answer in answers) / len(answers)
+            coverage["narrow" if len(answers) == 1 else "broad"].append(found)
+        latency = (time.perf_counter() - start) / len(questions) * 1000
+        overall = sum(coverage["narrow"] + coverage["broad"]) / len(questions)
+        print(
+            f"{name:<14} {tokens / len(questions):>12.0f} "
+            f"{sum(coverage['narrow']) / max(1, len(coverage['narrow'])):>11.1%} "
+            f"{sum(coverage['broad']) / max(1, len(coverage['broad'])):>10.1%} {overall:>8.1%} {latency:>9.2f}"
+        )
+
+    get_chroma_client().delete_collection(db_name)
+    rag.keyword_index.delete_collection(db_name)
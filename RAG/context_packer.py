@@ -0,0 +1,143 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Trade-off between relevance (1.0) and novelty (0.0) in MMR selection
+MMR_LAMBDA = 0.7
+# Cosine similarity at which a chunk counts as a near-duplicate of one already packed
+DUPLICATE_SIMILARITY = 0.95
+# Shortest shared text (in characters) treated as chunk overlap when merging neighbours
+MIN_OVERLAP_CHARS = 20
+# Longest overlap searched for; the splitter overlaps chunks by ~100 tokens
+MAX_OVERLAP_CHARS = 2000
+
+
+def mmr_order(relevance: Sequence[float], vectors: np.ndarray, mmr_lambda: float = MMR_LAMBDA,
+              duplicate_similarity: float = DUPLICATE_SIMILARITY) -> Tuple[List[int], List[int]]:
+    """
+    Maximal marginal relevance ordering of candidates
+
+    Args:
+        relevance (Sequence[float]): Relevance of each candidate to the query, higher is better
+        vectors (np.ndarray): One embedding per candidate
+        mmr_lambda (float): 1.0 ranks by relevance only, lower values favour novelty
+        duplicate_similarity (float): Candidates at least this similar to a selected one are dropped
+
+    Returns:
+        Tuple[List[int], List[int]]: Selected candidate positions in MMR order, dropped duplicates
+    """
+    count = len(relevance)
+    if count == 0:
+        return [], []
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+    similarity = vectors @ vectors.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected, duplicates = [], []
+    remaining = list(range(count))
+    max_similarity = np.full(count, -1.0, dtype=np.float32)
+    while remaining:
+        scores = [
+            mmr_lambda * relevance[i] - (1 - mmr_lambda) * max(max_similarity[i], 0.0)
+            for i in remaining
+        ]
+        best = remaining.pop(int(np.argmax(scores)))
+        if selected and max_similarity[best] >= duplicate_similarity:
+            duplicates.append(best)
+            continue
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return selected, duplicates
+
+
+def strip_overlap(previous: str, following: str, min_chars: int = MIN_OVERLAP_CHARS,
+                  max_chars: int = MAX_OVERLAP_CHARS) -> str:
+    """following without the leading text it repeats from the end of previous"""
+    following_stripped = following.lstrip()
+    for size in range(min(len(previous), len(following_stripped), max_chars), min_chars - 1, -1):
+        if previous.endswith(following_stripped[:size]):
+            return following_stripped[size:]
+    return following
+
+
+def merge_spans(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge consecutive chunks of the same document into spans, dropping the
+    text neighbouring chunks share through the splitter's overlap
+
+    Args:
+        chunks (List[Dict[str, Any]]): {"text", "metadata"} per chunk
+
+    Returns:
+        List[Dict[str, Any]]: Spans in document order; metadata gains "chunk_end"
+    """
+    def position(chunk):
+        metadata = chunk["metadata"]
+        index = metadata.get("chunk_index")
+        return str(metadata.get("doc_id", "")), index if isinstance(index, int) else -1
+
+    spans, last_position = [], None
+    for chunk in sorted(chunks, key=position):
+        doc_id, index = position(chunk)
+        if spans and index >= 0 and last_position == (doc_id, index - 1):
+            span = spans[-1]
+            remainder = strip_overlap(span["text"], chunk["text"])
+            # The remainder continues the sentence stream where the overlap ended
+            span["text"] += (" " if remainder is not chunk["text"] else "\n") + remainder
+            span["metadata"]["chunk_end"] = index
+        else:
+            spans.append({"text": chunk["text"], "metadata": {**chunk["metadata"], "chunk_end": index}})
+        last_position = (doc_id, index)
+    return spans
+
+
+def pack_chunks(chunks: List[Dict[str, Any]], vectors: Optional[np.ndarray], token_counts: Sequence[int],
+                max_tokens: int, mmr_lambda: float = MMR_LAMBDA,
+                duplicate_similarity: float = DUPLICATE_SIMILARITY) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Select retrieved chunks for the prompt under a token budget
+
+    Chunks arrive in retrieval order (best first). Exact repeats are dropped,
+    the rest are ordered by MMR so near-duplicates (e.g. the same web snippet
+    indexed twice) are skipped, chunks are taken while they fit the budget,
+    and the survivors are merged into overlap-free spans in document order.
+
+    Args:
+        chunks (List[Dict[str, Any]]): {"text", "metadata"} per retrieved chunk
+        vectors (np.ndarray, optional): Chunk embeddings for MMR; None keeps retrieval order
+        token_counts (Sequence[int]): Tokens per chunk
+        max_tokens (int): Token budget for the selected chunks
+        mmr_lambda (float): Relevance / novelty trade-off
+        duplicate_similarity (float): Similarity above which a chunk is a near-duplicate
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Dict[str, int]]: Spans, and counts of duplicates
+        and over-budget chunks dropped
+    """
+    seen_texts, unique = set(), []
+    for i, chunk in enumerate(chunks):
+        key = " ".join(chunk["text"].split())
+        if key not in seen_texts:
+            seen_texts.add(key)
+            unique.append(i)
+    stats = {"duplicates": len(chunks) - len(unique), "over_budget": 0}
+
+    if vectors is not None and len(unique) > 1:
+        # Retrieval order is the relevance signal; raw scores differ in scale between retrievers
+        relevance = [1.0 - rank / len(unique) for rank in range(len(unique))]
+        order, duplicates = mmr_order(relevance, np.asarray(vectors)[unique], mmr_lambda, duplicate_similarity)
+        stats["duplicates"] += len(duplicates)
+        candidates = [unique[i] for i in order]
+    else:
+        candidates = unique
+
+    # The best chunk is always kept, even if it alone exceeds the budget
+    selected, used = [], 0
+    for i in candidates:
+        if used + token_counts[i] > max_tokens and selected:
+            stats["over_budget"] += 1
+            continue
+        selected.append(chunks[i])
+        used += token_counts[i]
+    return merge_spans(selected), stats
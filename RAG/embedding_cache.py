@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from utils.sqlite_store import SQLiteStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "./embedding_cache/embeddings.sqlite"
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def text_hash(text: str) -> str:
+    """Content address of a chunk of text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(SQLiteStore):
+    """
+    On-disk embedding cache keyed by (model name, chunk text hash).
+
+    Vectors are stored as float32 blobs in SQLite. When the cache grows past
+    max_entries the least recently used rows are evicted.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (model, text_hash)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)",
+    )
+    SYNCHRONOUS = "NORMAL"
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        logger.info(f"Opened embedding cache at {path} ({self.size()} entries)")
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up cached vectors for texts, returning None for every miss
+
+        Args:
+            model (str): Embedding model name
+            texts (Sequence[str]): Texts exactly as they would be embedded
+
+        Returns:
+            List[Optional[List[float]]]: One entry per text, in input order
+        """
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, key) for key in found],
+                )
+                self._conn.commit()
+
+            results = [found.get(key) for key in hashes]
+            batch_hits = sum(1 for vector in results if vector is not None)
+            self.hits += batch_hits
+            self.misses += len(results) - batch_hits
+
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store freshly computed vectors and enforce the size bound"""
+        now = time.time()
+        rows = [
+            (model, text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            """
+            DELETE FROM embeddings WHERE rowid IN (
+                SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?
+            )
+            """,
+            (overflow,),
+        )
+        self.evictions += overflow
+        logger.info(f"Evicted {overflow} least recently used embeddings from cache")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_embedding_cache(path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES) -> EmbeddingCache:
+    """Process-wide cache instance for path, so every RAG shares one connection"""
+    return shared_store(EmbeddingCache, path, max_entries)
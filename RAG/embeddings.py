@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from utils.analyzer_utils import resident_memory_mb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Search-query embeddings kept in memory per model; queries repeat within a process
+# but are too short-lived for the persistent chunk cache. 0 disables the cache
+QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024"))
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    Thread-safe handle around one loaded embedding model.
+
+    Every RAG instance in the process receives the same handle, so the model
+    weights are loaded once and concurrent nodes serialize their forward passes
+    instead of racing on the underlying tokenizer/model.
+    """
+
+    def __init__(self, model_name: str, model: Embeddings, load_seconds: float, memory_mb: float):
+        self.model_name = model_name
+        self.model = model
+        self.load_seconds = load_seconds
+        self.memory_mb = memory_mb
+        self._lock = threading.Lock()
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            return self.model.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed search queries in one forward pass, reusing recently embedded ones
+
+        Args:
+            texts (List[str]): Query texts
+
+        Returns:
+            List[List[float]]: One vector per text, in input order
+        """
+        with self._lock:
+            vectors = [self._query_cache.get(text) for text in texts]
+            misses = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+            if misses:
+                computed = dict(zip(misses, self.model.embed_documents(misses)))
+                vectors = [computed.get(text, vector) for text, vector in zip(texts, vectors)]
+            if QUERY_CACHE_SIZE > 0:
+                for text, vector in zip(texts, vectors):
+                    self._query_cache[text] = vector
+                    self._query_cache.move_to_end(text)
+                while len(self._query_cache) > QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+        return vectors
+
+
+class EmbeddingRegistry:
+    """
+    Process-wide registry that loads each embedding model exactly once
+    """
+
+    _models: Dict[str, SharedEmbeddings] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, model_name: str = DEFAULT_EMBED_MODEL) -> SharedEmbeddings:
+        """
+        Return the shared handle for model_name, loading it on first use
+
+        Args:
+            model_name (str): HuggingFace model identifier
+
+        Returns:
+            SharedEmbeddings: Shared, thread-safe embedding handle
+        """
+        handle = cls._models.get(model_name)
+        if handle is not None:
+            return handle
+
+        with cls._lock:
+            # Another thread may have finished loading while we waited
+            handle = cls._models.get(model_name)
+            if handle is not None:
+                return handle
+
+            memory_before = resident_memory_mb()
+            start_time = time.perf_counter()
+            model = HuggingFaceEmbeddings(model_name=model_name)
+            load_seconds = time.perf_counter() - start_time
+            memory_mb = resident_memory_mb() - memory_before
+
+            handle = SharedEmbeddings(model_name, model, load_seconds, memory_mb)
+            cls._models[model_name] = handle
+            logger.info(
+                f"Loaded embedding model {model_name} in {load_seconds:.2f} seconds "
+                f"(+{memory_mb:.1f} MB resident, {resident_memory_mb():.1f} MB total)"
+            )
+            return handle
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Load time and resident memory of every model loaded so far"""
+        return {
+            name: {"load_seconds": handle.load_seconds, "memory_mb": handle.memory_mb}
+            for name, handle in cls._models.items()
+        }
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBED_MODEL) -> SharedEmbeddings:
+    """Shortcut for EmbeddingRegistry.get"""
+    return EmbeddingRegistry.get(model_name)
@@ -0,0 +1,280 @@
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Set, Tuple
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from utils.sqlite_store import SQLiteStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEYWORD_INDEX_PATH = "./keyword_index/bm25.sqlite"
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Reciprocal rank fusion constant; larger values flatten the rank weighting
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/&][a-z0-9]+)*")
+_COMPOUND_SPLIT_RE = re.compile(r"[.\-/&]")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which", "with",
+}
+
+
+def _normalize(token: str) -> str:
+    # Crude plural folding so "expenditures" matches "expenditure"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")) and not token[-2].isdigit():
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms for BM25
+
+    Compound tokens such as "FY2023-24" or "R&D" are kept whole and also
+    indexed by their parts, so exact fiscal-year and ratio names still match
+    when the query spells them differently.
+    """
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        if match in STOPWORDS:
+            continue
+        tokens.append(_normalize(match))
+        if _COMPOUND_SPLIT_RE.search(match):
+            tokens.extend(_normalize(part) for part in _COMPOUND_SPLIT_RE.split(match) if part and part not in STOPWORDS)
+    return tokens
+
+
+class KeywordIndex(SQLiteStore):
+    """
+    Inverted index over the chunks of each Chroma collection, scored with BM25.
+
+    Postings are stored in SQLite next to the other on-disk caches and are
+    added incrementally as chunks are ingested, so update_db only indexes the
+    new chunks. Node ids are the same as in the vector store.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS docs (
+            collection TEXT NOT NULL,
+            node_id TEXT NOT NULL,
+            length INTEGER NOT NULL,
+            PRIMARY KEY (collection, node_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS postings (
+            collection TEXT NOT NULL,
+            term TEXT NOT NULL,
+            node_id TEXT NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (collection, term, node_id)
+        ) WITHOUT ROWID
+        """,
+    )
+    SYNCHRONOUS = "NORMAL"
+
+    def __init__(self, path: str = DEFAULT_KEYWORD_INDEX_PATH):
+        super().__init__(path)
+
+    def add(self, collection: str, chunks: Sequence[Tuple[str, str]]) -> int:
+        """
+        Index chunks that are not in the collection's postings yet
+
+        Args:
+            collection (str): Chroma collection name
+            chunks (Sequence[Tuple[str, str]]): (node_id, text) pairs
+
+        Returns:
+            int: Number of chunks added
+        """
+        with self._lock:
+            existing = self._node_ids_locked(collection)
+            docs, postings = [], []
+            for node_id, text in chunks:
+                if node_id in existing:
+                    continue
+                existing.add(node_id)
+                terms = tokenize(text)
+                docs.append((collection, node_id, len(terms)))
+                postings.extend((collection, term, node_id, tf) for term, tf in Counter(terms).items())
+            if docs:
+                self._conn.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?)", docs)
+                self._conn.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?)", postings)
+                self._conn.commit()
+        if docs:
+            logger.info(f"Keyword index {collection}: added {len(docs)} chunks ({len(postings)} postings)")
+        return len(docs)
+
+    def _node_ids_locked(self, collection: str) -> Set[str]:
+        rows = self._conn.execute("SELECT node_id FROM docs WHERE collection = ?", (collection,)).fetchall()
+        return {row[0] for row in rows}
+
+    def node_ids(self, collection: str) -> Set[str]:
+        with self._lock:
+            return self._node_ids_locked(collection)
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def search(self, collection: str, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        BM25 ranking of a collection's chunks for query
+
+        Returns:
+            List[Tuple[str, float]]: (node_id, score) pairs, best first
+        """
+        terms = Counter(tokenize(query))
+        if not terms:
+            return []
+        placeholders = ",".join("?" * len(terms))
+        with self._lock:
+            doc_count, avg_length = self._conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM docs WHERE collection = ?", (collection,)
+            ).fetchone()
+            if not doc_count:
+                return []
+            rows = self._conn.execute(
+                f"""
+                SELECT p.term, p.node_id, p.tf, d.length
+                FROM postings p JOIN docs d ON d.collection = p.collection AND d.node_id = p.node_id
+                WHERE p.collection = ? AND p.term IN ({placeholders})
+                """,
+                [collection, *terms],
+            ).fetchall()
+
+        doc_freq = Counter(term for term, _, _, _ in rows)
+        scores: Dict[str, float] = {}
+        for term, node_id, tf, length in rows:
+            idf = math.log(1 + (doc_count - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1))
+            scores[node_id] = scores.get(node_id, 0.0) + terms[term] * idf * tf * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def delete_collection(self, collection: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings WHERE collection = ?", (collection,))
+            self._conn.execute("DELETE FROM docs WHERE collection = ?", (collection,))
+            self._conn.commit()
+
+
+def get_keyword_index(path: str = DEFAULT_KEYWORD_INDEX_PATH) -> KeywordIndex:
+    """Process-wide keyword index for path"""
+    return shared_store(KeywordIndex, path)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses a vector retriever with BM25 over the same Chroma collection.
+
+    Both rankings contribute candidates and are merged with reciprocal rank
+    fusion, so a chunk that matches an exact term ("EBITDA", "FY2023-24")
+    surfaces even when its embedding is not among the nearest neighbours.
+    """
+
+    def __init__(self, vector_retriever: BaseRetriever, keyword_index: KeywordIndex, chroma_collection: Any,
+                 similarity_top_k: int = 2, candidate_k: int = 10, rrf_k: int = RRF_K):
+        super().__init__()
+        self.vector_retriever = vector_retriever
+        self.keyword_index = keyword_index
+        self.chroma_collection = chroma_collection
+        self.similarity_top_k = similarity_top_k
+        self.candidate_k = candidate_k
+        self.rrf_k = rrf_k
+
+    def _fetch_nodes(self, node_ids: List[str]) -> Dict[str, Any]:
+        if not node_ids:
+            return {}
+        stored = self.chroma_collection.get(ids=node_ids, include=["documents", "metadatas"])
+        return {
+            node_id: metadata_dict_to_node(metadata, text=document)
+            for node_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+
+    def retrieve_with_similarities(self, query_bundle: QueryBundle) -> Tuple[List[NodeWithScore], List[float]]:
+        """
+        Fused top-k nodes, plus the vector retriever's similarity scores
+
+        RRF scores depend on ranks alone, so they look alike for every query;
+        the similarities before fusion show how sharply relevance drops off.
+
+        Returns:
+            Tuple[List[NodeWithScore], List[float]]: Fused nodes best first, and
+            the vector candidates' similarities best first
+        """
+        vector_hits = self.vector_retriever.retrieve(query_bundle)
+        keyword_hits = self.keyword_index.search(self.chroma_collection.name, query_bundle.query_str, self.candidate_k)
+
+        fused: Dict[str, float] = {}
+        nodes = {}
+        for rank, hit in enumerate(vector_hits):
+            nodes[hit.node.node_id] = hit.node
+            fused[hit.node.node_id] = fused.get(hit.node.node_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        for rank, (node_id, _) in enumerate(keyword_hits):
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        nodes.update(self._fetch_nodes([node_id for node_id, _ in ranked if node_id not in nodes]))
+        # BM25 postings of chunks since deleted from Chroma are skipped before cutting to top-k
+        ranked = [(node_id, score) for node_id, score in ranked if node_id in nodes][:self.similarity_top_k]
+        similarities = sorted((hit.score or 0.0 for hit in vector_hits), reverse=True)
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in ranked], similarities
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self.retrieve_with_similarities(query_bundle)[0]
+
+
+if __name__ == "__main__":
+    # Recall@k and latency of vector-only versus hybrid retrieval on questions
+    # that hinge on exact metric names and fiscal years
+    from benchmarks.annual_report import synthetic_annual_report
+    from RAG.rag_llama import RAG, get_chroma_client
+
+    logging.basicConfig(level=logging.WARNING)
+    top_k = int(os.getenv("BENCHMARK_TOP_K", "2"))
+    db_name = "keyword_index_benchmark"
+    text, facts = synthetic_annual_report()
+    questions = [
+        (f"What was the {fact['metric']} of segment {fact['segment']} in {fact['fiscal_year']}?", fact["answer"])
+        for fact in facts
+    ][::7]
+
+    rag = RAG(text)
+    get_chroma_client().get_or_create_collection(db_name)
+    get_chroma_client().delete_collection(db_name)
+    rag.keyword_index.delete_collection(db_name)
+    index = rag.create_db(db_name)
+
+    retrievers = {
+        "vector": index.as_retriever(similarity_top_k=top_k),
+        "hybrid": rag.hybrid_retriever(db_name, index, similarity_top_k=top_k),
+    }
+    query_embeddings = rag.embed_model.embed_documents([question for question, _ in questions])
+    print(f"{len(questions)} questions, top_k={top_k}")
+    for name, retriever in retrievers.items():
+        hits, start = 0, time.perf_counter()
+        for (question, answer), embedding in zip(questions, query_embeddings):
+            nodes = retriever.retrieve(QueryBundle(query_str=question, embedding=embedding))
+            hits += any(answer in node.node.get_content() for node in nodes)
+        latency = (time.perf_counter() - start) / len(questions) * 1000
+        print(f"{name:<7} recall@{top_k}: {hits / len(questions):6.1%}   latency: {latency:7.2f} ms/query")
+
+    collection = get_chroma_client().get_collection(db_name)
+    hits, start = 0, time.perf_counter()
+    for question, answer in questions:
+        node_ids = [node_id for node_id, _ in rag.keyword_index.search(db_name, question, top_k)]
+        hits += any(answer in document for document in collection.get(ids=node_ids, include=["documents"])["documents"])
+    latency = (time.perf_counter() - start) / len(questions) * 1000
+    print(f"{'bm25':<7} recall@{top_k}: {hits / len(questions):6.1%}   latency: {latency:7.2f} ms/query")
+
+    get_chroma_client().delete_collection(db_name)
+    rag.keyword_index.delete_collection(db_name)
@@ -0,0 +1,156 @@
+import logging
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, TextNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    In-process vector store backed by a NumPy matrix with exact cosine search.
+
+    Meant for the short-lived scratch indexes built inside agent nodes: nothing
+    is persisted, there is no HNSW build and the store disappears with the RAG
+    instance that owns it.
+    """
+
+    stores_text: bool = True
+
+    _nodes: List[BaseNode] = PrivateAttr(default_factory=list)
+    _vectors: List[np.ndarray] = PrivateAttr(default_factory=list)
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        for node in nodes:
+            vector = np.asarray(node.get_embedding(), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            self._vectors.append(vector / norm if norm else vector)
+            self._nodes.append(node)
+        # Rebuilt lazily on the next query
+        self._matrix = None
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        keep = [i for i, node in enumerate(self._nodes) if node.ref_doc_id != ref_doc_id]
+        self._nodes = [self._nodes[i] for i in keep]
+        self._vectors = [self._vectors[i] for i in keep]
+        self._matrix = None
+
+    def get_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+    ) -> List[BaseNode]:
+        if filters is not None:
+            raise ValueError("NumpyVectorStore does not support metadata filters")
+        if node_ids is None:
+            return list(self._nodes)
+        wanted = set(node_ids)
+        return [node for node in self._nodes if node.node_id in wanted]
+
+    def clear(self) -> None:
+        self._nodes = []
+        self._vectors = []
+        self._matrix = None
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise ValueError("NumpyVectorStore does not support metadata filters")
+        if not self._nodes or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        if self._matrix is None:
+            self._matrix = np.vstack(self._vectors)
+
+        query_vector = np.asarray(query.query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm:
+            query_vector = query_vector / norm
+        scores = self._matrix @ query_vector
+
+        candidates = np.arange(len(self._nodes))
+        # VectorIndexRetriever passes empty id lists when it has no restriction
+        if query.doc_ids or query.node_ids:
+            doc_ids = set(query.doc_ids or [])
+            node_ids = set(query.node_ids or [])
+            candidates = np.array(
+                [
+                    i for i, node in enumerate(self._nodes)
+                    if node.ref_doc_id in doc_ids or node.node_id in node_ids
+                ],
+                dtype=int,
+            )
+            if candidates.size == 0:
+                return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        top_k = min(query.similarity_top_k, candidates.size)
+        candidate_scores = scores[candidates]
+        top = np.argpartition(-candidate_scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-candidate_scores[top])]
+        positions = candidates[top]
+
+        return VectorStoreQueryResult(
+            nodes=[self._nodes[i] for i in positions],
+            similarities=[float(scores[i]) for i in positions],
+            ids=[self._nodes[i].node_id for i in positions],
+        )
+
+
+def _benchmark_nodes(num_nodes: int, dim: int, seed: int = 0) -> List[TextNode]:
+    rng = np.random.default_rng(seed)
+    return [
+        TextNode(id_=f"bench-chunk-{i}", text=f"chunk {i}", embedding=rng.normal(size=dim).tolist())
+        for i in range(num_nodes)
+    ]
+
+
+if __name__ == "__main__":
+    # Per-node latency of a scratch index: create, insert a handful of chunks,
+    # run one query. Embeddings are precomputed so only the store is measured.
+    import chromadb
+    from llama_index.vector_stores.chroma import ChromaVectorStore
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    runs, num_nodes, dim = 20, 8, 384
+    nodes = _benchmark_nodes(num_nodes, dim)
+    query = VectorStoreQuery(query_embedding=np.ones(dim).tolist(), similarity_top_k=2)
+    timings: Dict[str, float] = {}
+
+    db_dir = tempfile.mkdtemp(prefix="chroma_bench_")
+    try:
+        start = time.perf_counter()
+        for run in range(runs):
+            client = chromadb.PersistentClient(path=db_dir)
+            collection = client.get_or_create_collection(f"scratch_{run}")
+            store = ChromaVectorStore(chroma_collection=collection)
+            store.add(nodes)
+            store.query(query)
+        timings["chroma_persistent"] = (time.perf_counter() - start) / runs
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    start = time.perf_counter()
+    for run in range(runs):
+        store = NumpyVectorStore()
+        store.add(nodes)
+        store.query(query)
+    timings["numpy_ephemeral"] = (time.perf_counter() - start) / runs
+
+    for name, seconds in timings.items():
+        print(f"{name:>18}: {seconds * 1000:8.2f} ms per scratch index")
+    print(f"{'saved':>18}: {(timings['chroma_persistent'] - timings['numpy_ephemeral']) * 1000:8.2f} ms per node")
@@ -2,7 +2,13 @@ import warnings
 import logging
 import uuid
 import os
-from typing import List, Dict, Any
+import re
+import time
+import hashlib
+import json
+import tempfile
+import threading
+from typing import List, Dict
 from dotenv import load_dotenv
 # from langchain_core.messages import HumanMessage
 from utils.message import HumanMessage
@@ -12,33 +18,189 @@ from llama_index.core import VectorStoreIndex
 from llama_index.core import Settings
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core.storage.storage_context import StorageContext
-from langchain_community.embeddings import HuggingFaceEmbeddings 
-from llama_index.core.schema import Document
+from RAG.embeddings import get_embedding_model, DEFAULT_EMBED_MODEL
+from RAG.embedding_cache import get_embedding_cache, text_hash
+from RAG.memory_store import NumpyVectorStore
+from RAG.keyword_index import HybridRetriever, get_keyword_index
+from RAG.context_packer import pack_chunks
+from RAG.adaptive_retriever import AdaptiveTopKRetriever
+from utils.analyzer_utils import resident_memory_mb
+from llama_index.core.schema import MetadataMode, QueryBundle, TextNode, NodeRelationship, RelatedNodeInfo
 from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.utils import get_tokenizer
 import chromadb
+from chromadb.errors import ChromaError
+import numpy as np
 warnings.filterwarnings("ignore")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+# Context window of the generation model (Llama 3.3 70B) and the tokens reserved for
+# its answer (Chat's max_tokens), in tokens
+LLM_CONTEXT_TOKENS = int(os.getenv("RAG_LLM_CONTEXT_TOKENS", "128000"))
+LLM_ANSWER_TOKENS = int(os.getenv("RAG_LLM_ANSWER_TOKENS", "5000"))
+# Largest text (in tokens) budgeted_query sends to the LLM without retrieval; lowered
+# further when the context window minus the prompt and answer leaves less room
+DIRECT_CONTEXT_TOKENS = int(os.getenv("RAG_DIRECT_CONTEXT_TOKENS", "8000"))
+CHROMA_PATH = "./chroma_db"
+# "vector" is similarity only; "hybrid" (opt-in) fuses BM25 with vector search in make_retriever
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "vector")
+# Chunks returned per query (llama_index's as_retriever default) and candidates fused per ranking
+RETRIEVAL_TOP_K = int(os.getenv("RAG_RETRIEVAL_TOP_K", "2"))
+HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "10"))
+# "gap" or "mass" picks k per query from the score distribution within
+# [RAG_ADAPTIVE_MIN_K, RAG_ADAPTIVE_MAX_K]; empty keeps the fixed RETRIEVAL_TOP_K
+ADAPTIVE_K_MODE = os.getenv("RAG_ADAPTIVE_K", "")
+ADAPTIVE_MIN_K = int(os.getenv("RAG_ADAPTIVE_MIN_K", "1"))
+ADAPTIVE_MAX_K = int(os.getenv("RAG_ADAPTIVE_MAX_K", "8"))
+# Most unique chunks kept when several retrieval sub-queries are merged into one context;
+# raised to the number of sub-queries so each keeps at least its best chunk
+MAX_MERGED_CHUNKS = int(os.getenv("RAG_MAX_MERGED_CHUNKS", "6"))
+# Sub-queries derived from a prompt's bullet list
+MAX_DERIVED_QUERIES = 8
+# Token budget for retrieved context: neighbouring chunks are merged into spans and
+# near-duplicates dropped before packing; 0 sends every retrieved chunk verbatim
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "4000"))
+# Files larger than this (bytes) are never loaded whole: they are read in blocks of
+# INGEST_BLOCK_CHARS, split incrementally and embedded / inserted INGEST_BATCH_CHUNKS
+# chunks at a time; 0 always loads the file into memory
+STREAMING_INGEST_BYTES = int(os.getenv("RAG_STREAMING_INGEST_BYTES", str(1 << 20)))
+INGEST_BLOCK_CHARS = int(os.getenv("RAG_INGEST_BLOCK_CHARS", str(1 << 18)))
+INGEST_BATCH_CHUNKS = int(os.getenv("RAG_INGEST_BATCH_CHUNKS", "64"))
+
+_chroma_clients = {}
+_chroma_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """Approximate LLM token count using llama_index's default tokenizer"""
+    return len(get_tokenizer()(text))
+
+
+def derive_retrieval_queries(prompt, subject=None, max_queries=MAX_DERIVED_QUERIES):
+    """
+    Short search queries for a long instruction prompt
+
+    The embedding model truncates long inputs, so a multi-paragraph prompt makes
+    a poor search query. This takes the bulleted data points the prompt asks for
+    (before its first markdown heading) and falls back to its first sentence.
+
+    Args:
+        prompt (str): Generation prompt
+        subject (str, optional): Prefixed to every query, e.g. the company name
+        max_queries (int): Most queries returned
+
+    Returns:
+        List[str]: Retrieval queries
+    """
+    head = prompt.split("###", 1)[0]
+    items = []
+    for line in head.splitlines():
+        match = re.match(r"^\s*(?:[-*]|\d+\.)\s+(.+)$", line)
+        if match:
+            item = " ".join(match.group(1).replace("**", "").split()).rstrip(":")
+            if item and item not in items:
+                items.append(item)
+
+    if not items:
+        first_sentence = re.split(r"(?<=[.!?])\s", " ".join(prompt.split()), maxsplit=1)[0]
+        items = [" ".join(first_sentence.split()[:32])]
+
+    prefix = f"{subject} " if subject else ""
+    return [prefix + item for item in items[:max_queries]]
+
+
+def get_chroma_client(path=CHROMA_PATH):
+    """Process-wide Chroma client per path; concurrent PersistentClient construction races inside chromadb"""
+    with _chroma_lock:
+        client = _chroma_clients.get(path)
+        if client is None:
+            client = chromadb.PersistentClient(path=path)
+            _chroma_clients[path] = client
+        return client
+
+
+def find_chroma_collection(name, path=CHROMA_PATH):
+    """Existing Chroma collection, or None; unlike get_or_create_collection, never creates one"""
+    try:
+        return get_chroma_client(path).get_collection(str(name))
+    except (ValueError, ChromaError):
+        # Missing collection: ValueError in older chromadb, NotFoundError in newer
+        return None
+
+
+def _text_blocks(text, block_chars=INGEST_BLOCK_CHARS):
+    """text in the same blocks a streamed file is read in"""
+    return (text[start:start + block_chars] for start in range(0, len(text), block_chars))
+
+
+def _chunk_node(chunk, i, total_chunks, doc_metadata):
+    """Node for the i-th chunk of a content-addressed document"""
+    doc_id = doc_metadata["doc_id"]
+    metadata = {
+        **doc_metadata,
+        "chunk_id": f"{doc_id}-chunk-{i}",
+        "chunk_index": i,
+        "total_chunks": total_chunks,
+    }
+    node = TextNode(
+        id_=f"{doc_id}-chunk-{i}",
+        text=chunk,
+        metadata=metadata,
+        relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=doc_id)},
+    )
+    # Bookkeeping ids must not leak into the embedded text, otherwise
+    # identical chunks never hit the embedding cache
+    node.excluded_embed_metadata_keys = list(metadata.keys())
+    return node
+
+
 class RAG:
-    def __init__(self, text_or_path):
+    def __init__(self, text_or_path, embed_model_name=DEFAULT_EMBED_MODEL, ephemeral=False, llm=None):
         logger.info("Initializing RAG")
+        # Reused for every generation; Chat draws on the pooled keep-alive client
+        self.llm = llm if llm is not None else Chat()
+        # Ephemeral instances keep their indexes in process memory instead of ./chroma_db
+        self.ephemeral = ephemeral
+        self.ephemeral_indexes = {}
+        # Kept so checkpoints can refer to the document instead of embedding its text
+        self.source_path = None
+        # Large files stay on disk; only text appended later (web results) is held in memory
+        self.streamed = False
+        self._appended_text = ""
+        # sha256 of the streamed source file, filled by the first pass over it
+        self._source_digest = None
+        # Set on instances rebuilt from stored chunks: their text is not the original
+        # document, so create_db must not ingest it again under new chunk ids
+        self.read_only = False
         
         if os.path.isfile(text_or_path):  
-            try:
-                with open(text_or_path, 'r', encoding='utf-8') as file:
-                    self.text = file.read()
-                logger.info(f"Loaded text from file: {text_or_path}")
-            except FileNotFoundError:
-                logger.error(f"Text file not found at {text_or_path}")
-                self.text = None
+            self.source_path = os.path.abspath(text_or_path)
+            size = os.path.getsize(text_or_path)
+            if STREAMING_INGEST_BYTES and size > STREAMING_INGEST_BYTES:
+                self.streamed = True
+                self._text = None
+                logger.info(f"Streaming text from file: {text_or_path} ({size / (1 << 20):.1f} MB)")
+            else:
+                try:
+                    with open(text_or_path, 'r', encoding='utf-8') as file:
+                        self._text = file.read()
+                    logger.info(f"Loaded text from file: {text_or_path}")
+                except FileNotFoundError:
+                    logger.error(f"Text file not found at {text_or_path}")
+                    self._text = None
         else:
-            self.text = text_or_path
+            self._text = text_or_path
             logger.info("Loaded text from string input")
 
-        self.embed_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        logger.info("Initialized embedding model: sentence-transformers/all-MiniLM-L6-v2")
+        # Shared per-process handle; the weights are only loaded by the first RAG
+        self.embed_model_name = embed_model_name
+        self.embed_model = get_embedding_model(embed_model_name)
+        self.embedding_cache = get_embedding_cache()
+        # BM25 postings for persistent collections, maintained alongside the vectors
+        self.keyword_index = get_keyword_index()
+        logger.info(f"Using shared embedding model: {embed_model_name}")
         Settings.embed_model = self.embed_model
         Settings.chunk_size = 1000
         Settings.chunk_overlap = 100
@@ -49,10 +211,114 @@ class RAG:
             self.prompts = yaml.safe_load(file)["RAG_prompts"]
         logger.info(f"Loaded prompts from {prompts_path}")
     
+    @property
+    def text(self):
+        """Full document text; a streamed document is read from disk on every access"""
+        if not self.streamed:
+            return self._text
+        with open(self.source_path, 'r', encoding='utf-8') as file:
+            return file.read() + self._appended_text
+
+    @text.setter
+    def text(self, value):
+        self._text = value
+        self.streamed = False
+        self._appended_text = ""
+
+    @property
+    def has_text(self):
+        return self.streamed or bool(self._text)
+
+    def append_text(self, text):
+        """Add text (e.g. web search results) to the document without re-reading a streamed file"""
+        if self.streamed:
+            self._appended_text += text
+        else:
+            self._text = (self._text or "") + text
+
+    def _iter_file_blocks(self, block_chars=INGEST_BLOCK_CHARS):
+        with open(self.source_path, 'r', encoding='utf-8') as file:
+            yield from iter(lambda: file.read(block_chars), "")
+
+    def _file_digest(self):
+        """sha256 of the source file's text, hashed block by block on first use"""
+        if self._source_digest is None:
+            digest = hashlib.sha256()
+            for block in self._iter_file_blocks():
+                digest.update(block.encode("utf-8"))
+            self._source_digest = digest
+        return self._source_digest.copy()
+
+    def text_fingerprint(self):
+        """text_hash of self.text without loading a streamed document"""
+        if not self.streamed:
+            return text_hash(self._text or "")
+        digest = self._file_digest()
+        digest.update(self._appended_text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _iter_chunks(self, blocks, stats=None):
+        """
+        Chunk texts of a document given as consecutive blocks, holding about
+        one block of it in memory
+
+        The last chunk of each block may stop mid-sentence, so it is carried
+        over and split again together with the next block. Loaded and streamed
+        documents are both cut into INGEST_BLOCK_CHARS blocks, so the same text
+        always yields the same chunks under the same chunk ids.
+        """
+        splitter = SentenceSplitter(chunk_size=1000, chunk_overlap=100)
+        carry = ""
+        for block in blocks:
+            buffer = carry + block
+            if stats is not None:
+                stats["peak_buffer_chars"] = max(stats.get("peak_buffer_chars", 0), len(buffer))
+            chunks = splitter.split_text(buffer)
+            carry = chunks.pop() if chunks else ""
+            yield from chunks
+        if carry.strip():
+            yield from splitter.split_text(carry)
+
+    def _spool_file_chunks(self, spool, stats=None):
+        """
+        Chunk the source file in a single read, writing one JSON-encoded chunk
+        per line to spool and fingerprinting the file on the way
+
+        Returns:
+            Tuple[str, int]: doc_id of the file's text and its number of chunks
+        """
+        digest = hashlib.sha256()
+
+        def hashed_blocks():
+            for block in self._iter_file_blocks():
+                digest.update(block.encode("utf-8"))
+                yield block
+
+        total_chunks = 0
+        for chunk in self._iter_chunks(hashed_blocks(), stats):
+            spool.write(json.dumps(chunk) + "\n")
+            total_chunks += 1
+        self._source_digest = digest
+        spool.seek(0)
+        return digest.hexdigest(), total_chunks
+
+    def _iter_spooled_node_batches(self, spool, doc_id, total_chunks, batch_size=INGEST_BATCH_CHUNKS):
+        """Nodes of the chunks in spool in batches of at most batch_size"""
+        doc_metadata = {"source": "text", "section_id": 1, "doc_id": doc_id}
+        batch = []
+        for i, line in enumerate(spool):
+            batch.append(_chunk_node(json.loads(line), i, total_chunks, doc_metadata))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     def prepare_documents_from_text(self, text):
         logger.info("Preparing documents from text")
         documents = []
-        doc_id = str(uuid.uuid4())
+        # Content-addressed id: the same text always maps to the same chunk ids
+        doc_id = text_hash(text)
         section_id = 1
         documents.append({
             "content": text,
@@ -69,73 +335,292 @@ class RAG:
        
         logger.info(f"Processing {len(docs)} documents into LlamaIndex format")
        
-        splitter = SentenceSplitter(chunk_size=1000, chunk_overlap=100)
         llama_nodes = []
         for doc in docs:
-            llama_doc = Document(
-                text=doc["content"],
-                metadata=doc["metadata"]
+            chunks = list(self._iter_chunks(_text_blocks(doc["content"])))
+            llama_nodes.extend(
+                _chunk_node(chunk, i, len(chunks), doc["metadata"]) for i, chunk in enumerate(chunks)
             )
-            nodes = splitter.get_nodes_from_documents([llama_doc])
-            for i, node in enumerate(nodes):
-                node.metadata.update({
-                    "chunk_id": f"{doc['metadata']['doc_id']}-chunk-{i}",
-                    "chunk_index": i,
-                    "total_chunks": len(nodes)
-                })
-            
-            llama_nodes.extend(nodes)
         
         logger.info(f"Created {len(llama_nodes)} total nodes from documents")
         return llama_nodes
-    
-    def create_db(self, db_name):
-        logger.info(f"Creating vector database: {db_name}")
 
-        documents = self.prepare_documents_from_text(self.text)
-        llama_nodes = self.process_documents(documents)
+    def embed_texts(self, texts):
+        """Embed texts, running the model only on cache misses"""
+        if not texts:
+            return []
 
-        chroma_client = chromadb.PersistentClient(path="./chroma_db")
-        chroma_collection = chroma_client.get_or_create_collection(db_name)
+        vectors = self.embedding_cache.get_many(self.embed_model_name, texts)
+        miss_positions = [i for i, vector in enumerate(vectors) if vector is None]
 
-        logger.info(f"Created Chroma collection: {db_name}")
+        if miss_positions:
+            miss_texts = [texts[i] for i in miss_positions]
+            new_vectors = self.embed_model.embed_documents(miss_texts)
+            self.embedding_cache.put_many(self.embed_model_name, miss_texts, new_vectors)
+            for i, vector in zip(miss_positions, new_vectors):
+                vectors[i] = vector
+
+        stats = self.embedding_cache.stats()
+        logger.info(
+            f"Embedded {len(texts)} texts: {len(texts) - len(miss_positions)} cache hits, "
+            f"{len(miss_positions)} misses (lifetime hit rate {stats['hit_rate']:.1%})"
+        )
+        return [list(vector) for vector in vectors]
+
+    def embed_nodes(self, nodes):
+        """Attach embeddings to nodes, running the model only on cache misses"""
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        for node, vector in zip(nodes, self.embed_texts(texts)):
+            node.embedding = vector
+        return nodes
+
+    def text_novelty(self, db_name, text, seen_vectors=None):
+        """
+        How much of text is not already covered by collection db_name
+
+        text is split exactly as update_db would split it, so its chunk
+        embeddings are cached for the later insert. Each chunk's novelty is one
+        minus its cosine similarity to the nearest stored chunk (or to any of
+        seen_vectors, e.g. results accepted earlier but not yet indexed).
+
+        Args:
+            db_name (str): Chroma collection to compare against
+            text (str): Candidate text, e.g. a web search result
+            seen_vectors (List[List[float]], optional): Extra vectors counted as covered
+
+        Returns:
+            Tuple[float, List[List[float]]]: Mean chunk novelty in [0, 1] and the chunk vectors
+        """
+        nodes = self.process_documents(self.prepare_documents_from_text(text))
+        vectors = self.embed_texts([node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes])
+        if not vectors:
+            return 0.0, []
+
+        candidates = np.asarray(vectors, dtype=np.float32)
+        neighbours = list(seen_vectors or [])
+        collection = find_chroma_collection(db_name)
+        if collection is not None and collection.count():
+            nearest = collection.query(query_embeddings=vectors, n_results=1, include=["embeddings"])
+            neighbours.extend(match[0] for match in nearest["embeddings"] if len(match))
+        if not neighbours:
+            return 1.0, vectors
+
+        neighbours = np.asarray(neighbours, dtype=np.float32)
+        candidates /= np.linalg.norm(candidates, axis=1, keepdims=True) + 1e-12
+        neighbours /= np.linalg.norm(neighbours, axis=1, keepdims=True) + 1e-12
+        similarity = (candidates @ neighbours.T).max(axis=1).clip(0.0, 1.0)
+        return float((1.0 - similarity).mean()), vectors
+
+    def _filter_new_nodes(self, chroma_collection, nodes):
+        """Drop nodes whose ids are already in the collection or repeated in the batch"""
+        unique_nodes = list({node.node_id: node for node in nodes}.values())
+        existing_ids = set()
+        ids = [node.node_id for node in unique_nodes]
+        for start in range(0, len(ids), 5000):
+            existing_ids.update(chroma_collection.get(ids=ids[start:start + 5000], include=[])["ids"])
+        new_nodes = [node for node in unique_nodes if node.node_id not in existing_ids]
+        skipped = len(nodes) - len(new_nodes)
+        if skipped:
+            logger.info(f"Skipping {skipped} chunks already present in the collection")
+        return new_nodes
 
+    def _sync_keyword_index(self, chroma_collection):
+        """Backfill BM25 postings for chunks indexed before the keyword index existed"""
+        if self.keyword_index.count(chroma_collection.name) >= chroma_collection.count():
+            return
+        known = self.keyword_index.node_ids(chroma_collection.name)
+        missing = [node_id for node_id in chroma_collection.get(include=[])["ids"] if node_id not in known]
+        for start in range(0, len(missing), 5000):
+            stored = chroma_collection.get(ids=missing[start:start + 5000], include=["documents"])
+            self.keyword_index.add(chroma_collection.name, list(zip(stored["ids"], stored["documents"])))
+
+    def _open_index(self, chroma_collection):
         vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
         storage_context = StorageContext.from_defaults(vector_store=vector_store)
-
-        index = VectorStoreIndex(
-            nodes=llama_nodes,
+        index = VectorStoreIndex.from_vector_store(
+            vector_store,
             storage_context=storage_context
         )
+        self._sync_keyword_index(chroma_collection)
+        return index
+
+    def _is_fully_indexed(self, chroma_collection, doc_id):
+        """Check whether every chunk of doc_id is stored; an interrupted ingestion counts as missing"""
+        existing = chroma_collection.get(where={"doc_id": doc_id}, limit=1, include=["metadatas"])
+        if not existing["ids"]:
+            return False
+        total_chunks = existing["metadatas"][0].get("total_chunks")
+        if not isinstance(total_chunks, int):
+            return True
+        return len(chroma_collection.get(where={"doc_id": doc_id}, include=[])["ids"]) >= total_chunks
+
+    def _ingest(self, chroma_collection, text):
+        """
+        Idempotently add text to the collection and return the index over it.
+
+        If the document is already indexed the existing index is returned without
+        splitting or embedding anything. New chunks are added to the BM25 keyword
+        index in the same pass.
+        """
+        index = self._open_index(chroma_collection)
+        documents = self.prepare_documents_from_text(text)
+        if all(self._is_fully_indexed(chroma_collection, doc["metadata"]["doc_id"]) for doc in documents):
+            logger.info(f"Document already indexed in {chroma_collection.name}, reusing existing index")
+            return index, 0
+
+        new_nodes = self._filter_new_nodes(chroma_collection, self.process_documents(documents))
+        if new_nodes:
+            index.insert_nodes(self.embed_nodes(new_nodes))
+            self.keyword_index.add(
+                chroma_collection.name,
+                [(node.node_id, node.get_content(metadata_mode=MetadataMode.NONE)) for node in new_nodes],
+            )
+        return index, len(new_nodes)
+
+    def _ingest_file(self, chroma_collection):
+        """
+        Streaming counterpart of _ingest for the source file of a streamed document
+
+        The file is read once, in blocks: its chunks are fingerprinted and
+        spooled to a temporary file, then embedded and inserted a batch at a
+        time, so memory use depends on the block and batch sizes, not on the
+        document. An interrupted ingestion resumes where it stopped.
+        """
+        index = self._open_index(chroma_collection)
+        start, rss_before, stats = time.perf_counter(), resident_memory_mb(), {}
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+            # Same content address prepare_documents_from_text gives the loaded text
+            doc_id, total_chunks = self._spool_file_chunks(spool, stats)
+            if self._is_fully_indexed(chroma_collection, doc_id):
+                logger.info(f"Document already indexed in {chroma_collection.name}, reusing existing index")
+                return index, 0
+
+            added = batches = 0
+            rss_peak = resident_memory_mb()
+            for nodes in self._iter_spooled_node_batches(spool, doc_id, total_chunks):
+                new_nodes = self._filter_new_nodes(chroma_collection, nodes)
+                if new_nodes:
+                    index.insert_nodes(self.embed_nodes(new_nodes))
+                    self.keyword_index.add(
+                        chroma_collection.name,
+                        [(node.node_id, node.get_content(metadata_mode=MetadataMode.NONE)) for node in new_nodes],
+                    )
+                added += len(new_nodes)
+                batches += 1
+                rss_peak = max(rss_peak, resident_memory_mb())
+
+        logger.info(
+            f"Streamed {total_chunks} chunks of {self.source_path} into {chroma_collection.name} in {batches} "
+            f"batches of <= {INGEST_BATCH_CHUNKS} ({added} new) in {time.perf_counter() - start:.1f}s; "
+            f"peak text buffer {stats.get('peak_buffer_chars', 0) / 1024:.0f} K chars, resident memory "
+            f"{rss_before:.0f} MB before, {rss_peak:.0f} MB peak between batches (+{rss_peak - rss_before:.0f} MB)"
+        )
+        return index, added
+
+    def _create_ephemeral_db(self, db_name):
+        logger.info(f"Creating in-memory vector index: {db_name}")
+
+        storage_context = StorageContext.from_defaults(vector_store=NumpyVectorStore())
+        if self.streamed:
+            index = VectorStoreIndex(nodes=[], storage_context=storage_context)
+            with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+                doc_id, node_count = self._spool_file_chunks(spool)
+                for nodes in self._iter_spooled_node_batches(spool, doc_id, node_count):
+                    index.insert_nodes(self.embed_nodes(nodes))
+        else:
+            documents = self.prepare_documents_from_text(self.text)
+            llama_nodes = self.embed_nodes(self.process_documents(documents))
+            index = VectorStoreIndex(
+                nodes=llama_nodes,
+                storage_context=storage_context
+            )
+            node_count = len(llama_nodes)
+        self.ephemeral_indexes[db_name] = index
 
-        logger.info(f"Successfully created vector index {db_name} with {len(llama_nodes)} nodes")
+        logger.info(f"Successfully created in-memory index {db_name} with {node_count} nodes")
+        return index
+
+    def create_db(self, db_name):
+        if self.ephemeral:
+            return self._create_ephemeral_db(db_name)
+        if self.read_only:
+            logger.info(f"RAG instance for {db_name} was rebuilt from the vector store, opening it without ingesting")
+            return self.load_db(db_name)
+
+        logger.info(f"Creating vector database: {db_name}")
+
+        chroma_client = get_chroma_client()
+        chroma_collection = chroma_client.get_or_create_collection(db_name)
+
+        logger.info(f"Created Chroma collection: {db_name}")
+
+        if self.streamed:
+            index, added = self._ingest_file(chroma_collection)
+        else:
+            index, added = self._ingest(chroma_collection, self.text)
+
+        logger.info(f"Successfully created vector index {db_name} with {added} new nodes")
         return index
 
     def update_db(self, db_name, new_text):
-        logger.info(f"Updating vector database: {db_name}")
+        if self.ephemeral:
+            index = self.ephemeral_indexes[db_name]
+            new_nodes = self.embed_nodes(self.process_documents(self.prepare_documents_from_text(new_text)))
+            index.insert_nodes(new_nodes)
+            logger.info(f"Added {len(new_nodes)} new nodes to in-memory index {db_name}")
+            return index
 
-        new_documents = self.prepare_documents_from_text(new_text)
-        new_nodes = self.process_documents(new_documents)
+        logger.info(f"Updating vector database: {db_name}")
 
-        chroma_client = chromadb.PersistentClient(path="./chroma_db")
+        chroma_client = get_chroma_client()
         chroma_collection = chroma_client.get_collection(db_name)
 
         logger.info(f"Updating existing Chroma collection: {db_name}")
 
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        existing_index, added = self._ingest(chroma_collection, new_text)
 
-        # Get the existing index
-        existing_index = VectorStoreIndex.from_vector_store(
-            vector_store,
-            storage_context=storage_context
-        )
+        logger.info(f"Added {added} new nodes to {db_name}")
+        return existing_index
 
-        # Use insert_nodes method instead of insert for each node
-        existing_index.insert_nodes(new_nodes)
+    def hybrid_retriever(self, db_name, index=None, similarity_top_k=RETRIEVAL_TOP_K, candidate_k=HYBRID_CANDIDATES):
+        """
+        Retriever fusing vector similarity with BM25 over collection db_name
 
-        logger.info(f"Added {len(new_nodes)} new nodes to {db_name}")
-        return existing_index
+        Args:
+            db_name (str): Chroma collection name
+            index (VectorStoreIndex, optional): Index over the collection; opened if omitted
+            similarity_top_k (int): Chunks returned per query
+            candidate_k (int): Candidates taken from each ranking before fusion
+
+        Returns:
+            HybridRetriever: Drop-in replacement for index.as_retriever()
+        """
+        index = index if index is not None else self.load_db(db_name)
+        return HybridRetriever(
+            index.as_retriever(similarity_top_k=candidate_k),
+            self.keyword_index,
+            get_chroma_client().get_collection(str(db_name)),
+            similarity_top_k=similarity_top_k,
+            candidate_k=candidate_k,
+        )
+
+    def make_retriever(self, db_name, index=None):
+        """
+        Retriever over db_name in the configured RETRIEVAL_MODE (in-memory indexes are vector only),
+        choosing k per query when ADAPTIVE_K_MODE is set
+        """
+        top_k = ADAPTIVE_MAX_K if ADAPTIVE_K_MODE else RETRIEVAL_TOP_K
+        if self.ephemeral or RETRIEVAL_MODE != "hybrid":
+            if index is None:
+                index = self.ephemeral_indexes[db_name] if self.ephemeral else self.load_db(db_name)
+            retriever = index.as_retriever(similarity_top_k=top_k)
+        else:
+            retriever = self.hybrid_retriever(
+                db_name, index, similarity_top_k=top_k, candidate_k=max(HYBRID_CANDIDATES, top_k)
+            )
+        if ADAPTIVE_K_MODE:
+            return AdaptiveTopKRetriever(retriever, min_k=ADAPTIVE_MIN_K, max_k=ADAPTIVE_MAX_K, mode=ADAPTIVE_K_MODE)
+        return retriever
 
     def create_retriever(self, db_name):
         logger.info(f"Creating retriever for database: {db_name}")
@@ -144,56 +629,110 @@ class RAG:
         if isinstance(db_name, VectorStoreIndex):
             logger.info(f"Using provided index as retriever")
             return db_name.as_retriever()
+
+        if db_name in self.ephemeral_indexes:
+            return self.ephemeral_indexes[db_name].as_retriever()
         
         # Otherwise, try to load from the database
         try:
-            chroma_client = chromadb.PersistentClient(path="./chroma_db")
-            chroma_collection = chroma_client.get_collection(name=str(db_name))
-            
-            vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-            index = VectorStoreIndex.from_vector_store(vector_store)
-            
+            retriever = self.make_retriever(db_name)
             logger.info(f"Successfully created retriever from database: {db_name}")
-            return index.as_retriever()
+            return retriever
         except Exception as e:
             logger.error(f"Error creating retriever for {db_name}: {e}")
             raise
 
-    def rag_query(self, query_text, retriever):
-        query_id = str(uuid.uuid4())
-        logger.info(f"Processing query: {query_id} - '{query_text}'")
-        
-        retrieval_result = retriever.retrieve(query_text)
-        logger.info(f"Retrieved {len(retrieval_result)} relevant nodes")
-        
+    @classmethod
+    def from_db(cls, db_name, source_path=None, embed_model_name=DEFAULT_EMBED_MODEL, llm=None):
+        """
+        Rebuild a RAG instance for an existing collection, e.g. when resuming a run
+
+        The text is re-read from source_path; if that file is gone it is
+        reassembled from the chunks stored in the collection and the instance
+        is read-only (create_db opens the collection instead of ingesting).
+        """
+        if source_path and os.path.isfile(source_path):
+            return cls(source_path, embed_model_name=embed_model_name, llm=llm)
+
+        logger.warning(f"Source document for {db_name} not available, rebuilding text from stored chunks")
+        chroma_client = get_chroma_client()
+        stored = chroma_client.get_collection(name=str(db_name)).get(include=["documents", "metadatas"])
+        chunks = sorted(
+            zip(stored["metadatas"], stored["documents"]),
+            key=lambda item: (item[0].get("doc_id", ""), item[0].get("chunk_index", 0)),
+        )
+        rag_instance = cls("\n".join(text for _, text in chunks), embed_model_name=embed_model_name, llm=llm)
+        rag_instance.read_only = True
+        return rag_instance
+
+    def load_db(self, db_name):
+        """
+        Open the index over an existing Chroma collection without ingesting anything
+
+        Raises if the collection does not exist.
+        """
+        chroma_client = get_chroma_client()
+        chroma_collection = chroma_client.get_collection(name=str(db_name))
+        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+        return VectorStoreIndex.from_vector_store(vector_store)
+
+    def _format_context(self, entries):
+        """Prompt context and source document list for (text, metadata) entries"""
         context_parts = []
         source_documents = []
         
-        # Sort nodes by their chunk index to maintain original document order
-        sorted_nodes = sorted(retrieval_result, key=lambda node: node.metadata.get('chunk_index', 0))
-        
-        for i, node in enumerate(sorted_nodes):
-            source_type = node.metadata.get('source', 'unknown')
-            doc_id = node.metadata.get('doc_id', 'unknown')
-            chunk_index = node.metadata.get('chunk_index', 'N/A')
-            total_chunks = node.metadata.get('total_chunks', 'N/A')
+        for text, metadata in entries:
+            source_type = metadata.get('source', 'unknown')
+            doc_id = metadata.get('doc_id', 'unknown')
+            chunk_index = metadata.get('chunk_index', 'N/A')
+            total_chunks = metadata.get('total_chunks', 'N/A')
+            chunk_end = metadata.get('chunk_end', chunk_index)
+            chunks = f"Chunk {chunk_index}" if chunk_end == chunk_index else f"Chunks {chunk_index}-{chunk_end}"
             
             context_parts.append(
-                f"[Document {doc_id} - Chunk {chunk_index}/{total_chunks}] {source_type.capitalize()}: {node.text}"
+                f"[Document {doc_id} - {chunks}/{total_chunks}] {source_type.capitalize()}: {text}"
             )
             
             source_documents.append({
-                "page_content": node.text,
-                "metadata": node.metadata
+                "page_content": text,
+                "metadata": metadata
             })
         
-        context = "\n\n".join(context_parts)
+        logger.debug(f"Built context from {len(context_parts)} documents")
+        return "\n\n".join(context_parts), source_documents
+
+    def _build_context(self, retrieval_result, max_tokens=CONTEXT_TOKEN_BUDGET):
+        """Format retrieved nodes into the prompt context and the source document list"""
+        # Sort nodes by their chunk index to maintain original document order
+        sorted_nodes = sorted(retrieval_result, key=lambda node: node.metadata.get('chunk_index', 0))
+        context, source_documents = self._format_context((node.text, node.metadata) for node in sorted_nodes)
+        if max_tokens <= 0 or not retrieval_result:
+            return context, source_documents
+
+        chunks = [{"text": node.text, "metadata": node.metadata} for node in retrieval_result]
+        # Chunk vectors come from the embedding cache filled at ingestion
+        vectors = None
+        if len(chunks) > 1:
+            vectors = np.asarray(self.embed_texts(
+                [node.node.get_content(metadata_mode=MetadataMode.EMBED) for node in retrieval_result]
+            ))
+        spans, stats = pack_chunks(chunks, vectors, [count_tokens(chunk["text"]) for chunk in chunks], max_tokens)
+        packed_context, packed_documents = self._format_context((span["text"], span["metadata"]) for span in spans)
+
+        full_tokens, packed_tokens = count_tokens(context), count_tokens(packed_context)
+        logger.info(
+            f"Packed {len(chunks)} chunks into {len(spans)} spans: {full_tokens} -> {packed_tokens} context tokens "
+            f"(saved {full_tokens - packed_tokens} input tokens; dropped {stats['duplicates']} near-duplicates, "
+            f"{stats['over_budget']} over the {max_tokens}-token budget)"
+        )
+        return packed_context, packed_documents
+
+    def _generate(self, query_id, query_text, context, source_documents):
+        """Run the generation call for an already assembled context"""
         prompt = self.prompts['human_message'].format(query_text=query_text, context=context)
-        logger.debug(f"Generated prompt with context from {len(context_parts)} documents")
         message = [HumanMessage(content=prompt)]
         logger.info("Invoking LLM for response generation")
-        llm = Chat()
-        updated_messages, input_tokens, output_tokens = llm.invoke_llm_langchain(messages=message)
+        updated_messages, input_tokens, output_tokens = self.llm.invoke_llm_langchain(messages=message)
         logger.info(f"Generated response: {input_tokens} input tokens, {output_tokens} output tokens")
         
         return {
@@ -205,6 +744,124 @@ class RAG:
             "output_tokens": output_tokens
         }
 
+    def rag_query(self, query_text, retriever, retrieval_queries=None):
+        """
+        Answer query_text from retrieved context
+
+        Args:
+            query_text (str): Question or instruction for the LLM
+            retriever: Retriever returned by make_retriever / index.as_retriever()
+            retrieval_queries (List[str], optional): Short search queries used instead of
+                query_text for retrieval; their chunks are merged into one context
+
+        Returns:
+            Dict: Result, source documents and token counts
+        """
+        query_id = str(uuid.uuid4())
+        logger.info(f"Processing query: {query_id} - '{query_text}'")
+
+        if retrieval_queries:
+            retrieval_result = self.retrieve_merged(retrieval_queries, retriever)
+        else:
+            retrieval_result = retriever.retrieve(query_text)
+        logger.info(f"Retrieved {len(retrieval_result)} relevant nodes")
+        
+        context, source_documents = self._build_context(retrieval_result)
+        return self._generate(query_id, query_text, context, source_documents)
+
+    def _retrieve_each(self, queries, retriever):
+        """Retrieved nodes per query, embedding all queries in a single pass"""
+        query_embeddings = self.embed_model.embed_queries(list(queries))
+        return [
+            retriever.retrieve(QueryBundle(query_str=query_text, embedding=embedding))
+            for query_text, embedding in zip(queries, query_embeddings)
+        ]
+
+    def retrieve_merged(self, queries, retriever, max_chunks=None):
+        """
+        Retrieve for several sub-queries and merge the results into one node list
+
+        Nodes are deduplicated and interleaved by rank (every query's best hit
+        first), so each sub-query is represented before any gets a second chunk.
+
+        Args:
+            queries (List[str]): Retrieval sub-queries
+            retriever: Retriever returned by make_retriever / index.as_retriever()
+            max_chunks (int, optional): Most unique nodes returned, 0 keeps all; defaults to
+                MAX_MERGED_CHUNKS or the number of queries, whichever is larger
+
+        Returns:
+            List[NodeWithScore]: Merged nodes
+        """
+        if max_chunks is None:
+            max_chunks = max(MAX_MERGED_CHUNKS, len(queries)) if MAX_MERGED_CHUNKS > 0 else 0
+        per_query = self._retrieve_each(queries, retriever)
+        merged = {}
+        for rank in range(max((len(nodes) for nodes in per_query), default=0)):
+            for nodes in per_query:
+                if rank < len(nodes):
+                    merged.setdefault(nodes[rank].node.node_id, nodes[rank])
+        nodes = list(merged.values())
+        if max_chunks > 0:
+            nodes = nodes[:max_chunks]
+        logger.info(
+            f"Merged {sum(len(nodes) for nodes in per_query)} chunks from {len(queries)} sub-queries "
+            f"into {len(nodes)} unique chunks"
+        )
+        return nodes
+
+    def retrieve_batch(self, queries, retriever):
+        """
+        Retrieve context for several queries with a single embedding pass
+
+        Returns:
+            List[Tuple[str, List[Dict]]]: (context, source_documents) per query, in input order
+        """
+        contexts = [self._build_context(nodes) for nodes in self._retrieve_each(queries, retriever)]
+        logger.info(f"Retrieved context for {len(queries)} queries with one embedding pass")
+        return contexts
+
+    def answer_with_context(self, query_text, context, source_documents):
+        """Generate a rag_query-style response from context that was already retrieved"""
+        return self._generate(str(uuid.uuid4()), query_text, context, source_documents)
+
+    def direct_context_tokens(self, query_text):
+        """Most document tokens that fit in one prompt for query_text, capped at DIRECT_CONTEXT_TOKENS"""
+        prompt_tokens = count_tokens(self.prompts['human_message'].format(query_text=query_text, context=""))
+        return max(0, min(DIRECT_CONTEXT_TOKENS, LLM_CONTEXT_TOKENS - LLM_ANSWER_TOKENS - prompt_tokens))
+
+    def budgeted_query(self, query_text, db_name, max_context_tokens=None):
+        """
+        Answer query_text over self.text, skipping retrieval when the text fits the prompt
+
+        Args:
+            query_text (str): Question or instruction for the LLM
+            db_name (str): Index name to build if retrieval is needed
+            max_context_tokens (int, optional): Largest text sent to the LLM verbatim;
+                defaults to direct_context_tokens(query_text)
+
+        Returns:
+            Dict: rag_query response with an extra "path" key ("direct" or "retrieval")
+        """
+        if max_context_tokens is None:
+            max_context_tokens = self.direct_context_tokens(query_text)
+        # Streamed documents are far larger than any prompt and are not read to count them
+        text_tokens = None if self.streamed else count_tokens(self.text or "")
+        if text_tokens is not None and text_tokens <= max_context_tokens:
+            query_id = str(uuid.uuid4())
+            logger.info(f"Processing query: {query_id} directly, text fits the prompt ({text_tokens} <= {max_context_tokens} tokens)")
+            source_documents = [{"page_content": self.text, "metadata": {"source": "text"}}]
+            response = self._generate(query_id, query_text, self.text, source_documents)
+            response["path"] = "direct"
+            return response
+
+        size = f"{text_tokens} tokens" if text_tokens is not None else "a streamed document"
+        logger.info(f"Text is {size} (> {max_context_tokens} tokens), falling back to retrieval")
+        index = self.create_db(db_name=db_name)
+        response = self.rag_query(query_text=query_text, retriever=self.make_retriever(db_name, index))
+        response["path"] = "retrieval"
+        return response
+
 if __name__ == "__main__":
     company_docs = {
         "company_a": "/home/naba/Desktop/backend/RIL-Integrated-Annual-Report-2023-24_parsed.txt",
@@ -220,7 +877,7 @@ if __name__ == "__main__":
         rag_instances[company] = RAG(text_path)
         indexes[company] = rag_instances[company].create_db(db_name=str(company))
         # Get the retriever from the index
-        retrievers[company] = indexes[company].as_retriever()
+        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
     
     while True:
         action = input("Enter 'query' to ask a question, 'update' to add new data, or 'q' to quit: ").strip().lower()
@@ -262,7 +919,7 @@ if __name__ == "__main__":
             logger.info(f"Updating database for {company} with new content")
             rag_instances[company].text = new_text
             indexes[company] = rag_instances[company].update_db(db_name=str(company), new_text=new_text)
-            retrievers[company] = indexes[company].as_retriever()
+            retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
             print(f"Updated vector database for {company}.")
         
         elif action == 'query':
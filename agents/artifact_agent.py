@@ -0,0 +1,155 @@
+import logging
+from typing import Any, Dict, Optional
+from agents.states import MnAagentState
+from utils.artifact_store import (
+    ArtifactStore,
+    artifact_store_disabled_by_env,
+    company_prompt_version,
+    document_hash,
+    get_artifact_store,
+)
+from utils.chat_test import DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Nodes whose token usage is charged to a company's stored analysis
+COMPANY_ANALYSIS_NODES = [
+    "DCF_modelling",
+    "financial_ratios",
+    "financial_reporting",
+    "supply_chain_analysis",
+    "industry_positioning",
+    "operations_reporting",
+]
+# Artifacts a complete analysis has; search results may legitimately be empty
+REQUIRED_ARTIFACTS = [
+    "fin_report",
+    "ops_report",
+    "dcf_model",
+    "financial_ratios",
+    "supply_chain_analysis",
+    "industry_position",
+]
+
+
+class ArtifactAgentNodes:
+    def __init__(self, state: MnAagentState, company: str, store: Optional[ArtifactStore] = None,
+                 model: str = DEFAULT_MODEL):
+        """
+        Load a company's standalone analysis from the artifact store, or save it once generated
+
+        Args:
+            state (MnAagentState): The current state of the multi-agent process
+            company (str): 'a' or 'b'
+            store (ArtifactStore, optional): Defaults to the process-wide store
+            model (str): Model the analysis is generated with
+        """
+        self.state = state
+        self.company = company
+        self.company_name = state.company_a_name if company == "a" else state.company_b_name
+        self.company_doc = state.company_a_doc if company == "a" else state.company_b_doc
+        self.store = store if store is not None else get_artifact_store()
+        self.model = model
+        self.prompt_version = company_prompt_version()
+        self._doc_hash = None
+
+    @property
+    def doc_hash(self) -> str:
+        if self._doc_hash is None:
+            self._doc_hash = document_hash(self.company_doc)
+        return self._doc_hash
+
+    def _collect(self, state: MnAagentState) -> Dict[str, Any]:
+        return {
+            "fin_report": getattr(state, f"fin_report_{self.company}"),
+            "ops_report": getattr(state, f"ops_report_{self.company}"),
+            "dcf_model": state.dcf_models.get(self.company_name),
+            "financial_ratios": state.financial_ratios.get(self.company_name),
+            "supply_chain_analysis": state.supply_chain_analyst.get(self.company_name),
+            "industry_position": state.industry_position.get(self.company_name),
+            "search_results": getattr(state, f"search_results_{self.company}"),
+        }
+
+    def _restore(self, artifacts: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            f"fin_report_{self.company}": artifacts["fin_report"],
+            f"ops_report_{self.company}": artifacts["ops_report"],
+            f"search_results_{self.company}": artifacts["search_results"],
+            "dcf_models": {self.company_name: artifacts["dcf_model"]},
+            "financial_ratios": {self.company_name: artifacts["financial_ratios"]},
+            "supply_chain_analyst": {self.company_name: artifacts["supply_chain_analysis"]},
+            "industry_position": {self.company_name: artifacts["industry_position"]},
+        }
+
+    def load_artifacts(self, state: MnAagentState) -> Dict[str, Any]:
+        """
+        Restore the newest stored analysis of this company's document, if any
+
+        Args:
+            state (MnAagentState): Current state of the multi-agent process
+
+        Returns:
+            Dict[str, Any]: The company's reports, analyses and artifact version on a hit
+        """
+        update = {"current_step": "load_artifacts"}
+        if artifact_store_disabled_by_env():
+            return update
+
+        entry = self.store.latest(self.company_name, self.doc_hash, model=self.model, prompt_version=self.prompt_version)
+        if entry is None:
+            logger.info(f"No stored analysis for {self.company_name} (prompts {self.prompt_version}), generating it")
+            return update
+
+        logger.info(
+            f"Loaded stored analysis v{entry['version']} for {self.company_name}, skipping research, "
+            f"financial and operations nodes (~{entry['input_tokens'] + entry['output_tokens']} tokens saved)"
+        )
+        return {
+            **update,
+            **self._restore(entry["artifacts"]),
+            "artifact_versions": {self.company_name: entry["version"]},
+        }
+
+    def route_after_load(self, state: MnAagentState) -> str:
+        """Skip the company pipeline when load_artifacts restored it"""
+        return "loaded" if self.company_name in state.artifact_versions else "generate"
+
+    def save_artifacts(self, state: MnAagentState) -> Dict[str, Any]:
+        """
+        Store the analysis just generated for this company; no-op when it was
+        loaded, when the run failed or when part of the analysis is missing
+
+        Args:
+            state (MnAagentState): Current state of the multi-agent process
+
+        Returns:
+            Dict[str, Any]: The saved version under artifact_versions, when one was saved
+        """
+        update = {"current_step": "save_artifacts"}
+        if self.company_name in state.artifact_versions:
+            return update
+
+        if state.error:
+            logger.warning(f"Not storing analysis for {self.company_name}: the run failed ({state.error})")
+            return update
+        artifacts = self._collect(state)
+        missing = [name for name in REQUIRED_ARTIFACTS if not artifacts[name]]
+        if missing:
+            logger.warning(f"Not storing analysis for {self.company_name}: missing {', '.join(missing)}")
+            return update
+
+        usage = [state.token_usage.get(f"{node}_{self.company_name}", {}) for node in COMPANY_ANALYSIS_NODES]
+        try:
+            update["artifact_versions"] = {self.company_name: self.store.save(
+                self.company_name,
+                self.doc_hash,
+                artifacts,
+                model=self.model,
+                prompt_version=self.prompt_version,
+                input_tokens=sum(entry.get("input_tokens", 0) for entry in usage),
+                output_tokens=sum(entry.get("output_tokens", 0) for entry in usage),
+            )}
+        except Exception as e:
+            # The analysis is already in the state; only reuse by later deals is lost
+            logger.error(f"Could not store analysis for {self.company_name}: {e}")
+        return update
@@ -1,9 +1,12 @@
 from pydantic import BaseModel, Field
 from typing import TypedDict, Dict, List, Any, Optional
 from agents.states import MnAagentState
+from agents.resources import get_resource_registry
 from datetime import datetime
 from langchain_core.runnables.graph import CurveStyle, MermaidDrawMethod, NodeStyles
+from agents.rag_queries import MemoizedRAGQueryMixin
 from RAG.rag_llama import RAG
+from utils.node_memo import get_node_memo
 import logging
 import os
 from langgraph.graph import StateGraph, END
@@ -18,14 +21,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class FinAgentNodes:
-    def __init__(self, state: MnAagentState, company: str, approval: bool):
+class FinAgentNodes(MemoizedRAGQueryMixin):
+    def __init__(self, state: MnAagentState, company: str, approval: bool, llm=None):
         self.state = state
         self.approval = approval
+        # Shared Chat client handed to the scratch RAG instances
+        self.llm = llm
         if company == 'a':
             self.company_name = state.company_a_name
         else:
             self.company_name = state.company_b_name
+        self.company_doc = state.company_a_doc if company == 'a' else state.company_b_doc
+        self.search_results_key = "search_results_a" if company == 'a' else "search_results_b"
+        self.memo = get_node_memo()
+        self.resources = get_resource_registry()
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
         prompts_path = os.path.join(project_root, "utils", "prompts.yaml")
@@ -33,23 +42,25 @@ class FinAgentNodes:
             self.prompts = yaml.safe_load(file)["Fin_Agent_prompt"]
         logger.info(f"Loaded prompts from {prompts_path}")
 
-    def DCF_modelling(self, state: MnAagentState) -> MnAagentState:
+    def DCF_modelling(self, state: MnAagentState) -> Dict[str, Any]:
         """do DCF modelling for the company"""
-        self.state.current_step = "DCF_modelling"
-        state.dcf_models[self.company_name] = "DCF model:\n"
-        response = self.state.rag_instances[self.company_name].rag_query(query_text=self.prompts["dcf_prompt"].format(company_name=self.company_name),retriever=self.state.retrievers[self.company_name])
-        state.dcf_models[self.company_name] = state.dcf_models[self.company_name].join(response["result"])
-        return state
+        result, usage = self._memoized_rag_query(state, "DCF_modelling", "dcf_prompt")
+        return {
+            "current_step": "DCF_modelling",
+            "dcf_models": {self.company_name: "DCF model:\n" + result},
+            "token_usage": {f"DCF_modelling_{self.company_name}": usage},
+        }
     
-    def financial_ratios(self, state: MnAagentState) -> MnAagentState:
+    def financial_ratios(self, state: MnAagentState) -> Dict[str, Any]:
         """Calculate financial ratios for the company"""
-        state.current_step = "financial_ratios"
-        state.financial_ratios[self.company_name] = "Financial Ratios:\n"
-        response = self.state.rag_instances[self.company_name].rag_query(query_text=self.prompts["financial_ratios_prompt"].format(company_name=self.company_name),retriever=self.state.retrievers[self.company_name])
-        state.financial_ratios[self.company_name] = state.financial_ratios[self.company_name].join(response["result"])
-        return state
+        result, usage = self._memoized_rag_query(state, "financial_ratios", "financial_ratios_prompt")
+        return {
+            "current_step": "financial_ratios",
+            "financial_ratios": {self.company_name: "Financial Ratios:\n" + result},
+            "token_usage": {f"financial_ratios_{self.company_name}": usage},
+        }
     
-    def financial_reporting(self, state: MnAagentState) -> MnAagentState:
+    def financial_reporting(self, state: MnAagentState) -> Dict[str, Any]:
         """Generate financial reports for the company"""
         try:
             # Combine financial ratios and DCF models safely
@@ -59,23 +70,13 @@ class FinAgentNodes:
             ])
             
             # Create RAG instance safely
-            rag_instances = RAG(combined_data)
-            
-            indexes = rag_instances.create_db(db_name=str(self.company_name))
-            retrievers = indexes.as_retriever()
+            rag_instances = RAG(combined_data, ephemeral=True, llm=self.llm)
             
-            state.current_step = "financial_reporting"
-            response = rag_instances.rag_query(
+            response = rag_instances.budgeted_query(
                 query_text=self.prompts["financial_reporting_prompt"].format(company_name=self.company_name),
-                retriever=retrievers
+                db_name=str(self.company_name)
             )
-            
-            # Assign report based on company
-            if self.company_name == state.company_a_name:
-                state.fin_report_a = response["result"]
-            else:
-                state.fin_report_b = response["result"]
-            
+
             # Create output directory and save report
             output_dir = "report"
             os.makedirs(output_dir, exist_ok=True)
@@ -84,25 +85,35 @@ class FinAgentNodes:
             with open(output_path, "w", encoding="utf-8") as f:
                 f.write(response["result"])
             
-            return state
+            # Assign report based on company
+            report_key = "fin_report_a" if self.company_name == state.company_a_name else "fin_report_b"
+            return {
+                "current_step": "financial_reporting",
+                report_key: response["result"],
+                "context_paths": {f"financial_reporting_{self.company_name}": response["path"]},
+                "token_usage": {
+                    f"financial_reporting_{self.company_name}": {
+                        "input_tokens": response["input_tokens"],
+                        "output_tokens": response["output_tokens"],
+                    }
+                },
+            }
         
         except Exception as e:
             logger.error(f"Error in financial reporting for {self.company_name}: {e}")
             # Optional: You might want to raise the exception or handle it differently
             raise
     
-    def human_approval(self, state: MnAagentState) -> MnAagentState:
+    def human_approval(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Ask human whether to proceed with search
         """
         proceed = self.approval
         
         if proceed == 1:
-            state.current_step = "human_approval_confirmed"
-            return state
+            return {"current_step": "human_approval_confirmed"}
         
-        state.current_step = "human_approval_rejected"
-        return state
+        return {"current_step": "human_approval_rejected"}
     
     def should_continue(self, state: MnAagentState) -> str:
         """
@@ -168,16 +179,15 @@ if __name__ == "__main__":
         logger.info(f"Initializing RAG for {company} with document: {text_path}")
         rag_instances[company] = RAG(text_path)
         indexes[company] = rag_instances[company].create_db(db_name=str(company))
-        retrievers[company] = indexes[company].as_retriever()
+        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
+
+    get_resource_registry().register_many(rag_instances, indexes, retrievers)
 
     initial_state = MnAagentState(
         company_a_name="Reliance_Industries_Limited",
         company_b_name="180_Degree_Consulting",
         company_a_doc="/home/naba/Desktop/backend/RIL-Integrated-Annual-Report-2023-24_parsed.txt",
         company_b_doc="/home/naba/Desktop/backend/dc.txt",
-        rag_instances=rag_instances,
-        indexes=indexes,
-        retrievers=retrievers
     )
     research_graph = create_workflow(initial_state, 'a')
     final_state = research_graph.invoke(initial_state, config={"recursion_limit": 1000})
\ No newline at end of file
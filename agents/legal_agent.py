@@ -11,14 +11,16 @@ import docx
 logger = logging.getLogger(__name__)
 
 class MergerLegalAgent:
-    def __init__(self, state: MnAagentState):
+    def __init__(self, state: MnAagentState, llm=None):
         """
         Initialize Merger Legal Agent with the merged state
         
         Args:
             state (MnAagentState): Merged state containing company information
+            llm (Chat, optional): Shared Chat client for the scratch RAG instances
         """
         self.state = state
+        self.llm = llm
         
         # Load prompts for legal assessment
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -122,7 +124,7 @@ class MergerLegalAgent:
         doc = docx.Document(docx_path)
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
     
-    def assess_regulatory_compliance(self, state: MnAagentState) -> MnAagentState:
+    def assess_regulatory_compliance(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Assess regulatory compliance for the proposed merger
         
@@ -130,9 +132,9 @@ class MergerLegalAgent:
             state (MnAagentState): Current state of the merger process
         
         Returns:
-            MnAagentState: Updated state with regulatory compliance assessment
+            Dict[str, Any]: Regulatory compliance assessment, report path and context path
         """
-        state.current_step = "regulatory_compliance_assessment"
+        update = {"current_step": "regulatory_compliance_assessment"}
         
         # Combine regulatory documents
         compliance_data = "\n\n".join([
@@ -142,35 +144,34 @@ class MergerLegalAgent:
         ])
         
         # Use RAG for regulatory compliance analysis
-        compliance_rag = RAG(compliance_data)
-        indexes = compliance_rag.create_db(db_name="regulatory_compliance")
-        retriever = indexes.as_retriever()
+        compliance_rag = RAG(compliance_data, ephemeral=True, llm=self.llm)
         
         try:
-            compliance_response = compliance_rag.rag_query(
+            compliance_response = compliance_rag.budgeted_query(
                 query_text=self.prompts.get("regulatory_compliance_prompt", "Assess regulatory compliance for proposed merger"),
-                retriever=retriever
+                db_name="regulatory_compliance"
             )
+            update["context_paths"] = {"assess_regulatory_compliance": compliance_response['path']}
             
-            state.legal_check['regulatory_compliance'] = compliance_response['result']
+            update["legal_check"] = {'regulatory_compliance': compliance_response['result']}
             
             # Save compliance report
-            output_dir = "merger_reports"
+            output_dir = state.output_dir or "merger_reports"
             os.makedirs(output_dir, exist_ok=True)
             compliance_report_path = os.path.join(output_dir, "regulatory_compliance_report.txt")
             
             with open(compliance_report_path, "w") as f:
                 f.write(compliance_response['result'])
             
-            state.merger_report = compliance_report_path
+            update["merger_report"] = compliance_report_path
             
         except Exception as e:
             logger.error(f"Error in regulatory compliance assessment: {e}")
-            state.error = f"Regulatory compliance assessment failed: {str(e)}"
+            update["error"] = f"Regulatory compliance assessment failed: {str(e)}"
         
-        return state
+        return update
     
-    def conduct_legal_due_diligence(self, state: MnAagentState) -> MnAagentState:
+    def conduct_legal_due_diligence(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Conduct comprehensive legal due diligence for the merger
         
@@ -178,9 +179,9 @@ class MergerLegalAgent:
             state (MnAagentState): Current state of the merger process
         
         Returns:
-            MnAagentState: Updated state with legal due diligence findings
+            Dict[str, Any]: Legal due diligence findings, report path and context path
         """
-        state.current_step = "legal_due_diligence"
+        update = {"current_step": "legal_due_diligence"}
         
         # Combine legal documents and corporate structures
         due_diligence_data = f"""
@@ -191,35 +192,34 @@ class MergerLegalAgent:
         """
         
         # Use RAG for legal due diligence analysis
-        due_diligence_rag = RAG(due_diligence_data)
-        indexes = due_diligence_rag.create_db(db_name="legal_due_diligence")
-        retriever = indexes.as_retriever()
+        due_diligence_rag = RAG(due_diligence_data, ephemeral=True, llm=self.llm)
         
         try:
-            due_diligence_response = due_diligence_rag.rag_query(
+            due_diligence_response = due_diligence_rag.budgeted_query(
                 query_text=self.prompts.get("legal_due_diligence_prompt", "Conduct comprehensive legal due diligence for merger"),
-                retriever=retriever
+                db_name="legal_due_diligence"
             )
+            update["context_paths"] = {"conduct_legal_due_diligence": due_diligence_response['path']}
             
-            state.legal_check['due_diligence_findings'] = due_diligence_response['result']
+            update["legal_check"] = {'due_diligence_findings': due_diligence_response['result']}
             
             # Save due diligence report
-            output_dir = "merger_reports"
+            output_dir = state.output_dir or "merger_reports"
             os.makedirs(output_dir, exist_ok=True)
             due_diligence_report_path = os.path.join(output_dir, "legal_due_diligence_report.txt")
             
             with open(due_diligence_report_path, "w") as f:
                 f.write(due_diligence_response['result'])
             
-            state.merger_report = due_diligence_report_path
+            update["merger_report"] = due_diligence_report_path
             
         except Exception as e:
             logger.error(f"Error in legal due diligence: {e}")
-            state.error = f"Legal due diligence failed: {str(e)}"
+            update["error"] = f"Legal due diligence failed: {str(e)}"
         
-        return state
+        return update
     
-    def assess_potential_legal_risks(self, state: MnAagentState) -> MnAagentState:
+    def assess_potential_legal_risks(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Assess potential legal risks associated with the merger
         
@@ -227,9 +227,9 @@ class MergerLegalAgent:
             state (MnAagentState): Current state of the merger process
         
         Returns:
-            MnAagentState: Updated state with legal risk assessment
+            Dict[str, Any]: Legal risk assessment, report path and context path
         """
-        state.current_step = "legal_risk_assessment"
+        update = {"current_step": "legal_risk_assessment"}
         
         # Combine litigation history and potential conflict areas
         legal_risk_data = f"""
@@ -239,33 +239,32 @@ class MergerLegalAgent:
         """
         
         # Use RAG for legal risk analysis
-        risk_rag = RAG(legal_risk_data)
-        indexes = risk_rag.create_db(db_name="legal_risks")
-        retriever = indexes.as_retriever()
+        risk_rag = RAG(legal_risk_data, ephemeral=True, llm=self.llm)
         
         try:
-            risk_response = risk_rag.rag_query(
+            risk_response = risk_rag.budgeted_query(
                 query_text=self.prompts.get("legal_risks_prompt", "Assess potential legal risks in proposed merger"),
-                retriever=retriever
+                db_name="legal_risks"
             )
+            update["context_paths"] = {"assess_potential_legal_risks": risk_response['path']}
             
-            state.legal_check['potential_legal_risks'] = risk_response['result']
+            update["legal_check"] = {'potential_legal_risks': risk_response['result']}
             
             # Save legal risks report
-            output_dir = "merger_reports"
+            output_dir = state.output_dir or "merger_reports"
             os.makedirs(output_dir, exist_ok=True)
             legal_risks_report_path = os.path.join(output_dir, "legal_risks_report.txt")
             
             with open(legal_risks_report_path, "w", encoding="utf-8") as f:
                 f.write(risk_response['result'])
             
-            state.merger_report = legal_risks_report_path
+            update["merger_report"] = legal_risks_report_path
             
         except Exception as e:
             logger.error(f"Error in legal risk assessment: {e}")
-            state.error = f"Legal risk assessment failed: {str(e)}"
+            update["error"] = f"Legal risk assessment failed: {str(e)}"
         
-        return state
+        return update
 
 def create_merger_legal_workflow(legal_agent: MergerLegalAgent) -> StateGraph:
     """
@@ -283,7 +282,7 @@ def create_merger_legal_workflow(legal_agent: MergerLegalAgent) -> StateGraph:
     workflow.add_node("assess_regulatory_compliance", legal_agent.assess_regulatory_compliance)
     workflow.add_node("conduct_legal_due_diligence", legal_agent.conduct_legal_due_diligence)
     workflow.add_node("assess_potential_legal_risks", legal_agent.assess_potential_legal_risks)
-    workflow.add_node("finalize_legal_report", lambda state: state)
+    workflow.add_node("finalize_legal_report", lambda state: {})
     
     # Set entry point and define workflow
     workflow.set_entry_point("assess_regulatory_compliance")
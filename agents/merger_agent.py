@@ -5,19 +5,22 @@ from pydantic import BaseModel, Field, ConfigDict
 from RAG.rag_llama import RAG
 from langgraph.graph import StateGraph, END
 from agents.states import MnAagentState
+from agents.resources import get_resource_registry
 import logging
 
 logger = logging.getLogger(__name__)
 
 class MergerValuationAgent:
-    def __init__(self, state: MnAagentState):
+    def __init__(self, state: MnAagentState, llm=None):
         """
         Initialize Merger Valuation Agent with the merged state
         
         Args:
             state (MnAagentState): Merged state containing company information
+            llm (Chat, optional): Shared Chat client for the scratch RAG instances
         """
         self.state = state
+        self.llm = llm
         
         # Load prompts for merger valuation
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -31,7 +34,7 @@ class MergerValuationAgent:
             logger.error(f"Error loading prompts: {e}")
             self.prompts = {}
     
-    def validate_merger_feasibility(self, state: MnAagentState) -> MnAagentState:
+    def validate_merger_feasibility(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Validate the feasibility of the merger based on financial, legal, and strategic criteria
         
@@ -39,9 +42,9 @@ class MergerValuationAgent:
             state (MnAagentState): Current state of the merger process
         
         Returns:
-            MnAagentState: Updated state with merger feasibility assessment
+            Dict[str, Any]: Merger feasibility assessment, report path and context path
         """
-        state.current_step = "merger_feasibility_assessment"
+        update = {"current_step": "merger_feasibility_assessment"}
         
         # Combine financial reports for comprehensive analysis
         combined_financial_data = f"""
@@ -50,35 +53,34 @@ class MergerValuationAgent:
         """
         
         # Use RAG to assess merger feasibility
-        merger_feasibility_rag = RAG(combined_financial_data)
-        indexes = merger_feasibility_rag.create_db(db_name="merger_feasibility")
-        retriever = indexes.as_retriever()
+        merger_feasibility_rag = RAG(combined_financial_data, ephemeral=True, llm=self.llm)
         
         try:
-            feasibility_response = merger_feasibility_rag.rag_query(
+            feasibility_response = merger_feasibility_rag.budgeted_query(
                 query_text=self.prompts.get("merger_feasibility_prompt", "Assess the feasibility of merger between the two companies"),
-                retriever=retriever
+                db_name="merger_feasibility"
             )
+            update["context_paths"] = {"validate_merger_feasibility": feasibility_response['path']}
             
-            state.merger_acquisition_details['feasibility_assessment'] = feasibility_response['result']
+            update["merger_acquisition_details"] = {'feasibility_assessment': feasibility_response['result']}
             
             # Save feasibility report
-            output_dir = "merger_reports"
+            output_dir = state.output_dir or "merger_reports"
             os.makedirs(output_dir, exist_ok=True)
             feasibility_report_path = os.path.join(output_dir, "merger_feasibility_report.txt")
             
             with open(feasibility_report_path, "w") as f:
                 f.write(feasibility_response['result'])
             
-            state.merger_report = feasibility_report_path
+            update["merger_report"] = feasibility_report_path
             
         except Exception as e:
             logger.error(f"Error in merger feasibility assessment: {e}")
-            state.error = f"Merger feasibility assessment failed: {str(e)}"
+            update["error"] = f"Merger feasibility assessment failed: {str(e)}"
         
-        return state
+        return update
     
-    def calculate_merger_valuation(self, state: MnAagentState) -> MnAagentState:
+    def calculate_merger_valuation(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Calculate the merger valuation using advanced techniques
         
@@ -86,9 +88,9 @@ class MergerValuationAgent:
             state (MnAagentState): Current state of the merger process
         
         Returns:
-            MnAagentState: Updated state with merger valuation details
+            Dict[str, Any]: Merger valuation details, report path and context path
         """
-        state.current_step = "merger_valuation_calculation"
+        update = {"current_step": "merger_valuation_calculation"}
         
         # Combine DCF models and financial ratios
         valuation_data = f"""
@@ -99,35 +101,34 @@ class MergerValuationAgent:
         """
         
         # Use RAG for advanced valuation analysis
-        valuation_rag = RAG(valuation_data)
-        indexes = valuation_rag.create_db(db_name="merger_valuation")
-        retriever = indexes.as_retriever()
+        valuation_rag = RAG(valuation_data, ephemeral=True, llm=self.llm)
         
         try:
-            valuation_response = valuation_rag.rag_query(
+            valuation_response = valuation_rag.budgeted_query(
                 query_text=self.prompts.get("merger_valuation_prompt", "Calculate comprehensive merger valuation"),
-                retriever=retriever
+                db_name="merger_valuation"
             )
+            update["context_paths"] = {"calculate_merger_valuation": valuation_response['path']}
             
-            state.merger_acquisition_details['valuation_details'] = valuation_response['result']
+            update["merger_acquisition_details"] = {'valuation_details': valuation_response['result']}
             
             # Save valuation report
-            output_dir = "merger_reports"
+            output_dir = state.output_dir or "merger_reports"
             os.makedirs(output_dir, exist_ok=True)
             valuation_report_path = os.path.join(output_dir, "merger_valuation_report.txt")
             
             with open(valuation_report_path, "w") as f:
                 f.write(valuation_response['result'])
             
-            state.merger_report = valuation_report_path
+            update["merger_report"] = valuation_report_path
             
         except Exception as e:
             logger.error(f"Error in merger valuation calculation: {e}")
-            state.error = f"Merger valuation calculation failed: {str(e)}"
+            update["error"] = f"Merger valuation calculation failed: {str(e)}"
         
-        return state
+        return update
     
-    def assess_integration_risks(self, state: MnAagentState) -> MnAagentState:
+    def assess_integration_risks(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Assess potential risks in merger integration
         
@@ -135,9 +136,9 @@ class MergerValuationAgent:
             state (MnAagentState): Current state of the merger process
         
         Returns:
-            MnAagentState: Updated state with integration risk assessment
+            Dict[str, Any]: Integration risk assessment, report path and context path
         """
-        state.current_step = "integration_risk_assessment"
+        update = {"current_step": "integration_risk_assessment"}
         
         # Combine supply chain and industry position data
         integration_risk_data = f"""
@@ -148,33 +149,32 @@ class MergerValuationAgent:
         """
         
         # Use RAG for integration risk analysis
-        risk_rag = RAG(integration_risk_data)
-        indexes = risk_rag.create_db(db_name="integration_risks")
-        retriever = indexes.as_retriever()
+        risk_rag = RAG(integration_risk_data, ephemeral=True, llm=self.llm)
         
         try:
-            risk_response = risk_rag.rag_query(
+            risk_response = risk_rag.budgeted_query(
                 query_text=self.prompts.get("integration_risks_prompt", "Assess potential risks in merger integration"),
-                retriever=retriever
+                db_name="integration_risks"
             )
+            update["context_paths"] = {"assess_integration_risks": risk_response['path']}
             
-            state.risk_check['integration_risks'] = risk_response['result']
+            update["risk_check"] = {'integration_risks': risk_response['result']}
             
             # Save risk assessment report
-            output_dir = "merger_reports"
+            output_dir = state.output_dir or "merger_reports"
             os.makedirs(output_dir, exist_ok=True)
             risk_report_path = os.path.join(output_dir, "integration_risks_report.txt")
             
             with open(risk_report_path, "w", encoding="utf-8") as f:
                 f.write(risk_response['result'])
             
-            state.merger_report = risk_report_path
+            update["merger_report"] = risk_report_path
             
         except Exception as e:
             logger.error(f"Error in integration risk assessment: {e}")
-            state.error = f"Integration risk assessment failed: {str(e)}"
+            update["error"] = f"Integration risk assessment failed: {str(e)}"
         
-        return state
+        return update
    
 
 def create_merger_valuation_workflow(merger_agent: MergerValuationAgent) -> StateGraph:
@@ -193,7 +193,7 @@ def create_merger_valuation_workflow(merger_agent: MergerValuationAgent) -> Stat
     workflow.add_node("validate_merger_feasibility", merger_agent.validate_merger_feasibility)
     workflow.add_node("calculate_merger_valuation", merger_agent.calculate_merger_valuation)
     workflow.add_node("assess_integration_risks", merger_agent.assess_integration_risks)
-    workflow.add_node("finalize_merger_report", lambda state: state)
+    workflow.add_node("finalize_merger_report", lambda state: {})
     
     # Set entry point and define workflow
     workflow.set_entry_point("validate_merger_feasibility")
@@ -233,17 +233,16 @@ if __name__ == "__main__":
         logger.info(f"Initializing RAG for {company} with document: {text_path}")
         rag_instances[company] = RAG(text_path)
         indexes[company] = rag_instances[company].create_db(db_name=str(company))
-        retrievers[company] = indexes[company].as_retriever()
+        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
     
     # Create initial state
+    get_resource_registry().register_many(rag_instances, indexes, retrievers)
+
     initial_state = MnAagentState(
         company_a_name="Reliance_Industries_Limited",
         company_b_name="180_Degree_Consulting",
         company_a_doc="/home/naba/Desktop/backend/RIL-Integrated-Annual-Report-2023-24_parsed.txt",
         company_b_doc="/home/naba/Desktop/backend/dc.txt",
-        rag_instances=rag_instances,
-        indexes=indexes,
-        retrievers=retrievers
     )
     
     # Create merger agent and workflow
@@ -1,9 +1,12 @@
 from pydantic import BaseModel, Field
 from typing import TypedDict, Dict, List, Any, Optional
 from agents.states import MnAagentState
+from agents.resources import get_resource_registry
 from datetime import datetime
 from langchain_core.runnables.graph import CurveStyle, MermaidDrawMethod, NodeStyles
+from agents.rag_queries import MemoizedRAGQueryMixin
 from RAG.rag_llama import RAG
+from utils.node_memo import get_node_memo
 import logging
 import os
 from langgraph.graph import StateGraph, END
@@ -19,8 +22,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class OpsAgentNodes:
-    def __init__(self, state: MnAagentState, company: str, approval: bool):
+class OpsAgentNodes(MemoizedRAGQueryMixin):
+    def __init__(self, state: MnAagentState, company: str, approval: bool, llm=None):
 
         """
         Initialize Operations Agent for a specific company
@@ -28,13 +31,20 @@ class OpsAgentNodes:
         Args:
             state (MnAagentState): The current state of the multi-agent system
             company (str): Identifier for the company ('a' or 'b')
+            llm (Chat, optional): Shared Chat client for the scratch RAG instances
         """
         self.approval = approval
+        # Shared Chat client handed to the scratch RAG instances
+        self.llm = llm
         self.state = state
         if company == 'a':
             self.company_name = state.company_a_name
         else:
             self.company_name = state.company_b_name
+        self.company_doc = state.company_a_doc if company == 'a' else state.company_b_doc
+        self.search_results_key = "search_results_a" if company == 'a' else "search_results_b"
+        self.memo = get_node_memo()
+        self.resources = get_resource_registry()
         
         # Load prompts
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -44,7 +54,7 @@ class OpsAgentNodes:
             self.prompts = yaml.safe_load(file)["Ops_Agent_prompt"]
         logger.info(f"Loaded prompts from {prompts_path}")
 
-    def supply_chain_analysis(self, state: MnAagentState) -> MnAagentState:
+    def supply_chain_analysis(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Perform in-depth supply chain analysis for the company
         
@@ -52,21 +62,17 @@ class OpsAgentNodes:
             state (MnAagentState): Current state of the multi-agent system
         
         Returns:
-            MnAagentState: Updated state with supply chain analysis
+            Dict[str, Any]: This company's supply chain analysis and the tokens spent
         """
-        state.current_step = "supply_chain_analysis"
-        state.supply_chain_analyst = {self.company_name: "Supply Chain Analysis:\n"}
-        
         # Use RAG to extract supply chain insights
-        response = self.state.rag_instances[self.company_name].rag_query(
-            query_text=self.prompts["supply_chain_prompt"].format(company_name=self.company_name),
-            retriever=self.state.retrievers[self.company_name]
-        )
-        
-        state.supply_chain_analyst[self.company_name] += response["result"]
-        return state
+        result, usage = self._memoized_rag_query(state, "supply_chain_analysis", "supply_chain_prompt")
+        return {
+            "current_step": "supply_chain_analysis",
+            "supply_chain_analyst": {self.company_name: "Supply Chain Analysis:\n" + result},
+            "token_usage": {f"supply_chain_analysis_{self.company_name}": usage},
+        }
 
-    def industry_positioning(self, state: MnAagentState) -> MnAagentState:
+    def industry_positioning(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Analyze the company's positioning within its industry
         
@@ -74,21 +80,17 @@ class OpsAgentNodes:
             state (MnAagentState): Current state of the multi-agent system
         
         Returns:
-            MnAagentState: Updated state with industry positioning insights
+            Dict[str, Any]: This company's industry positioning insights and the tokens spent
         """
-        state.current_step = "industry_positioning"
-        state.industry_position = {self.company_name: "Industry Positioning Analysis:\n"}
-        
         # Use RAG to extract industry positioning insights
-        response = self.state.rag_instances[self.company_name].rag_query(
-            query_text=self.prompts["industry_positioning_prompt"].format(company_name=self.company_name),
-            retriever=self.state.retrievers[self.company_name]
-        )
-        
-        state.industry_position[self.company_name] += response["result"]
-        return state
+        result, usage = self._memoized_rag_query(state, "industry_positioning", "industry_positioning_prompt")
+        return {
+            "current_step": "industry_positioning",
+            "industry_position": {self.company_name: "Industry Positioning Analysis:\n" + result},
+            "token_usage": {f"industry_positioning_{self.company_name}": usage},
+        }
 
-    def operations_reporting(self, state: MnAagentState) -> MnAagentState:
+    def operations_reporting(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Generate comprehensive operations report
         
@@ -96,7 +98,7 @@ class OpsAgentNodes:
             state (MnAagentState): Current state of the multi-agent system
         
         Returns:
-            MnAagentState: Updated state with operations report
+            Dict[str, Any]: This company's operations report, context path and tokens spent
         """
         try:
             # Combine supply chain and industry positioning data
@@ -106,23 +108,13 @@ class OpsAgentNodes:
             ])
             
             # Create RAG instance for report generation
-            rag_instances = RAG(combined_data)
-            
-            indexes = rag_instances.create_db(db_name=str(self.company_name))
-            retrievers = indexes.as_retriever()
+            rag_instances = RAG(combined_data, ephemeral=True, llm=self.llm)
             
-            state.current_step = "operations_reporting"
-            response = rag_instances.rag_query(
+            response = rag_instances.budgeted_query(
                 query_text=self.prompts["operations_reporting_prompt"].format(company_name=self.company_name),
-                retriever=retrievers
+                db_name=str(self.company_name)
             )
-            
-            # Assign report based on company
-            if self.company_name == state.company_a_name:
-                state.ops_report_a = response["result"]
-            else:
-                state.ops_report_b = response["result"]
-            
+
             # Create output directory and save report
             output_dir = "report"
             os.makedirs(output_dir, exist_ok=True)
@@ -131,13 +123,25 @@ class OpsAgentNodes:
             with open(output_path, "w", encoding="utf-8") as f:
                 f.write(response["result"])
             
-            return state
+            # Assign report based on company
+            report_key = "ops_report_a" if self.company_name == state.company_a_name else "ops_report_b"
+            return {
+                "current_step": "operations_reporting",
+                report_key: response["result"],
+                "context_paths": {f"operations_reporting_{self.company_name}": response["path"]},
+                "token_usage": {
+                    f"operations_reporting_{self.company_name}": {
+                        "input_tokens": response["input_tokens"],
+                        "output_tokens": response["output_tokens"],
+                    }
+                },
+            }
         
         except Exception as e:
             logger.error(f"Error in operations reporting for {self.company_name}: {e}")
             raise
 
-    def human_approval(self, state: MnAagentState) -> MnAagentState:
+    def human_approval(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Ask human for approval to proceed with the report
         
@@ -145,16 +149,14 @@ class OpsAgentNodes:
             state (MnAagentState): Current state of the multi-agent system
         
         Returns:
-            MnAagentState: Updated state based on human approval
+            Dict[str, Any]: current_step recording the approval decision
         """
         proceed = self.approval
         
         if proceed == 1:
-            state.current_step = "human_approval_confirmed"
-            return state
+            return {"current_step": "human_approval_confirmed"}
         
-        state.current_step = "human_approval_rejected"
-        return state
+        return {"current_step": "human_approval_rejected"}
 
 
 def create_workflow(mn_agent_state: MnAagentState, company: str):
@@ -212,16 +214,15 @@ if __name__ == "__main__":
         logger.info(f"Initializing RAG for {company} with document: {text_path}")
         rag_instances[company] = RAG(text_path)
         indexes[company] = rag_instances[company].create_db(db_name=str(company))
-        retrievers[company] = indexes[company].as_retriever()
+        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
+
+    get_resource_registry().register_many(rag_instances, indexes, retrievers)
 
     initial_state = MnAagentState(
         company_a_name="Reliance_Industries_Limited",
         company_b_name="180_Degree_Consulting",
         company_a_doc="/home/naba/Desktop/backend/RIL-Integrated-Annual-Report-2023-24_parsed.txt",
         company_b_doc="/home/naba/Desktop/backend/dc.txt",
-        rag_instances=rag_instances,
-        indexes=indexes,
-        retrievers=retrievers
     )
     research_graph = create_workflow(initial_state, 'a')
     final_state = research_graph.invoke(initial_state, config={"recursion_limit": 1000})
\ No newline at end of file
@@ -0,0 +1,55 @@
+from typing import Dict, List, Tuple
+from agents.states import MnAagentState
+from RAG.rag_llama import derive_retrieval_queries
+from utils.node_memo import rag_node_fingerprint
+
+
+class MemoizedRAGQueryMixin:
+    """
+    Answers prompts.yaml prompts over a company's registered retriever.
+
+    Expects the host node class to set company_name, company_doc,
+    search_results_key, prompts (its prompts.yaml section), memo (the node
+    memo, which reuses outputs across runs that analyze the same company with
+    the same inputs) and resources (the resource registry).
+    """
+
+    def _retrieval_queries(self, prompt_key: str, prompt: str) -> List[str]:
+        """Search queries for a prompt: declared under retrieval_queries in prompts.yaml, else derived from it"""
+        declared = self.prompts.get("retrieval_queries", {}).get(prompt_key)
+        if declared:
+            return [query.format(company_name=self.company_name) for query in declared]
+        return derive_retrieval_queries(prompt, subject=self.company_name)
+
+    def _memoized_rag_query(self, state: MnAagentState, node_name: str, prompt_key: str) -> Tuple[str, Dict[str, int]]:
+        """
+        Answer prompt over the company retriever, reusing a stored answer when the inputs match
+
+        Args:
+            state (MnAagentState): Current state of the multi-agent system
+            node_name (str): Node the answer is memoized under
+            prompt_key (str): Prompt in the agent's prompts.yaml section
+
+        Returns:
+            Tuple[str, Dict[str, int]]: LLM answer, and the input/output tokens it spent
+        """
+        prompt = self.prompts[prompt_key].format(company_name=self.company_name)
+        retrieval_queries = self._retrieval_queries(prompt_key, prompt)
+        rag_instance = self.resources.rag(self.company_name, self.company_doc)
+        key = rag_node_fingerprint(
+            rag_instance, prompt, getattr(state, self.search_results_key), retrieval_queries=retrieval_queries
+        )
+        # A memo hit spends no tokens
+        usage = {"input_tokens": 0, "output_tokens": 0}
+
+        def compute():
+            response = rag_instance.rag_query(
+                query_text=prompt,
+                retriever=self.resources.retriever(self.company_name, self.company_doc),
+                retrieval_queries=retrieval_queries,
+            )
+            usage.update(input_tokens=response["input_tokens"], output_tokens=response["output_tokens"])
+            return response["result"]
+
+        result = self.memo.cached_call(node_name, self.company_name, key, compute)
+        return result, usage
@@ -8,7 +8,10 @@ from pydantic import BaseModel, Field
 from RAG.rag_llama import RAG
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from agents.states import MnAagentState
+from agents.resources import get_resource_registry
 from langgraph.graph import StateGraph, END
 
 # Configure logging
@@ -19,16 +22,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Concurrent LLM generations across all companies and sections of one report node
+REPORT_GENERATION_WORKERS = int(os.getenv("REPORT_GENERATION_WORKERS", "8"))
+
 
 class ReportAgentNodes:
-    def __init__(self, state: MnAagentState):
+    def __init__(self, state: MnAagentState, max_workers: int = REPORT_GENERATION_WORKERS):
         """
         Initialize LegalAgentNodes with the given state and load necessary resources
 
         Args:
             state (MnAagentState): The current state of the multi-agent research process
+            max_workers (int): Size of the worker pool used for section generation
         """
         self.state = state
+        self.max_workers = max_workers
+        self.resources = get_resource_registry()
+        self.company_docs = {state.company_a_name: state.company_a_doc, state.company_b_name: state.company_b_doc}
 
         # Load legal report templates and prompts
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -48,7 +58,58 @@ class ReportAgentNodes:
         # Unique identifier for this report generation
         self.report_id = str(uuid.uuid4())
 
-    def report_structure_creator(self, state: MnAagentState) -> MnAagentState:
+    def _run_section_queries(
+        self, queries_by_company: Dict[str, List[str]], fallback: str
+    ) -> Dict[str, List[str]]:
+        """
+        Answer every company's section queries through one bounded worker pool
+
+        Retrieval runs once per company with a single embedding pass; all LLM
+        generations are then dispatched together. A failed query only replaces
+        its own answer with fallback; a company whose document cannot be loaded
+        gets fallback for all of its queries.
+
+        Args:
+            queries_by_company (Dict[str, List[str]]): Queries per company, in section order
+            fallback (str): Text used for any query that fails
+
+        Returns:
+            Dict[str, List[str]]: Answers per company, in the same order as the queries
+        """
+        start = time.perf_counter()
+        results = {company: [fallback] * len(queries) for company, queries in queries_by_company.items()}
+        total = sum(len(queries) for queries in queries_by_company.values())
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, total))) as executor:
+            futures = {}
+            for company_name, queries in queries_by_company.items():
+                source_path = self.company_docs.get(company_name)
+                try:
+                    rag_instance = self.resources.rag(company_name, source_path)
+                    contexts = rag_instance.retrieve_batch(queries, self.resources.retriever(company_name, source_path))
+                except Exception as e:
+                    logger.error(f"RAG retrieval error for {company_name}: {e}")
+                    failed += len(queries)
+                    continue
+                for idx, (query, (context, source_documents)) in enumerate(zip(queries, contexts)):
+                    future = executor.submit(rag_instance.answer_with_context, query, context, source_documents)
+                    futures[future] = (company_name, idx)
+
+            for future, (company_name, idx) in futures.items():
+                try:
+                    results[company_name][idx] = future.result()["result"]
+                except Exception as e:
+                    logger.error(f"RAG query error for {company_name} (query {idx + 1}): {e}")
+                    failed += 1
+
+        logger.info(
+            f"Generated {total - failed}/{total} section answers in "
+            f"{time.perf_counter() - start:.2f}s with {self.max_workers} workers"
+        )
+        return results
+
+    def report_structure_creator(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Create the initial structure for the legal report
 
@@ -56,7 +117,7 @@ class ReportAgentNodes:
             state (MnAagentState): Current state of the research process
 
         Returns:
-            MnAagentState: Updated state with report structure
+            Dict[str, Any]: The report structure
         """
         # Define a standard legal report structure
         report_structure = {
@@ -80,12 +141,9 @@ class ReportAgentNodes:
             ],
         }
 
-        state.legal_report_structure = report_structure
-        state.current_step = "report_structure_created"
-
-        return state
+        return {"legal_report_structure": report_structure, "current_step": "report_structure_created"}
 
-    def section_template_generator(self, state: MnAagentState) -> MnAagentState:
+    def section_template_generator(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Generate section templates for the legal report based on RAG queries
 
@@ -93,40 +151,31 @@ class ReportAgentNodes:
             state (MnAagentState): Current state of the research process
 
         Returns:
-            MnAagentState: Updated state with section templates
+            Dict[str, Any]: Section templates per company
         """
-        # Retrieve relevant information from RAG for each company
-        templates = {}
-        for company_name in [state.company_a_name, state.company_b_name]:
-            rag_instance = state.rag_instances[company_name]
-
-            # Example RAG queries for each section
-            section_queries = {
+        # Example RAG queries for each section
+        section_queries = {
+            company_name: {
                 "Company Background": f"Provide key historical and organizational details about {company_name}",
                 "Legal Compliance": f"Extract legal compliance and governance details for {company_name}",
                 "Risk Assessment": f"Identify major legal and regulatory risks for {company_name}",
             }
+            for company_name in [state.company_a_name, state.company_b_name]
+        }
 
-            templates[company_name] = {}
-            for section, query in section_queries.items():
-                try:
-                    context = rag_instance.rag_query(query, state.retrievers[company])
-                    # if isinstance(context, str):
-                    #     try:
-                    #         context = json.loads(context)
-                    #     except json.JSONDecodeError:
-                    #         context = {}
-                    templates[company_name][section] = context["result"]
-                except Exception as e:
-                    logger.error(f"RAG query error for {company_name} - {section}: {e}")
-                    templates[company_name][section] = "No relevant information found."
-
-        state.section_templates = templates
-        state.current_step = "section_templates_generated"
+        # Retrieve relevant information from RAG for every company and section at once
+        answers = self._run_section_queries(
+            {company_name: list(queries.values()) for company_name, queries in section_queries.items()},
+            fallback="No relevant information found.",
+        )
+        templates = {
+            company_name: dict(zip(queries, answers[company_name]))
+            for company_name, queries in section_queries.items()
+        }
 
-        return state
+        return {"section_templates": templates, "current_step": "section_templates_generated"}
 
-    def rag_summary_generator(self, state: MnAagentState) -> MnAagentState:
+    def rag_summary_generator(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Generate comprehensive summaries using RAG for the legal report
 
@@ -134,47 +183,39 @@ class ReportAgentNodes:
             state (MnAagentState): Current state of the research process
 
         Returns:
-            MnAagentState: Updated state with RAG-generated summaries
+            Dict[str, Any]: The report structure with RAG-generated summaries added to its sections
         """
-        # Perform comprehensive RAG-based summarization
-        for idx, section in enumerate(state.legal_report_structure["sections"]):
-            company_summaries = []
+        # Perform comprehensive RAG-based summarization for all companies concurrently
+        sections = state.legal_report_structure["sections"]
+        summaries_by_company = self._run_section_queries(
+            {
+                company_name: [
+                    f"Provide a comprehensive summary for the '{section['name']}' section about {company_name}"
+                    for section in sections
+                ]
+                for company_name in [state.company_a_name, state.company_b_name]
+            },
+            fallback="Summary generation failed.",
+        )
+
+        # Store summaries in a copy of the report structure
+        report_structure = {
+            **state.legal_report_structure,
+            "sections": [
+                {
+                    **section,
+                    "company_summaries": [
+                        {"company": company_name, "summary": summaries[idx]}
+                        for company_name, summaries in summaries_by_company.items()
+                    ],
+                }
+                for idx, section in enumerate(sections)
+            ],
+        }
 
-            for company_name in [state.company_a_name, state.company_b_name]:
-                rag_instance = state.rag_instances[company_name]
+        return {"legal_report_structure": report_structure, "current_step": "rag_summaries_generated"}
 
-                # Detailed RAG query for each section
-                try:
-                    summary = rag_instance.rag_query(
-                        f"Provide a comprehensive summary for the '{section['name']}' section about {company_name}",
-                        state.retrievers[company_name],
-                    )
-                    # if isinstance(summary, str):
-                    #     try:
-                    #         context = json.loads(summary)
-                    #     except json.JSONDecodeError:
-                    #         context = {}
-                    company_summaries.append(
-                        {"company": company_name, "summary": summary["result"]}
-                    )
-                except Exception as e:
-                    logger.error(f"RAG summary generation error: {e}")
-                    company_summaries.append(
-                        {
-                            "company": company_name,
-                            "summary": "Summary generation failed.",
-                        }
-                    )
-
-            # Store summaries in the report structure
-            state.legal_report_structure["sections"][idx][
-                "company_summaries"
-            ] = company_summaries
-
-        state.current_step = "rag_summaries_generated"
-        return state
-
-    def consistency_checker(self, state: MnAagentState) -> MnAagentState:
+    def consistency_checker(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Perform consistency checks on the generated legal report
 
@@ -182,7 +223,7 @@ class ReportAgentNodes:
             state (MnAagentState): Current state of the research process
 
         Returns:
-            MnAagentState: Updated state after consistency checks
+            Dict[str, Any]: Consistency issues found
         """
         # Implement consistency checks
         issues = []
@@ -194,16 +235,17 @@ class ReportAgentNodes:
 
         # Check RAG source consistency
         for company_name in [state.company_a_name, state.company_b_name]:
-            rag_instance = state.rag_instances[company_name]
-            if not rag_instance.text:
+            try:
+                rag_instance = self.resources.rag(company_name, self.company_docs.get(company_name))
+            except Exception as e:
+                issues.append(f"Could not load the document for {company_name}: {e}")
+                continue
+            if not rag_instance.has_text:
                 issues.append(f"No text data available for {company_name}")
 
-        state.consistency_issues = issues
-        state.current_step = "consistency_checked"
-
-        return state
+        return {"consistency_issues": issues, "current_step": "consistency_checked"}
 
-    def report_formatter(self, state: MnAagentState) -> MnAagentState:
+    def report_formatter(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Format the final legal report with a professional layout
 
@@ -211,7 +253,7 @@ class ReportAgentNodes:
             state (MnAagentState): Current state of the research process
 
         Returns:
-            MnAagentState: Updated state with formatted report
+            Dict[str, Any]: The formatted report
         """
         # Create a plain text formatted report
         report_content = f"""LEGAL COMPARATIVE ANALYSIS REPORT
@@ -241,6 +283,9 @@ Companies Analyzed: {', '.join(state.legal_report_structure['companies'])}
 
         # Save the report
         report_filename = f"legal_report.txt"
+        if state.output_dir:
+            os.makedirs(state.output_dir, exist_ok=True)
+            report_filename = os.path.join(state.output_dir, report_filename)
         try:
             with open(report_filename, "w", encoding="utf-8") as f:
                 f.write(report_content)
@@ -248,10 +293,7 @@ Companies Analyzed: {', '.join(state.legal_report_structure['companies'])}
         except Exception as e:
             logger.error(f"Error saving report: {e}")
 
-        state.final_report = report_content
-        state.current_step = "report_formatted"
-
-        return state
+        return {"final_report": report_content, "current_step": "report_formatted"}
 
 
 def create_report_agent_graph(mn_agent_state: MnAagentState):
@@ -305,17 +347,16 @@ if __name__ == "__main__":
         logger.info(f"Initializing RAG for {company} with document: {text_path}")
         rag_instances[company] = RAG(text_path)
         indexes[company] = rag_instances[company].create_db(db_name=str(company))
-        retrievers[company] = indexes[company].as_retriever()
+        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
+
+    get_resource_registry().register_many(rag_instances, indexes, retrievers)
 
-    # Initialize MnAagentState with RAG instances
+    # Initialize MnAagentState
     initial_state = MnAagentState(
         company_a_name="Reliance_Industries_Limited",
         company_b_name="180_Degree_Consulting",
         company_a_doc="/home/naba/Desktop/backend/RIL-Integrated-Annual-Report-2023-24_parsed.txt",
         company_b_doc="/home/naba/Desktop/backend/dc.txt",
-        rag_instances=rag_instances,
-        indexes=indexes,
-        retrievers=retrievers,
     )
 
     # Create and invoke the sequential workflow
@@ -1,14 +1,19 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
+import asyncio
+import contextlib
 import os
 import yaml
 import logging
+import time
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.runnables.graph import CurveStyle, MermaidDrawMethod, NodeStyles
 from pydantic import BaseModel, Field
 from agents.states import MnAagentState
-from tools.websearcher import TavilySearchTool
-from RAG.rag_llama import RAG
+from agents.resources import get_resource_registry
+from tools.websearcher import TavilySearchTool, DEFAULT_SEARCH_CONCURRENCY, DEFAULT_SEARCH_TIMEOUT
+from RAG.rag_llama import RAG, count_tokens
+from RAG.embedding_cache import text_hash
 import uuid
 import sys
 
@@ -21,16 +26,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Upper bound on web searches per company (the old per-step loop stopped at 26)
+MAX_SEARCHES_PER_COMPANY = 26
+# Searching stops once this many consecutive results are less novel than the
+# threshold (1 - cosine similarity to the closest indexed chunk), or once the
+# result-token / wall-clock budget is spent; 0 disables a check
+SEARCH_NOVELTY_THRESHOLD = float(os.getenv("WEB_SEARCH_NOVELTY_THRESHOLD", "0.1"))
+SEARCH_NOVELTY_PATIENCE = int(os.getenv("WEB_SEARCH_NOVELTY_PATIENCE", "3"))
+SEARCH_TOKEN_BUDGET = int(os.getenv("WEB_SEARCH_TOKEN_BUDGET", "0"))
+SEARCH_TIME_BUDGET = float(os.getenv("WEB_SEARCH_TIME_BUDGET", "0"))
+
+
+def search_result_record(query: str, result: str) -> Dict[str, Any]:
+    """
+    What the state keeps of a search result: the text itself goes into the
+    company's vector store, so the state only needs enough to identify it
+    """
+    return {"query": query, "result_hash": text_hash(result), "chars": len(result)}
+
 
 class ResearchAgentNodes:
-    def __init__(self, state: MnAagentState, company: str, approval: bool):
+    def __init__(self, state: MnAagentState, company: str, approval: bool,
+                 search_concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
+                 search_timeout: float = DEFAULT_SEARCH_TIMEOUT,
+                 novelty_threshold: float = SEARCH_NOVELTY_THRESHOLD,
+                 novelty_patience: int = SEARCH_NOVELTY_PATIENCE,
+                 token_budget: int = SEARCH_TOKEN_BUDGET,
+                 time_budget: float = SEARCH_TIME_BUDGET):
         self.state = state
         self.approval = approval
         self.company = company
         self.company_name = (
             state.company_a_name if company == "a" else state.company_b_name
         )
+        self.company_doc = state.company_a_doc if company == "a" else state.company_b_doc
         self.search_tool = TavilySearchTool()
+        self.resources = get_resource_registry()
+        self.search_concurrency = search_concurrency
+        self.search_timeout = search_timeout
+        # Early stopping for batch_web_search; 0 disables the corresponding check
+        self.novelty_threshold = novelty_threshold
+        self.novelty_patience = max(1, novelty_patience)
+        self.token_budget = token_budget
+        self.time_budget = time_budget
+        # Each company keeps its own query queue so both pipelines can run in parallel
+        self.queries_key = "queries_a" if company == "a" else "queries_b"
 
         # Load prompts
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -40,7 +80,7 @@ class ResearchAgentNodes:
             self.prompts = yaml.safe_load(file)["Researcher_prompt"]
         logger.info(f"Loaded prompts from {prompts_path}")
 
-    def generate_queries(self, state: MnAagentState) -> MnAagentState:
+    def generate_queries(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Generate search queries for the company
         """
@@ -53,74 +93,145 @@ class ResearchAgentNodes:
             "search_results_a" if self.company == "a" else "search_results_b"
         )
 
-        # Update state with queries and reset search results
-        setattr(state, search_results_key, [])
-        state.current_step = "generate_queries"
-        state.queries = queries
-
         # Print queries for human review
         print("\n--- Generated Queries ---")
         for i, query in enumerate(queries, 1):
             print(f"{i}. {query}")
 
-        return state
+        # Queue the queries and reset search results
+        return {
+            search_results_key: [],
+            self.queries_key: queries,
+            "current_step": "generate_queries",
+        }
 
-    def human_approval(self, state: MnAagentState) -> MnAagentState:
+    def human_approval(self, state: MnAagentState) -> Dict[str, Any]:
         """
         Ask human whether to proceed with search
         """
         proceed = self.approval
 
         if proceed == 1:
-            state.current_step = "human_approval_confirmed"
-            return state
+            return {"current_step": "human_approval_confirmed"}
 
-        state.current_step = "human_approval_rejected"
-        return state
+        return {"current_step": "human_approval_rejected"}
 
-    def should_continue(self, state: MnAagentState) -> str:
+    async def _search_until_stale(self, queries: List[str], rag_instance: RAG) -> Dict[str, Any]:
         """
-        Determine if more queries need to be processed
+        Search queries in order, up to search_concurrency at a time, until they
+        run out or an early-stopping check fires on a result
+
+        Args:
+            queries (List[str]): Queries to search
+            rag_instance (RAG): The company's RAG instance, for novelty scoring
+
+        Returns:
+            Dict[str, Any]: "records" and "texts" of the novel results, "searches_run",
+            "result_tokens", "novelties" and "stop_reason"
         """
-        if state.queries:
-            return "continue_search"
-        return END
+        start = time.perf_counter()
+        records, texts, seen_vectors, novelties = [], [], [], []
+        searches_run, result_tokens, low_novelty_streak = 0, 0, 0
+        stop_reason = "queries_exhausted"
 
-    def web_search(self, state: MnAagentState) -> MnAagentState:
+        results = self.search_tool.aiter_invoke_tool(
+            queries, max_concurrency=self.search_concurrency, timeout=self.search_timeout
+        )
+        async with contextlib.aclosing(results):
+            async for response in results:
+                query = queries[searches_run]
+                searches_run += 1
+                if response is not None:
+                    # Embedding is blocking; keep the searches in flight meanwhile
+                    novelty, vectors = await asyncio.to_thread(
+                        rag_instance.text_novelty, self.company_name, response, seen_vectors
+                    )
+                    novelties.append(novelty)
+                    result_tokens += count_tokens(response)
+                    if novelty < self.novelty_threshold:
+                        low_novelty_streak += 1
+                    else:
+                        # Only results that add information are kept and indexed
+                        low_novelty_streak = 0
+                        seen_vectors.extend(vectors)
+                        records.append(search_result_record(query, response))
+                        texts.append(response)
+
+                if searches_run >= len(queries):
+                    break
+                if self.novelty_threshold > 0 and low_novelty_streak >= self.novelty_patience:
+                    stop_reason = "low_novelty"
+                elif self.token_budget > 0 and result_tokens >= self.token_budget:
+                    stop_reason = "token_budget"
+                elif self.time_budget > 0 and time.perf_counter() - start >= self.time_budget:
+                    stop_reason = "time_budget"
+                else:
+                    continue
+                break
+
+        return {
+            "records": records,
+            "texts": texts,
+            "searches_run": searches_run,
+            "result_tokens": result_tokens,
+            "novelties": novelties,
+            "stop_reason": stop_reason,
+        }
+
+    def batch_web_search(self, state: MnAagentState) -> Dict[str, Any]:
         """
-        Perform web search for current query and update vector DB
+        Run the pending queries concurrently, stopping early once results stop adding information
+
+        Each result is compared with what is already indexed for the company
+        (and with the results kept earlier in this run) as soon as it arrives;
+        results below novelty_threshold are dropped. The search ends when
+        novelty_patience consecutive results fall below the threshold, or when
+        the token or time budget is spent; searches in flight are cancelled and
+        the remaining queries skipped. The kept results are indexed with one DB
+        update.
+
+        Returns:
+            Dict[str, Any]: The company's search results, emptied query queue and search stats
         """
-        # Determine which search results list to update based on company
         search_results_key = (
             "search_results_a" if self.company == "a" else "search_results_b"
         )
-
-        # Get current search results
-        search_results = getattr(state, search_results_key)
-
-        # Perform search if queries exist
-        if state.queries:
-            current_query = state.queries.pop(0)
-            print(f"\nSearching: {current_query}")
-
-            # Perform web search
-            response = self.search_tool.invoke_tool(current_query)
-            search_results.append({"query": current_query, "result": response})
-
-            # Update search results in state
-            setattr(state, search_results_key, search_results)
-
-            # Update RAG index
-            # rag_instance = self.state.rag_instances[self.company_name]
-            print((response))
-            self.state.rag_instances[self.company_name].text = (
-                self.state.rag_instances[self.company_name].text + response
-            )
-            self.state.rag_instances[self.company_name].update_db(
-                db_name=self.company_name, new_text=response
+        queries = getattr(state, self.queries_key)[:MAX_SEARCHES_PER_COMPANY]
+        rag_instance = self.resources.rag(self.company_name, self.company_doc)
+
+        start = time.perf_counter()
+        outcome = asyncio.run(self._search_until_stale(queries, rag_instance))
+        new_texts, novelties = outcome["texts"], outcome["novelties"]
+        searches_run, stop_reason = outcome["searches_run"], outcome["stop_reason"]
+        searches_saved = len(queries) - searches_run
+        search_stats = {
+            "searches_run": searches_run,
+            "searches_saved": searches_saved,
+            "stop_reason": stop_reason,
+            "result_tokens": outcome["result_tokens"],
+            "mean_novelty": round(sum(novelties) / len(novelties), 4) if novelties else 0.0,
+            "seconds": round(time.perf_counter() - start, 2),
+        }
+
+        # Single bulk write instead of one update_db per query
+        if new_texts:
+            combined_text = "\n\n".join(new_texts)
+            rag_instance.append_text(combined_text)
+            rag_instance.update_db(db_name=self.company_name, new_text=combined_text)
+        if queries:
+            logger.info(
+                f"Indexed results of {len(new_texts)}/{searches_run} searches for {self.company_name}; "
+                f"stopped on {stop_reason}, {searches_saved} searches saved"
             )
-        state.current_step = "web_search"
-        return state
+
+        return {
+            # A new list: the state's one is shared with the other company's branch
+            search_results_key: getattr(state, search_results_key) + outcome["records"],
+            self.queries_key: [],
+            "iteration_tracker": {self.company: state.iteration_tracker.get(self.company, 0) + searches_run},
+            "search_stats": {self.company_name: search_stats},
+            "current_step": "web_search",
+        }
 
 
 def create_research_agent_graph(mn_agent_state: MnAagentState, company: str):
@@ -136,7 +247,7 @@ def create_research_agent_graph(mn_agent_state: MnAagentState, company: str):
     # Add nodes
     workflow.add_node("generate_queries", research_agent.generate_queries)
     workflow.add_node("human_approval", research_agent.human_approval)
-    workflow.add_node("web_search", research_agent.web_search)
+    workflow.add_node("web_search", research_agent.batch_web_search)
 
     # Define edges
     workflow.set_entry_point("generate_queries")
@@ -150,11 +261,7 @@ def create_research_agent_graph(mn_agent_state: MnAagentState, company: str):
         ),
         {"continue_search": "web_search", END: END},
     )
-    workflow.add_conditional_edges(
-        "web_search",
-        research_agent.should_continue,
-        {"continue_search": "web_search", END: END},
-    )
+    workflow.add_edge("web_search", END)
 
     compiled_graph = workflow.compile()
     try:
@@ -195,17 +302,16 @@ if __name__ == "__main__":
         logger.info(f"Initializing RAG for {company} with document: {text_path}")
         rag_instances[company] = RAG(text_path)
         indexes[company] = rag_instances[company].create_db(db_name=str(company))
-        retrievers[company] = indexes[company].as_retriever()
+        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
+
+    get_resource_registry().register_many(rag_instances, indexes, retrievers)
 
-    # Initialize MnAagentState with RAG instances
+    # Initialize MnAagentState
     initial_state = MnAagentState(
         company_a_name="Reliance_Industries_Limited",
         company_b_name="180_Degree_Consulting",
         company_a_doc="/home/naba/Desktop/backend/RIL-Integrated-Annual-Report-2023-24_parsed.txt",
         company_b_doc="/home/naba/Desktop/backend/dc.txt",
-        rag_instances=rag_instances,
-        indexes=indexes,
-        retrievers=retrievers,
     )
     research_graph = create_research_agent_graph(initial_state, "a")
     final_state = research_graph.invoke(initial_state, config={"recursion_limit": 1000})
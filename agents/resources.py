@@ -0,0 +1,118 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from RAG.rag_llama import RAG
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """
+    Process-level home for the heavy per-company objects: RAG instances (with
+    their embedding model), Chroma-backed indexes and retrievers.
+
+    The workflow state only carries company names, which double as Chroma
+    collection names; nodes resolve the live objects here. Names that were
+    never registered in this process (e.g. a run resumed from a checkpoint)
+    are rebuilt on first use from the company document and the persistent
+    vector store, under a lock per name so other companies are not held up.
+    """
+
+    def __init__(self, llm=None):
+        # Shared Chat client for RAG instances rebuilt from the vector store
+        self.llm = llm
+        self._rags: Dict[str, RAG] = {}
+        self._indexes: Dict[str, Any] = {}
+        self._retrievers: Dict[str, Any] = {}
+        # Guards the dicts only; building runs under the name's lock
+        self._lock = threading.Lock()
+        self._name_locks: Dict[str, threading.RLock] = {}
+
+    def register(self, name: str, rag_instance: RAG, index: Any = None, retriever: Any = None) -> None:
+        """
+        Make a company's resources available to workflow nodes
+
+        Args:
+            name (str): Company / collection name
+            rag_instance (RAG): RAG instance over the company document
+            index: Index returned by create_db; opened from the vector store if omitted
+            retriever: Retriever over index; rag_instance.make_retriever() if omitted
+        """
+        with self._lock:
+            self._rags[name] = rag_instance
+            if index is not None:
+                self._indexes[name] = index
+            if retriever is not None:
+                self._retrievers[name] = retriever
+
+    def register_many(self, rag_instances: Dict[str, RAG], indexes: Optional[Dict[str, Any]] = None,
+                      retrievers: Optional[Dict[str, Any]] = None) -> None:
+        """Register the rag_instances / indexes / retrievers dicts built by the entry points"""
+        indexes = indexes or {}
+        retrievers = retrievers or {}
+        for name, rag_instance in rag_instances.items():
+            self.register(name, rag_instance, indexes.get(name), retrievers.get(name))
+
+    def _name_lock(self, name: str) -> threading.RLock:
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.RLock())
+
+    def _get_or_build(self, store: Dict[str, Any], name: str, build: Callable[[], Any]) -> Any:
+        """store[name], built once by build() under the name's lock"""
+        with self._lock:
+            if name in store:
+                return store[name]
+        with self._name_lock(name):
+            with self._lock:
+                if name in store:
+                    return store[name]
+            value = build()
+            with self._lock:
+                return store.setdefault(name, value)
+
+    def rag(self, name: str, source_path: Optional[str] = None) -> RAG:
+        """
+        RAG instance for a company, rebuilt on first use if it was never registered
+
+        Args:
+            name (str): Company / collection name
+            source_path (str, optional): The company's document (the state's company_*_doc);
+                required when name was never registered
+
+        Raises:
+            KeyError: name was never registered and no source_path was given
+        """
+        def build() -> RAG:
+            if source_path is None:
+                raise KeyError(f"No RAG instance registered for {name} and no document to rebuild it from")
+            logger.info(f"No RAG instance registered for {name}, rebuilding it from the vector store")
+            return RAG.from_db(name, source_path=source_path, llm=self.llm)
+
+        return self._get_or_build(self._rags, name, build)
+
+    def index(self, name: str, source_path: Optional[str] = None) -> Any:
+        """Index over a company's collection; source_path as for rag()"""
+        return self._get_or_build(self._indexes, name, lambda: self.rag(name, source_path).load_db(name))
+
+    def retriever(self, name: str, source_path: Optional[str] = None) -> Any:
+        """Retriever over a company's index; source_path as for rag()"""
+        return self._get_or_build(
+            self._retrievers,
+            name,
+            lambda: self.rag(name, source_path).make_retriever(name, self.index(name, source_path)),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rags.clear()
+            self._indexes.clear()
+            self._retrievers.clear()
+
+
+_registry = ResourceRegistry()
+
+
+def get_resource_registry() -> ResourceRegistry:
+    """Process-wide registry shared by every agent"""
+    return _registry
+
@@ -1,7 +1,16 @@
-from typing import TypedDict, Dict, List, Any, Optional
+from typing import TypedDict, Dict, List, Any, Optional, Annotated
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
-from RAG.rag_llama import RAG
+
+
+def merge_dicts(left: Optional[Dict], right: Optional[Dict]) -> Dict:
+    """Reducer: concurrent branches each contribute their own keys"""
+    return {**(left or {}), **(right or {})}
+
+
+def take_latest(left: Any, right: Any) -> Any:
+    """Reducer: several branches may report a value in the same step, keep the last"""
+    return right
 
 
 class WebScraperStateRequired(TypedDict):
@@ -26,12 +35,12 @@ class MnAagentState(BaseModel):
     company_b_doc: str = Field(description="Document for company B")
 
     # Workflow Tracking
-    current_step: Optional[str] = Field(
+    current_step: Annotated[Optional[str], take_latest] = Field(
         default=None, description="Current workflow step"
     )
-    prev_step: Optional[str] = Field(default=None, description="Previous workflow step")
+    prev_step: Annotated[Optional[str], take_latest] = Field(default=None, description="Previous workflow step")
     search_iterations: int = Field(default=0, description="Current search iteration")
-    iteration_tracker: Dict[str, int] = Field(
+    iteration_tracker: Annotated[Dict[str, int], merge_dicts] = Field(
         default_factory=lambda: {"a": 0, "b": 0},
         description="Tracker for search iterations per company",
     )
@@ -41,24 +50,25 @@ class MnAagentState(BaseModel):
         default=None, description="Callback for progress updates"
     )
 
-    # Search and Retrieval
-    rag_instances: Dict[str, RAG] = Field(
-        default_factory=dict, description="RAG instances for each company"
+    # Search and Retrieval (RAG instances, indexes and retrievers are resolved by
+    # company name through agents.resources.get_resource_registry())
+    queries_a: List[str] = Field(
+        default_factory=list, description="Pending search queries for company A"
     )
-    indexes: Dict[str, Any] = Field(
-        default_factory=dict, description="Indexes for each company"
-    )
-    retrievers: Dict[str, Any] = Field(
-        default_factory=dict, description="Retrievers for each company"
-    )
-    queries: List[str] = Field(
-        default_factory=list, description="Queries for each company"
+    queries_b: List[str] = Field(
+        default_factory=list, description="Pending search queries for company B"
     )
     search_results_a: List[Dict[str, Any]] = Field(
-        default_factory=list, description="Additional search results for company A"
+        default_factory=list,
+        description="Query, content hash and size of each indexed search result for company A",
     )
     search_results_b: List[Dict[str, Any]] = Field(
-        default_factory=list, description="Additional search results for company B"
+        default_factory=list,
+        description="Query, content hash and size of each indexed search result for company B",
+    )
+    search_stats: Annotated[Dict[str, Dict[str, Any]], merge_dicts] = Field(
+        default_factory=dict,
+        description="Searches run and saved by early stopping, and why the search loop stopped, per company",
     )
 
     # Reports
@@ -80,33 +90,37 @@ class MnAagentState(BaseModel):
     legal_report_b: Optional[str] = Field(
         default=None, description="Filename of the legal report for company B"
     )
-    merger_report: Optional[str] = Field(
+    merger_report: Annotated[Optional[str], take_latest] = Field(
         default=None, description="Filename of the merger report"
     )
     competition_report: Optional[str] = Field(
         default=None, description="Filename of the competition report"
     )
+    output_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for this pair's merger, legal and final reports (merger_reports/ and the working directory when unset)",
+    )
 
     # Financial Analysis
-    dcf_models: Dict[str, Any] = Field(
+    dcf_models: Annotated[Dict[str, Any], merge_dicts] = Field(
         default_factory=dict, description="Discounted Cash Flow models for each company"
     )
-    financial_ratios: Dict[str, Any] = Field(
+    financial_ratios: Annotated[Dict[str, Any], merge_dicts] = Field(
         default_factory=dict, description="Financial ratios for each company"
     )
 
     # Business Analysis
-    supply_chain_analyst: Dict[str, str] = Field(
+    supply_chain_analyst: Annotated[Dict[str, str], merge_dicts] = Field(
         default_factory=dict, description="Supply chain analyst data"
     )
-    industry_position: Dict[str, str] = Field(
+    industry_position: Annotated[Dict[str, str], merge_dicts] = Field(
         default_factory=dict, description="Industry position data"
     )
 
-    merger_acquisition_details: Dict[str, Any] = Field(
+    merger_acquisition_details: Annotated[Dict[str, Any], merge_dicts] = Field(
         default_factory=dict, description="Merger and acquisition details"
     )
-    risk_check: Dict[str, Any] = Field(
+    risk_check: Annotated[Dict[str, Any], merge_dicts] = Field(
         default_factory=dict, description="Risk assessment for each company"
     )
     antitrust_assessment: Dict[str, Any] = Field(
@@ -114,18 +128,18 @@ class MnAagentState(BaseModel):
     )
 
     # New fields to resolve previous errors
-    legal_docs: Dict[str, List[str]] = Field(
+    legal_docs: Annotated[Dict[str, List[str]], merge_dicts] = Field(
         default_factory=dict, description="Legal documents for each company"
     )
     merger_jurisdiction: Optional[str] = Field(
         default=None, description="Jurisdiction for the merger"
     )
-    legal_check: Dict[str, str] = Field(
+    legal_check: Annotated[Dict[str, str], merge_dicts] = Field(
         default_factory=dict, description="Legal check results"
     )
 
     # Error Handling
-    error: Optional[str] = Field(
+    error: Annotated[Optional[str], take_latest] = Field(
         default=None, description="Error message if any step fails"
     )
 
@@ -148,8 +162,8 @@ class MnAagentState(BaseModel):
     legal_report_structure: Dict[str, Any] = Field(
         default_factory=dict, description="Legal report structure data"
     )
-    consistency_issues: Dict[str, Any] = Field(
-        default_factory=dict, description="Consistency issues data"
+    consistency_issues: List[str] = Field(
+        default_factory=list, description="Consistency issues found in the final report"
     )
     section_templates: Dict[str, Any] = Field(
         default_factory=dict, description="Section templates data"
@@ -158,8 +172,26 @@ class MnAagentState(BaseModel):
         default_factory=dict, description="Final report structure data"
     )
 
+    # Diagnostics
+    node_timings: Annotated[Dict[str, Dict[str, float]], merge_dicts] = Field(
+        default_factory=dict,
+        description="Wall-clock start/end/seconds of each workflow node",
+    )
+    context_paths: Annotated[Dict[str, str], merge_dicts] = Field(
+        default_factory=dict,
+        description="Context path (direct or retrieval) taken by each scratch RAG node",
+    )
+    token_usage: Annotated[Dict[str, Dict[str, int]], merge_dicts] = Field(
+        default_factory=dict,
+        description="Input/output tokens spent by each company analysis node, keyed by node and company",
+    )
+    artifact_versions: Annotated[Dict[str, int], merge_dicts] = Field(
+        default_factory=dict,
+        description="Artifact store version loaded or saved for each company's standalone analysis",
+    )
+
     model_config = ConfigDict(
-        arbitrary_types_allowed=True,  # Allow complex types like RAG instances
+        arbitrary_types_allowed=True,  # Allow complex types like the progress callback
         extra="ignore",  # Ignore extra fields not defined in the model
     )
 
@@ -167,3 +199,4 @@ class MnAagentState(BaseModel):
         """Update progress if callback is available"""
         if self.progress_callback and self.current_step:
             self.progress_callback.update(self.current_step)
+
@@ -1,11 +1,18 @@
 import streamlit as st
 import os
 from Main import create_sequential_workflow, MnAagentState
+from agents.resources import get_resource_registry
+from utils.checkpointing import get_checkpointer, run_with_checkpoints
+from utils.node_memo import get_node_memo
+from utils.analyzer_utils import format_search_summary, format_scheduler_summary
+from utils.llm_scheduler import get_scheduler
 from RAG.rag_llama import RAG
+from utils.chat_test import Chat
 import logging
 from datetime import datetime
 import glob
 import time
+import uuid
 
 # Configure logging
 logging.basicConfig(
@@ -35,6 +42,10 @@ def main():
     company_b_name = st.sidebar.text_input("Company B Name", "180_Degree_Consulting")
     company_b_doc = st.sidebar.file_uploader("Upload Company B Document", type=["txt"])
 
+    # Reusing a run id resumes that run from its last completed node
+    st.sidebar.subheader("Run")
+    resume_run_id = st.sidebar.text_input("Resume Run ID (optional)", "")
+
     if st.sidebar.button("Start Analysis"):
         if company_a_doc is not None and company_b_doc is not None:
             try:
@@ -50,6 +61,7 @@ def main():
 
                 # Initialize RAG instances
                 with st.spinner("Initializing RAG instances..."):
+                    llm = Chat()
                     rag_instances = {}
                     indexes = {}
                     retrievers = {}
@@ -61,11 +73,13 @@ def main():
 
                     for company, text_path in company_docs.items():
                         st.write(f"Processing {company}...")
-                        rag_instances[company] = RAG(text_path)
+                        rag_instances[company] = RAG(text_path, llm=llm)
                         indexes[company] = rag_instances[company].create_db(
                             db_name=str(company)
                         )
-                        retrievers[company] = indexes[company].as_retriever()
+                        retrievers[company] = rag_instances[company].make_retriever(company, indexes[company])
+
+                get_resource_registry().register_many(rag_instances, indexes, retrievers)
 
                 # Initialize state and create workflow
                 initial_state = MnAagentState(
@@ -73,16 +87,22 @@ def main():
                     company_b_name=company_b_name,
                     company_a_doc=company_a_path,
                     company_b_doc=company_b_path,
-                    rag_instances=rag_instances,
-                    indexes=indexes,
-                    retrievers=retrievers,
                 )
 
                 with st.spinner("Creating and executing workflow..."):
-                    research_graph = create_sequential_workflow(initial_state)
-                    final_state = research_graph.invoke(
-                        initial_state, config={"recursion_limit": 1000}
+                    run_id = resume_run_id.strip() or str(uuid.uuid4())
+                    st.write(f"Run ID: {run_id}")
+                    # One SQLite connection per browser session, reused by every run it starts
+                    if "checkpointer" not in st.session_state:
+                        st.session_state.checkpointer = get_checkpointer()
+                    research_graph = create_sequential_workflow(
+                        initial_state, llm=llm, checkpointer=st.session_state.checkpointer
                     )
+                    get_node_memo().start_run()
+                    final_state = run_with_checkpoints(research_graph, initial_state, run_id)
+                    logger.info(get_node_memo().run_report())
+                    logger.info(format_search_summary(final_state["search_stats"]))
+                    logger.info(format_scheduler_summary(get_scheduler().stats()))
 
                 # Display results
                 st.success("Analysis completed!")
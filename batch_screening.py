@@ -0,0 +1,261 @@
+"""
+Portfolio screening: one acquirer (or several) against many targets.
+
+Every company in the manifest gets its standalone research -> financial ->
+operations analysis exactly once; each pair then runs only the merger, legal
+and report stages, with pairs executed in parallel and each pair's reports
+written to its own output directory.
+
+Manifest (YAML or JSON):
+
+    companies:
+      Reliance_Industries_Limited: /data/RIL-Integrated-Annual-Report-2023-24_parsed.txt
+      180_Degree_Consulting: /data/dc.txt
+    pairs:
+      - acquirer: Reliance_Industries_Limited
+        target: 180_Degree_Consulting
+
+    python batch_screening.py manifest.yaml --workers 4 --output-dir screening
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+import yaml
+from agents.states import MnAagentState
+from agents.resources import get_resource_registry
+from Main import create_company_workflow, create_deal_workflow
+from RAG.rag_llama import RAG
+from utils.chat_test import Chat
+from utils.analyzer_utils import format_run_summary, format_search_summary, format_scheduler_summary
+from utils.checkpointing import get_checkpointer, run_with_checkpoints
+from utils.node_memo import get_node_memo
+from utils.llm_scheduler import get_scheduler
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+# Companies analyzed / pairs screened at the same time; LLM requests from all
+# of them still share utils.llm_scheduler's provider quota
+SCREENING_WORKERS = int(os.getenv("SCREENING_WORKERS", "4"))
+DEFAULT_OUTPUT_DIR = "screening"
+
+# Standalone outputs of the company-A branch carried into every pair
+STANDALONE_DICT_FIELDS = ["dcf_models", "financial_ratios", "supply_chain_analyst", "industry_position"]
+
+
+def load_manifest(path: str) -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
+    """
+    Read and validate a screening manifest
+
+    Args:
+        path (str): YAML or JSON file with `companies` (name -> document) and `pairs`
+
+    Returns:
+        Tuple[Dict[str, str], List[Tuple[str, str]]]: Company documents and (acquirer, target) pairs
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = yaml.safe_load(file) or {}
+
+    companies = manifest.get("companies") or {}
+    pairs = []
+    for entry in manifest.get("pairs") or []:
+        if isinstance(entry, dict):
+            pair = (entry["acquirer"], entry["target"])
+        else:
+            pair = tuple(entry)
+        if len(pair) != 2 or pair[0] == pair[1]:
+            raise ValueError(f"Invalid pair in {path}: {entry}")
+        missing = [name for name in pair if name not in companies]
+        if missing:
+            raise ValueError(f"Pair {pair} references companies missing from the manifest: {missing}")
+        if pair not in pairs:
+            pairs.append(pair)
+
+    if not pairs:
+        raise ValueError(f"No pairs to screen in {path}")
+    return companies, pairs
+
+
+def pair_dir_name(acquirer: str, target: str) -> str:
+    """Filesystem-safe directory name for a pair"""
+    return "__".join(re.sub(r"[^\w.-]+", "_", name) for name in (acquirer, target))
+
+
+def analyze_company(company: str, doc_path: str, llm, checkpointer, run_id: str) -> Dict[str, Any]:
+    """
+    Index a company's document and run its standalone analysis
+
+    Args:
+        company (str): Company name, also the vector store collection name
+        doc_path (str): Annual report / filing text
+        llm (Chat): Shared Chat client
+        checkpointer: Workflow checkpointer
+        run_id (str): Screening run id; the company thread is `{run_id}:{company}`
+
+    Returns:
+        Dict[str, Any]: Final state of the company workflow
+    """
+    logger.info(f"Analyzing {company} from {doc_path}")
+    rag_instance = RAG(doc_path, llm=llm)
+    index = rag_instance.create_db(db_name=str(company))
+    get_resource_registry().register(company, rag_instance, index, rag_instance.make_retriever(company, index))
+
+    # Company B is unused by the standalone graph
+    state = MnAagentState(company_a_name=company, company_b_name="", company_a_doc=doc_path, company_b_doc="")
+    graph = create_company_workflow(state, llm=llm, checkpointer=checkpointer)
+    return run_with_checkpoints(graph, state, f"{run_id}:{company}")
+
+
+def build_pair_state(acquirer: str, target: str, companies: Dict[str, str],
+                     analyses: Dict[str, Dict[str, Any]], output_dir: str) -> MnAagentState:
+    """Seed a pair's state with both companies' standalone analyses"""
+    acquirer_state, target_state = analyses[acquirer], analyses[target]
+    pair_fields = {
+        field: {
+            acquirer: acquirer_state[field].get(acquirer),
+            target: target_state[field].get(target),
+        }
+        for field in STANDALONE_DICT_FIELDS
+    }
+    return MnAagentState(
+        company_a_name=acquirer,
+        company_b_name=target,
+        company_a_doc=companies[acquirer],
+        company_b_doc=companies[target],
+        search_results_a=acquirer_state["search_results_a"],
+        search_results_b=target_state["search_results_a"],
+        fin_report_a=acquirer_state["fin_report_a"],
+        fin_report_b=target_state["fin_report_a"],
+        ops_report_a=acquirer_state["ops_report_a"],
+        ops_report_b=target_state["ops_report_a"],
+        output_dir=output_dir,
+        **pair_fields,
+    )
+
+
+def screen_pair(acquirer: str, target: str, companies: Dict[str, str], analyses: Dict[str, Dict[str, Any]],
+                output_root: str, llm, checkpointer, run_id: str) -> Dict[str, Any]:
+    """Run the merger, legal and report stages for one pair"""
+    output_dir = os.path.join(output_root, pair_dir_name(acquirer, target))
+    os.makedirs(output_dir, exist_ok=True)
+    state = build_pair_state(acquirer, target, companies, analyses, output_dir)
+    graph = create_deal_workflow(state, llm=llm, checkpointer=checkpointer)
+    final_state = run_with_checkpoints(graph, state, f"{run_id}:{pair_dir_name(acquirer, target)}")
+
+    with open(os.path.join(output_dir, "run_summary.txt"), "w", encoding="utf-8") as f:
+        f.write(format_run_summary(final_state["node_timings"]))
+    return final_state
+
+
+def run_screening(companies: Dict[str, str], pairs: List[Tuple[str, str]], output_root: str = DEFAULT_OUTPUT_DIR,
+                  workers: int = SCREENING_WORKERS, run_id: str = None, llm=None) -> List[Dict[str, Any]]:
+    """
+    Screen every pair, analyzing each company that appears in a pair only once
+
+    A company whose analysis fails only fails the pairs it belongs to.
+
+    Args:
+        companies (Dict[str, str]): Company name -> document path
+        pairs (List[Tuple[str, str]]): (acquirer, target) pairs
+        output_root (str): Parent of the per-pair output directories
+        workers (int): Companies / pairs processed concurrently
+        run_id (str): Screening run id; reuse it to resume an interrupted screening
+        llm (Chat): Shared Chat client
+
+    Returns:
+        List[Dict[str, Any]]: Per-pair status, output directory, seconds and error
+    """
+    run_id = run_id or str(uuid.uuid4())
+    llm = llm if llm is not None else Chat()
+    checkpointer = get_checkpointer()
+    workers = max(1, workers)
+    needed = list(dict.fromkeys(name for pair in pairs for name in pair))
+    logger.info(
+        f"Screening run {run_id}: {len(pairs)} pairs over {len(needed)} companies with {workers} workers "
+        f"(pass --run-id {run_id} to resume)"
+    )
+
+    # Stage 1: each company's standalone analysis, once
+    start = time.perf_counter()
+    analyses, company_errors = {}, {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(needed)), thread_name_prefix="screen-company") as executor:
+        futures = {
+            executor.submit(analyze_company, company, companies[company], llm, checkpointer, run_id): company
+            for company in needed
+        }
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                analyses[company] = future.result()
+            except Exception as e:
+                logger.error(f"Standalone analysis failed for {company}: {e}")
+                company_errors[company] = str(e)
+    logger.info(f"Analyzed {len(analyses)}/{len(needed)} companies in {time.perf_counter() - start:.1f}s")
+    logger.info(format_search_summary(
+        {company: stats for analysis in analyses.values() for company, stats in analysis["search_stats"].items()}
+    ))
+
+    # Stage 2: merger, legal and report stages per pair
+    results = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(pairs)), thread_name_prefix="screen-pair") as executor:
+        futures = {}
+        for acquirer, target in pairs:
+            output_dir = os.path.join(output_root, pair_dir_name(acquirer, target))
+            failed = [name for name in (acquirer, target) if name in company_errors]
+            if failed:
+                results.append({
+                    "acquirer": acquirer, "target": target, "status": "skipped", "output_dir": output_dir,
+                    "seconds": 0.0, "error": f"Standalone analysis failed for {', '.join(failed)}",
+                })
+                continue
+            future = executor.submit(
+                screen_pair, acquirer, target, companies, analyses, output_root, llm, checkpointer, run_id
+            )
+            futures[future] = (acquirer, target, output_dir, time.perf_counter())
+
+        for future in as_completed(futures):
+            acquirer, target, output_dir, submitted = futures[future]
+            result = {"acquirer": acquirer, "target": target, "output_dir": output_dir}
+            try:
+                final_state = future.result()
+                result.update(status="error" if final_state.get("error") else "done", error=final_state.get("error"))
+            except Exception as e:
+                logger.error(f"Screening failed for {acquirer} -> {target}: {e}")
+                result.update(status="failed", error=str(e))
+            result["seconds"] = round(time.perf_counter() - submitted, 2)
+            results.append(result)
+
+    order = {pair: i for i, pair in enumerate(pairs)}
+    results.sort(key=lambda result: order[(result["acquirer"], result["target"])])
+    os.makedirs(output_root, exist_ok=True)
+    with open(os.path.join(output_root, "screening_summary.json"), "w", encoding="utf-8") as f:
+        json.dump({"run_id": run_id, "pairs": results}, f, indent=2)
+
+    done = sum(result["status"] == "done" for result in results)
+    logger.info(f"Screening run {run_id} finished: {done}/{len(pairs)} pairs completed, results in {output_root}")
+    logger.info(format_scheduler_summary(get_scheduler().stats()))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen many company pairs, analyzing each company once")
+    parser.add_argument("manifest", help="YAML/JSON manifest with `companies` and `pairs`")
+    parser.add_argument("--workers", type=int, default=SCREENING_WORKERS, help="Companies / pairs processed concurrently")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Parent directory of the per-pair outputs")
+    parser.add_argument("--run-id", default=None, help="Screening run id; pass an earlier run's id to resume it")
+    args = parser.parse_args()
+
+    companies, pairs = load_manifest(args.manifest)
+    get_node_memo().start_run()
+    run_screening(companies, pairs, output_root=args.output_dir, workers=args.workers, run_id=args.run_id)
+    logger.info(get_node_memo().run_report())
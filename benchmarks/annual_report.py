@@ -0,0 +1,41 @@
+"""
+Synthetic annual-report text shared by the retrieval benchmarks in
+RAG.keyword_index and RAG.adaptive_retriever.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+REPORT_METRICS = [
+    "EBITDA", "capital expenditure", "free cash flow", "net debt", "return on capital employed",
+    "gross refining margin", "working capital", "dividend payout", "R&D spend", "interest coverage",
+]
+FILLER = (
+    "The segment continued to invest in customer experience, digital platforms and sustainability "
+    "initiatives while maintaining operational discipline across its businesses and geographies. "
+)
+
+
+def synthetic_annual_report(segments: int = 6, years: int = 8,
+                            metrics: Sequence[str] = REPORT_METRICS) -> Tuple[str, List[Dict]]:
+    """
+    One paragraph per (segment, fiscal year, metric), each holding a single
+    answer sentence between filler
+
+    Args:
+        segments (int): Business segments reported on
+        years (int): Fiscal years per segment, from FY2016-17
+        metrics (Sequence[str]): Metrics reported per segment and year
+
+    Returns:
+        Tuple[str, List[Dict]]: Document text, and per paragraph a fact with
+        "segment", "fiscal_year", "metric" and the exact "answer" sentence
+    """
+    paragraphs, facts = [], []
+    for segment in range(segments):
+        for year in range(years):
+            fiscal_year = f"FY{2016 + year}-{17 + year}"
+            for i, metric in enumerate(metrics):
+                value = (segment + 1) * 1000 + year * 37 + i * 11
+                answer = f"Segment {segment} reported {metric} for {fiscal_year} of Rs {value} crore."
+                paragraphs.append(FILLER * 2 + answer + " " + FILLER)
+                facts.append({"segment": segment, "fiscal_year": fiscal_year, "metric": metric, "answer": answer})
+    return "\n\n".join(paragraphs), facts
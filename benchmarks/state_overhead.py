@@ -0,0 +1,91 @@
+"""
+Per-step state overhead of the old state (live objects and raw search result
+text in MnAagentState) versus the lean state (names and result hashes),
+measured over a chain of no-op nodes like the real workflow's.
+
+    python -m benchmarks.state_overhead
+"""
+import logging
+import time
+from typing import Annotated, Any, Dict
+import numpy as np
+from langgraph.graph import StateGraph, START, END
+from pydantic import Field
+from agents.states import MnAagentState, merge_dicts
+from RAG.embedding_cache import text_hash
+from utils.checkpointing import StateSerializer
+
+STEPS, RUNS, RESULTS_PER_COMPANY, RESULT_CHARS = 50, 5, 26, 4000
+
+
+class _Handle:
+    """Stand-in for a RAG instance / index / retriever holding model weights"""
+
+    def __init__(self):
+        self.weights = np.zeros((2048, 384), dtype=np.float32)
+
+
+class _LegacyState(MnAagentState):
+    rag_instances: Annotated[Dict[str, Any], merge_dicts] = Field(default_factory=dict)
+    indexes: Annotated[Dict[str, Any], merge_dicts] = Field(default_factory=dict)
+    retrievers: Annotated[Dict[str, Any], merge_dicts] = Field(default_factory=dict)
+
+
+def _touch(state):
+    return {"current_step": f"step_{time.perf_counter_ns()}"}
+
+
+def _build(state_cls):
+    workflow = StateGraph(state_cls)
+    for i in range(STEPS):
+        workflow.add_node(f"node_{i}", _touch)
+        workflow.add_edge(START if i == 0 else f"node_{i - 1}", f"node_{i}")
+    workflow.add_edge(f"node_{STEPS - 1}", END)
+    return workflow.compile()
+
+
+def _per_step_ms(graph, state) -> float:
+    graph.invoke(state, config={"recursion_limit": STEPS + 10})
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        graph.invoke(state, config={"recursion_limit": STEPS + 10})
+    return (time.perf_counter() - start) / (RUNS * STEPS) * 1000
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    companies = ["company_a", "company_b"]
+    raw_results = [
+        {"query": f"query {i}", "result": f"{i} " + "x" * RESULT_CHARS}
+        for i in range(RESULTS_PER_COMPANY)
+    ]
+    common = dict(company_a_name=companies[0], company_b_name=companies[1], company_a_doc="a.txt", company_b_doc="b.txt")
+
+    legacy_state = _LegacyState(
+        **common,
+        rag_instances={name: _Handle() for name in companies},
+        indexes={name: _Handle() for name in companies},
+        retrievers={name: _Handle() for name in companies},
+        search_results_a=raw_results,
+        search_results_b=raw_results,
+    )
+    records = [
+        {"query": result["query"], "result_hash": text_hash(result["result"]), "chars": len(result["result"])}
+        for result in raw_results
+    ]
+    lean_state = MnAagentState(**common, search_results_a=records, search_results_b=records)
+
+    legacy_ms = _per_step_ms(_build(_LegacyState), legacy_state)
+    lean_ms = _per_step_ms(_build(MnAagentState), lean_state)
+
+    # Every checkpoint re-serializes the state, so its size is paid once per step
+    serializer = StateSerializer()
+    legacy_fields = {"search_results_a": legacy_state.search_results_a, "search_results_b": legacy_state.search_results_b}
+    lean_fields = {"search_results_a": lean_state.search_results_a, "search_results_b": lean_state.search_results_b}
+    legacy_bytes = len(serializer.dumps_typed(legacy_fields)[1])
+    lean_bytes = len(serializer.dumps_typed(lean_fields)[1])
+
+    print(f"legacy state: {legacy_ms:7.3f} ms per step")
+    print(f"lean state:   {lean_ms:7.3f} ms per step")
+    print(f"saved:        {legacy_ms - lean_ms:7.3f} ms per step, {(legacy_ms - lean_ms) * STEPS:7.1f} ms per {STEPS}-step run")
+    print(f"search results per checkpoint: {legacy_bytes / 1024:7.1f} KB -> {lean_bytes / 1024:7.1f} KB")
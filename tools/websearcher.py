@@ -1,4 +1,9 @@
+import asyncio
 import logging
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional
 from langchain_community.tools import TavilySearchResults
 from dotenv import load_dotenv
 import json
@@ -13,6 +18,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Concurrent Tavily requests per batch and seconds allowed for each query
+DEFAULT_SEARCH_CONCURRENCY = int(os.getenv("WEB_SEARCH_CONCURRENCY", "8"))
+DEFAULT_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "30"))
+
+
+def _result_texts(search_results) -> Optional[str]:
+    """Join the text of Tavily results, or None if the response is not a result list"""
+    if not isinstance(search_results, list):
+        return None
+    return '\n'.join(
+        result.get('content', '') or result.get('text', '')
+        for result in search_results
+    )
+
+
 class TavilySearchTool:
     def __init__(self, max_results=1, search_depth="advanced", include_answer=True,
                  include_raw_content=False, include_images=False):
@@ -32,24 +52,116 @@ class TavilySearchTool:
             search_results = self.tool.invoke(query)
             print("Raw Search Results:", search_results)
             
-            # Check if search_results is a list
-            if not isinstance(search_results, list):
+            result_text = _result_texts(search_results)
+            if result_text is None:
                 logger.error(f"Unexpected search results type: {type(search_results)}")
                 return "Error: Unexpected search results format"
-            
-            # Extract text from results
-            result_texts = [
-                result.get('content', '') or result.get('text', '') 
-                for result in search_results
-            ]
-            
-            # Print result texts for debugging
-            # print("Result Texts:", result_texts)
-            return '\n'.join(result_texts)
+            return result_text
         except Exception as e:
             logger.error(f"Web search error for query '{query}': {e}")
             return f"Error in web search: {e}"
 
+    async def _search_one(self, query: str, semaphore: asyncio.Semaphore, timeout: float) -> Optional[str]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                search_results = await asyncio.wait_for(self.tool.ainvoke(query), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Web search timed out after {timeout:.0f}s for query '{query}'")
+                return None
+            except Exception as e:
+                logger.error(f"Web search error for query '{query}': {e}")
+                return None
+
+            result_text = _result_texts(search_results)
+            if result_text is None:
+                # The tool reports API failures as a string instead of raising
+                logger.error(f"Web search failed for query '{query}': {search_results}")
+                return None
+            logger.info(f"Web search for '{query}' finished in {time.perf_counter() - start:.2f}s")
+            return result_text
+
+    async def abatch_invoke_tool(
+        self,
+        queries: List[str],
+        max_concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
+        timeout: float = DEFAULT_SEARCH_TIMEOUT,
+    ) -> List[Optional[str]]:
+        """Async counterpart of batch_invoke_tool"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        return await asyncio.gather(*(self._search_one(query, semaphore, timeout) for query in queries))
+
+    async def aiter_invoke_tool(
+        self,
+        queries: List[str],
+        max_concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
+        timeout: float = DEFAULT_SEARCH_TIMEOUT,
+    ) -> AsyncIterator[Optional[str]]:
+        """
+        Yield each query's result in input order while keeping up to
+        max_concurrency searches in flight
+
+        The next search starts when a result is taken, so a caller that stops
+        iterating early (close the generator, e.g. with contextlib.aclosing)
+        only cancels the searches already in flight.
+
+        Args:
+            queries (List[str]): Search queries
+            max_concurrency (int): Maximum number of searches in flight
+            timeout (float): Seconds allowed for each query
+
+        Yields:
+            Optional[str]: Result text per query; None for queries that failed or timed out
+        """
+        max_concurrency = max(1, max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        remaining = iter(queries)
+        in_flight = deque()
+        try:
+            for query in remaining:
+                in_flight.append(asyncio.ensure_future(self._search_one(query, semaphore, timeout)))
+                if len(in_flight) == max_concurrency:
+                    break
+            while in_flight:
+                result = await in_flight.popleft()
+                query = next(remaining, None)
+                if query is not None:
+                    in_flight.append(asyncio.ensure_future(self._search_one(query, semaphore, timeout)))
+                yield result
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    def batch_invoke_tool(
+        self,
+        queries: List[str],
+        max_concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
+        timeout: float = DEFAULT_SEARCH_TIMEOUT,
+    ) -> List[Optional[str]]:
+        """
+        Run several searches concurrently
+
+        Args:
+            queries (List[str]): Search queries
+            max_concurrency (int): Maximum number of searches in flight
+            timeout (float): Seconds allowed for each query
+
+        Returns:
+            List[Optional[str]]: Result text per query, in input order; None for
+            queries that failed or timed out
+        """
+        if not queries:
+            return []
+        start = time.perf_counter()
+        results = asyncio.run(self.abatch_invoke_tool(queries, max_concurrency, timeout))
+        failed = sum(1 for result in results if result is None)
+        logger.info(
+            f"Batch web search: {len(queries)} queries ({failed} failed) in "
+            f"{time.perf_counter() - start:.2f}s with concurrency {max_concurrency}"
+        )
+        return results
+
+
 if __name__ == "__main__":
     # Test Tavily search
     search_tool = TavilySearchTool()
@@ -1,6 +1,13 @@
 import logging
+import os
+import sys
+import time
 from datetime import datetime
-from typing import Callable, Any
+from typing import Callable, Any, Dict
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,7 +29,94 @@ def log_node(node_name):
     return decorator
 
 
+def timed_node(node_name):
+    """
+    Like log_node, but also adds the node's wall-clock interval to its update
+    under node_timings so a run summary can be built from the final state.
+    The node must return its update as a dict.
+    """
+    def decorator(func):
+        def wrapper(state, *args, **kwargs):
+            start = time.time()
+            result = func(state, *args, **kwargs)
+            end = time.time()
+            logger.info(f"Completed node: {node_name} in {end - start:.2f} seconds")
+            return {**result, "node_timings": {node_name: {"start": start, "end": end, "seconds": end - start}}}
+        return wrapper
+    return decorator
+
+
+def format_run_summary(node_timings: Dict[str, Dict[str, float]]) -> str:
+    """
+    Per-node timing table ordered by start time
+
+    Wall time is the span from the first node start to the last node end; with
+    parallel branches it is shorter than the summed node time, and the ratio
+    shows how much of the work overlapped.
+    """
+    if not node_timings:
+        return "Run summary: no node timings recorded"
+
+    ordered = sorted(node_timings.items(), key=lambda item: item[1]["start"])
+    run_start = ordered[0][1]["start"]
+    wall = max(timing["end"] for _, timing in ordered) - run_start
+    total = sum(timing["seconds"] for _, timing in ordered)
+
+    width = max(len(name) for name, _ in ordered)
+    lines = ["Run summary:", f"  {'node':<{width}}  {'start':>8}  {'end':>8}  {'seconds':>8}"]
+    for name, timing in ordered:
+        lines.append(
+            f"  {name:<{width}}  {timing['start'] - run_start:8.2f}  "
+            f"{timing['end'] - run_start:8.2f}  {timing['seconds']:8.2f}"
+        )
+    lines.append(f"  summed node time: {total:.2f}s")
+    lines.append(f"  wall time:        {wall:.2f}s")
+    if wall > 0:
+        lines.append(f"  overlap factor:   {total / wall:.2f}x")
+    return "\n".join(lines)
+
+
+def format_search_summary(search_stats: Dict[str, Dict[str, Any]]) -> str:
+    """Searches run and saved by early stopping per company, with the stop reason"""
+    if not search_stats:
+        return "Web search: no searches ran"
+
+    saved = sum(stats["searches_saved"] for stats in search_stats.values())
+    run = sum(stats["searches_run"] for stats in search_stats.values())
+    lines = [f"Web search: {run} searches run, {saved} saved by early stopping"]
+    for company, stats in search_stats.items():
+        lines.append(
+            f"  {company}: {stats['searches_run']} run, {stats['searches_saved']} saved "
+            f"({stats['stop_reason']}, mean novelty {stats['mean_novelty']:.2f}, {stats['result_tokens']} result tokens)"
+        )
+    return "\n".join(lines)
+
+
+def format_scheduler_summary(scheduler_stats: Dict[str, float]) -> str:
+    """Requests, retries and rate-limit queueing seen by the shared LLM scheduler"""
+    if not scheduler_stats.get("requests"):
+        return "LLM scheduler: no requests"
+    return (
+        f"LLM scheduler: {scheduler_stats['requests']} requests, {scheduler_stats['retries']} retries, "
+        f"{scheduler_stats['hedges']} hedges; rate-limit wait avg {scheduler_stats['avg_wait_seconds']:.2f}s, "
+        f"max {scheduler_stats['max_wait_seconds']:.2f}s; max queue depth {scheduler_stats['max_queue_depth']}"
+    )
+
+
 def truncate_text(text, max_length=10000):
     if len(text) <= max_length:
         return text
-    return text[:max_length] + "... [truncated]"
\ No newline at end of file
+    return text[:max_length] + "... [truncated]"
+
+def resident_memory_mb():
+    """Current resident set size of this process in MB, 0.0 where it cannot be measured"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Non-Linux fallback: peak RSS (KB on Linux, bytes on macOS)
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+import yaml
+from utils.chat_test import DEFAULT_MODEL
+from utils.node_memo import fingerprint
+from utils.sqlite_store import SQLiteStore, env_flag, run_store_cli, shared_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_PATH = "./artifacts/artifacts.sqlite"
+# prompts.yaml sections that shape a company's standalone analysis
+COMPANY_PROMPT_SECTIONS = ["RAG_prompts", "Researcher_prompt", "Fin_Agent_prompt", "Ops_Agent_prompt"]
+PROMPTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts.yaml")
+
+
+def document_hash(doc: str, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a company's source document
+
+    Args:
+        doc (str): Path to the document, or the document text itself
+        block_size (int): Bytes hashed per read, so large filings are never fully in memory
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    if os.path.isfile(doc):
+        with open(doc, "rb") as file:
+            for block in iter(lambda: file.read(block_size), b""):
+                digest.update(block)
+    else:
+        digest.update(doc.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def company_prompt_version(prompts_path: str = PROMPTS_PATH) -> str:
+    """Short fingerprint of the prompts used by the research, financial and operations agents"""
+    with open(prompts_path, "r", encoding="utf-8") as file:
+        prompts = yaml.safe_load(file)
+    return fingerprint(**{section: prompts.get(section) for section in COMPANY_PROMPT_SECTIONS})[:12]
+
+
+def artifact_store_disabled_by_env() -> bool:
+    """ARTIFACT_STORE_DISABLED=1 regenerates every company analysis (results are still saved)"""
+    return env_flag("ARTIFACT_STORE_DISABLED")
+
+
+class ArtifactStore(SQLiteStore):
+    """
+    Versioned store of per-company analysis artifacts (financial and operations
+    reports, DCF model, ratios, supply chain and industry analysis, search
+    result records).
+
+    Entries are keyed by company and source-document hash; each save under the
+    same key adds a new version with its model, prompt version, timestamp and
+    token cost, and lookups return the newest version matching the current
+    model and prompts, so a company analyzed for one deal is reused by the next.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS company_artifacts (
+            company TEXT NOT NULL,
+            doc_hash TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            input_tokens INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            artifacts TEXT NOT NULL,
+            PRIMARY KEY (company, doc_hash, version)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS company_artifacts_lookup "
+        "ON company_artifacts (company, doc_hash, model, prompt_version, version)",
+    )
+
+    def __init__(self, path: str = DEFAULT_ARTIFACT_PATH):
+        super().__init__(path)
+
+    def save(self, company: str, doc_hash: str, artifacts: Dict[str, Any], model: str = DEFAULT_MODEL,
+             prompt_version: str = "", input_tokens: int = 0, output_tokens: int = 0) -> int:
+        """
+        Store a new version of a company's analysis
+
+        Args:
+            company (str): Company name
+            doc_hash (str): document_hash of the source document
+            artifacts (Dict[str, Any]): JSON-serializable analysis outputs
+            model (str): Model that produced them
+            prompt_version (str): company_prompt_version at generation time
+            input_tokens (int): Prompt tokens spent producing them
+            output_tokens (int): Completion tokens spent producing them
+
+        Returns:
+            int: Version number of the new entry
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM company_artifacts WHERE company = ? AND doc_hash = ?",
+                (company, doc_hash),
+            ).fetchone()
+            version = row[0] + 1
+            self._conn.execute(
+                "INSERT INTO company_artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (company, doc_hash, version, model, prompt_version, time.time(),
+                 input_tokens, output_tokens, json.dumps(artifacts)),
+            )
+            self._conn.commit()
+        logger.info(f"Saved artifacts for {company} as version {version} ({input_tokens + output_tokens} tokens)")
+        return version
+
+    def latest(self, company: str, doc_hash: str, model: Optional[str] = DEFAULT_MODEL,
+               prompt_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Newest stored analysis of a company's document
+
+        Args:
+            company (str): Company name
+            doc_hash (str): document_hash of the source document
+            model (str, optional): Only entries produced by this model; None for any
+            prompt_version (str, optional): Only entries produced with these prompts; None for any
+
+        Returns:
+            Optional[Dict[str, Any]]: Entry metadata plus an "artifacts" dict, or None
+        """
+        conditions, params = ["company = ?", "doc_hash = ?"], [company, doc_hash]
+        if model is not None:
+            conditions.append("model = ?")
+            params.append(model)
+        if prompt_version is not None:
+            conditions.append("prompt_version = ?")
+            params.append(prompt_version)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT version, model, prompt_version, created_at, input_tokens, output_tokens, artifacts "
+                f"FROM company_artifacts WHERE {' AND '.join(conditions)} ORDER BY version DESC LIMIT 1",
+                params,
+            ).fetchone()
+        if row is None:
+            return None
+        version, model, prompt_version, created_at, input_tokens, output_tokens, artifacts = row
+        return {
+            "company": company,
+            "doc_hash": doc_hash,
+            "version": version,
+            "model": model,
+            "prompt_version": prompt_version,
+            "created_at": created_at,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "artifacts": json.loads(artifacts),
+        }
+
+    def history(self, company: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Metadata of every stored version, newest first, optionally for one company"""
+        where, params = (" WHERE company = ?", [company]) if company else ("", [])
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT company, doc_hash, version, model, prompt_version, created_at, input_tokens, output_tokens "
+                f"FROM company_artifacts{where} ORDER BY company, created_at DESC",
+                params,
+            ).fetchall()
+        keys = ["company", "doc_hash", "version", "model", "prompt_version", "created_at", "input_tokens", "output_tokens"]
+        return [dict(zip(keys, row)) for row in rows]
+
+    def invalidate(self, company: Optional[str] = None) -> int:
+        """Delete stored versions, optionally only one company's"""
+        where, params = (" WHERE company = ?", [company]) if company else ("", [])
+        with self._lock:
+            deleted = self._conn.execute(f"DELETE FROM company_artifacts{where}", params).rowcount
+            self._conn.commit()
+        logger.info(f"Invalidated {deleted} stored company analyses")
+        return deleted
+
+
+def get_artifact_store(path: str = DEFAULT_ARTIFACT_PATH) -> ArtifactStore:
+    """Process-wide artifact store for path"""
+    return shared_store(ArtifactStore, path)
+
+
+def _print_versions(store: ArtifactStore, args) -> None:
+    for entry in store.history(args.company):
+        print(
+            f"{entry['company']:<40} v{entry['version']:<3} doc {entry['doc_hash'][:12]} "
+            f"prompts {entry['prompt_version']} {entry['model']} "
+            f"{entry['input_tokens'] + entry['output_tokens']:>7} tokens {time.ctime(entry['created_at'])}"
+        )
+
+
+if __name__ == "__main__":
+    run_store_cli(
+        "Inspect or invalidate stored company analyses",
+        DEFAULT_ARTIFACT_PATH,
+        get_artifact_store,
+        _print_versions,
+        filters={"company": "Only this company"},
+        list_filters=["company"],
+    )
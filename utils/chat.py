@@ -2,32 +2,69 @@ from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-import time
+import threading
+from utils.llm_cache import get_response_cache, make_cache_key, cache_disabled_by_env
+from utils.llm_pool import make_http_client, DEFAULT_REQUEST_TIMEOUT
+from utils.llm_scheduler import get_scheduler, estimate_tokens
 
 class Chat:
-    def __init__(self):
+    # ChatGroq clients reused across calls, keyed by (model, temperature, max_tokens)
+    _clients = {}
+    _clients_lock = threading.Lock()
+    _http_client = None
+
+    def __init__(self, use_cache=True, request_timeout=DEFAULT_REQUEST_TIMEOUT, scheduler=None):
         load_dotenv()
+        self.scheduler = scheduler or get_scheduler()
+        self.request_timeout = request_timeout
+        self.cache = get_response_cache() if use_cache and not cache_disabled_by_env() else None
+
+    def _get_client(self, model, temperature, max_tokens):
+        key = (model, temperature, max_tokens, self.request_timeout)
+        with Chat._clients_lock:
+            if Chat._http_client is None:
+                Chat._http_client = make_http_client(timeout=self.request_timeout)
+            if key not in Chat._clients:
+                Chat._clients[key] = ChatGroq(
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=self.request_timeout,
+                    max_retries=0,  # retries are handled by the scheduler
+                    http_client=Chat._http_client,
+                )
+            return Chat._clients[key]
 
-    def invoke_llm_langchain(self,messages, model="mistral-saba-24b", temperature=0.7, max_tokens=5000):
+    def invoke_llm_langchain(self,messages, model="mistral-saba-24b", temperature=0.7, max_tokens=5000, bypass_cache=False):
         """
-        Invoke the LLM with the given messages
+        Invoke the LLM with the given messages, answering repeats from the response cache
         """
-        llm = ChatGroq(model=model, temperature=temperature, max_tokens=max_tokens)
         net_input = 0
         net_output = 0
 
-        try:
-            response = llm.invoke(messages)
-        except Exception as e:
-            print(f"Error in invoking LLM, sending LLM to sleep for 10 seconds")
-            time.sleep(10)
-            print(f"Retrying now")
-            response = llm.invoke(messages)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(messages, model, temperature, max_tokens)
+            if not bypass_cache:
+                cached = self.cache.get(cache_key)
+                self.cache.log_stats("hit" if cached is not None else "miss")
+                if cached is not None:
+                    messages.append(AIMessage(content=cached[0]))
+                    return messages, net_input, net_output
+
+        llm = self._get_client(model, temperature, max_tokens)
+
+        response = self.scheduler.run(
+            lambda: llm.invoke(messages),
+            estimated_tokens=estimate_tokens("".join(str(m.content) for m in messages), max_tokens),
+        )
 
         try:
             content = response.content
             input_tokens = response.usage_metadata["input_tokens"]
             output_tokens = response.usage_metadata["output_tokens"]
+            if cache_key is not None:
+                self.cache.put(cache_key, content, input_tokens, output_tokens)
         except Exception as e:
             content = response
             input_tokens = net_input
@@ -2,16 +2,26 @@ import os
 from dotenv import load_dotenv
 from openai import OpenAI
 from typing import List, Tuple, Union
-import time
+import logging
 from utils.message import HumanMessage, AIMessage
+from utils.llm_cache import get_response_cache, make_cache_key, cache_disabled_by_env
+from utils.llm_pool import LLMClientPool, DEFAULT_REQUEST_TIMEOUT
+from utils.llm_scheduler import get_scheduler, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://adb-2855448551482176.16.azuredatabricks.net/serving-endpoints"
+DEFAULT_MODEL = "databricks-meta-llama-3-3-70b-instruct"
 
 class Chat:
-    def __init__(self):
+    def __init__(self, use_cache=True, client=None, request_timeout=DEFAULT_REQUEST_TIMEOUT, scheduler=None):
         load_dotenv()
-        self.client = OpenAI(
-                        api_key = os.getenv("DATABRICKS_TOKEN"),
-                        base_url="https://adb-2855448551482176.16.azuredatabricks.net/serving-endpoints"
-                        )
+        self.scheduler = scheduler or get_scheduler()
+        # Pooled keep-alive client shared by every Chat talking to the same endpoint
+        self.client = client or LLMClientPool.get(BASE_URL, os.getenv("DATABRICKS_TOKEN"))
+        self.request_timeout = request_timeout
+        # Exact-match response cache shared by every Chat in the process
+        self.cache = get_response_cache() if use_cache and not cache_disabled_by_env() else None
 
     def _convert_messages(self, messages: List[Union[HumanMessage, AIMessage]]) -> List[dict]:
         """
@@ -21,40 +31,57 @@ class Chat:
 
     def invoke_llm_langchain(self, 
                               messages: List[Union[HumanMessage, AIMessage]], 
-                              model="databricks-meta-llama-3-3-70b-instruct", 
+                              model=DEFAULT_MODEL, 
                               temperature=0.7, 
-                              max_tokens=5000) -> Tuple[List[Union[HumanMessage, AIMessage]], int, int]:
+                              max_tokens=5000,
+                              bypass_cache=False) -> Tuple[List[Union[HumanMessage, AIMessage]], int, int]:
         """
         Invoke the LLM with the given messages
+
+        Identical requests are answered from the response cache without tokens
+        being spent; bypass_cache=True forces a fresh call and refreshes the entry.
         """
-        net_input = 0
-        net_output = 0
-        
-        # Convert messages to OpenAI format
         openai_messages = self._convert_messages(messages)
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=openai_messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-        except Exception as e:
-            print(f"Error in invoking LLM, sending LLM to sleep for 10 seconds")
-            time.sleep(10)
-            print(f"Retrying now")
-            response = self.client.chat.completions.create(
+        cache_key, cached = self._lookup_cache(messages, model, temperature, max_tokens, bypass_cache)
+        if cached is not None:
+            messages.append(AIMessage(content=cached))
+            return messages, 0, 0
+
+        # Rate limiting, retries with backoff and hedging live in the shared scheduler
+        response = self.scheduler.run(
+            lambda: self.client.chat.completions.create(
                 model=model,
                 messages=openai_messages,
                 temperature=temperature,
-                max_tokens=max_tokens
-            )
-        
+                max_tokens=max_tokens,
+                timeout=self.request_timeout
+            ),
+            estimated_tokens=estimate_tokens("".join(m["content"] for m in openai_messages), max_tokens),
+        )
+        return self._finish(messages, response, cache_key)
+
+    def _lookup_cache(self, messages, model, temperature, max_tokens, bypass_cache):
+        """Return (cache_key, cached content or None)"""
+        if self.cache is None:
+            return None, None
+        cache_key = make_cache_key(messages, model, temperature, max_tokens)
+        if bypass_cache:
+            return cache_key, None
+        cached = self.cache.get(cache_key)
+        self.cache.log_stats("hit" if cached is not None else "miss")
+        return cache_key, cached[0] if cached is not None else None
+
+    def _finish(self, messages, response, cache_key):
+        """Extract content and usage, store the response and append the AI message"""
+        net_input = 0
+        net_output = 0
+
         try:
             content = response.choices[0].message.content
             input_tokens = response.usage.prompt_tokens if response.usage else net_input
             output_tokens = response.usage.completion_tokens if response.usage else net_output
+            if cache_key is not None:
+                self.cache.put(cache_key, content, input_tokens, output_tokens)
         except Exception as e:
             content = str(response)
             input_tokens = net_input
@@ -66,13 +93,13 @@ class Chat:
         
         return messages, input_tokens, output_tokens
 
-    def llm(self, model="databricks-meta-llama-3-3-70b-instruct", temperature=0.2):
+    def llm(self, model=DEFAULT_MODEL, temperature=0.2):
         """
         Create an OpenAI client with specified model and temperature
         """
         return OpenAI(
             api_key = os.getenv("DATABRICKS_TOKEN"),
-            base_url="https://adb-2855448551482176.16.azuredatabricks.net/serving-endpoints",
+            base_url=BASE_URL,
             model=model,
             temperature=temperature
         )
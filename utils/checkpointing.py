@@ -0,0 +1,92 @@
+import logging
+import os
+import sqlite3
+from typing import Any, Tuple
+from pydantic import BaseModel
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = "./checkpoints/workflow.sqlite"
+# Live objects with no meaningful persisted form; restored as None
+TRANSIENT_KEYS = {"progress_callback"}
+
+
+class StateSerializer(JsonPlusSerializer):
+    """
+    Checkpoint serializer for MnAagentState.
+
+    The state itself holds only names and small values: RAG instances, indexes
+    and retrievers live in agents.resources and are rebuilt from the vector
+    store by name when a resumed run needs them. The only live object left,
+    the UI progress callback, is stored as None, and the graph input is stored
+    as a plain field dict.
+    """
+
+    def _plain(self, obj: Any) -> Any:
+        if isinstance(obj, BaseModel):
+            return {
+                name: None if name in TRANSIENT_KEYS else getattr(obj, name)
+                for name in type(obj).model_fields
+            }
+        return obj
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if isinstance(obj, dict) and "channel_values" in obj:
+            # A full checkpoint: blank out transient channels, flatten the stored input
+            obj = {
+                **obj,
+                "channel_values": {
+                    key: None if key in TRANSIENT_KEYS else self._plain(value)
+                    for key, value in obj["channel_values"].items()
+                },
+            }
+        return super().dumps_typed(self._plain(obj))
+
+
+def get_checkpointer(path: str = DEFAULT_CHECKPOINT_PATH) -> SqliteSaver:
+    """
+    SQLite checkpointer for the M&A workflow
+
+    Args:
+        path (str): Database file; created if missing
+
+    Returns:
+        SqliteSaver: Checkpointer to pass to workflow.compile()
+    """
+    checkpoint_dir = os.path.dirname(path)
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    # Parallel branches checkpoint from worker threads; SqliteSaver serializes access itself
+    conn = sqlite3.connect(path, check_same_thread=False)
+    logger.info(f"Using workflow checkpoints at {path}")
+    return SqliteSaver(conn, serde=StateSerializer())
+
+
+def run_with_checkpoints(graph, initial_state: Any, thread_id: str, recursion_limit: int = 1000) -> Any:
+    """
+    Invoke graph under thread_id, resuming from the last completed node if that
+    thread has an unfinished run and returning the stored final state if it
+    already finished
+
+    Args:
+        graph: Workflow compiled with a checkpointer
+        initial_state: State used when the thread has nothing to resume
+        thread_id (str): Run identifier; reuse it to resume
+        recursion_limit (int): LangGraph recursion limit
+
+    Returns:
+        Final state of the run
+    """
+    config = {"configurable": {"thread_id": thread_id}, "recursion_limit": recursion_limit}
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        logger.info(f"Resuming run {thread_id} at {', '.join(snapshot.next)}")
+        return graph.invoke(None, config)
+    if snapshot.values:
+        logger.info(f"Run {thread_id} already finished, reusing its final state")
+        return snapshot.values
+
+    logger.info(f"Starting run {thread_id}")
+    return graph.invoke(initial_state, config)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from utils.sqlite_store import SQLiteStore, env_flag, shared_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "./llm_cache/responses.sqlite"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _message_role(message: Any) -> str:
+    # utils.message dataclasses carry .role, langchain messages carry .type
+    return getattr(message, "role", None) or getattr(message, "type", "") or ""
+
+
+def _normalize_content(content: Any) -> str:
+    text = str(content).replace("\r\n", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def make_cache_key(messages: List[Any], model: str, temperature: float, max_tokens: int) -> str:
+    """Hash of the request parameters and the normalized conversation"""
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": [[_message_role(m), _normalize_content(m.content)] for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache(SQLiteStore):
+    """
+    Disk-backed exact-match cache of LLM responses.
+
+    Entries expire after ttl_seconds; past max_entries the least recently used
+    entries are evicted.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            input_tokens INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """,
+    )
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, int, int]]:
+        """Return (content, input_tokens, output_tokens) of a fresh entry, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, input_tokens, output_tokens, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or now - row[3] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0], row[1], row[2]
+
+    def put(self, key: str, content: str, input_tokens: int, output_tokens: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, content, input_tokens, output_tokens, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def log_stats(self, outcome: str) -> None:
+        stats = self.stats()
+        logger.info(
+            f"LLM cache {outcome} (hits={stats['hits']}, misses={stats['misses']}, "
+            f"hit rate {stats['hit_rate']:.1%})"
+        )
+
+
+def get_response_cache(path: str = DEFAULT_CACHE_PATH) -> ResponseCache:
+    """Process-wide cache instance for path"""
+    return shared_store(ResponseCache, path)
+
+
+def cache_disabled_by_env() -> bool:
+    """LLM_CACHE_DISABLED=1 turns the cache off for the whole process"""
+    return env_flag("LLM_CACHE_DISABLED")
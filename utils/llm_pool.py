@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+import httpx
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections per endpoint and default per-request timeout (seconds)
+DEFAULT_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+CONNECT_TIMEOUT = 10.0
+
+
+def make_http_client(pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> httpx.Client:
+    """httpx client whose connections are kept alive and reused across requests"""
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+    )
+
+
+class LLMClientPool:
+    """
+    Process-wide OpenAI-compatible clients, one per (base_url, api_key).
+
+    Each client owns a keep-alive connection pool, so only the first request to
+    an endpoint pays for TCP and TLS setup. OpenAI clients are thread-safe and
+    can be shared between agent nodes.
+    """
+
+    _clients: Dict[Tuple[str, str], OpenAI] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(
+        cls,
+        base_url: str,
+        api_key: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    ) -> OpenAI:
+        key = (base_url, api_key or "")
+        with cls._lock:
+            client = cls._clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=make_http_client(pool_size, timeout),
+                    # Retries and backoff are owned by utils.llm_scheduler
+                    max_retries=0,
+                )
+                cls._clients[key] = client
+                logger.info(f"Created pooled LLM client for {base_url} (pool size {pool_size}, timeout {timeout}s)")
+            return client
+
+
+class _StubCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = json.dumps({
+        "id": "stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }).encode("utf-8")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    # Per-call overhead of a fresh client per query versus the pooled client,
+    # measured against a local stub of the chat completions endpoint
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubCompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    messages = [{"role": "user", "content": "ping"}]
+    calls = 200
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        client = OpenAI(api_key="stub", base_url=base_url)
+        client.chat.completions.create(model="stub", messages=messages)
+    fresh = (time.perf_counter() - start) / calls
+
+    pooled_client = LLMClientPool.get(base_url, "stub")
+    start = time.perf_counter()
+    for _ in range(calls):
+        pooled_client.chat.completions.create(model="stub", messages=messages)
+    pooled = (time.perf_counter() - start) / calls
+
+    server.shutdown()
+    print(f"fresh client per call: {fresh * 1000:7.2f} ms")
+    print(f"pooled client:         {pooled * 1000:7.2f} ms")
+    print(f"overhead removed:      {(fresh - pooled) * 1000:7.2f} ms per call")
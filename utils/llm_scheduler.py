@@ -0,0 +1,221 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Provider quota, opt-in: 0 (the default) disables the corresponding bucket
+DEFAULT_RPM = float(os.getenv("LLM_RPM", "0"))
+DEFAULT_TPM = float(os.getenv("LLM_TPM", "0"))
+DEFAULT_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+# Seconds before a duplicate (hedged) request is sent; 0 disables hedging
+DEFAULT_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "APITimeoutError",
+    "APIConnectionError",
+    "RateLimitError",
+    "InternalServerError",
+    "TimeoutException",
+    "ConnectError",
+    "ReadTimeout",
+}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, connection drops and 5xx are worth retrying"""
+    status_code = getattr(error, "status_code", None)
+    if status_code in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES or isinstance(error, TimeoutError)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the provider through Retry-After / retry-after-ms, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # HTTP-date form is not worth parsing; fall back to our own backoff
+        return None
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until amount tokens are available; returns seconds waited"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+                self.updated_at = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate_per_second
+            time.sleep(delay)
+            waited += delay
+
+
+class LLMScheduler:
+    """
+    Shared front door for LLM requests.
+
+    Enforces RPM/TPM token buckets across every caller in the process, retries
+    retryable failures with jittered exponential backoff (honoring Retry-After)
+    and can hedge slow requests with a duplicate. Queue depth and wait times are
+    tracked so parallel nodes can see how much they are throttled.
+    """
+
+    def __init__(
+        self,
+        rpm: float = DEFAULT_RPM,
+        tpm: float = DEFAULT_TPM,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        hedge_after: float = DEFAULT_HEDGE_AFTER,
+    ):
+        self.request_bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.token_bucket = TokenBucket(tpm) if tpm > 0 else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge") if hedge_after > 0 else None
+
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _admit(self, estimated_tokens: int) -> None:
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            depth_on_arrival = self.queue_depth
+        try:
+            waited = 0.0
+            if self.request_bucket is not None:
+                waited += self.request_bucket.acquire(1)
+            if self.token_bucket is not None:
+                waited += self.token_bucket.acquire(estimated_tokens)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+                self.requests += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        if waited > 0:
+            logger.info(f"LLM request waited {waited:.2f}s for rate limit (queue depth {depth_on_arrival} on arrival)")
+
+    def _call(self, fn: Callable[[], Any], estimated_tokens: int) -> Any:
+        self._admit(estimated_tokens)
+        if self._hedge_pool is None:
+            return fn()
+
+        primary = self._hedge_pool.submit(fn)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        # Primary is slow: race it against a duplicate and keep the first success
+        self._admit(estimated_tokens)
+        with self._lock:
+            self.hedges += 1
+        logger.info(f"LLM request exceeded {self.hedge_after:.1f}s, sending hedged duplicate")
+        pending = {primary, self._hedge_pool.submit(fn)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def run(self, fn: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        """
+        Execute fn under the rate limits, retrying retryable failures
+
+        Args:
+            fn (Callable): Zero-argument function performing one LLM request
+            estimated_tokens (int): Tokens the request will count against TPM
+
+        Returns:
+            Any: Whatever fn returns
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._call(fn, estimated_tokens)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(backoff, retry_after_seconds(e) or 0.0)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                logger.warning(
+                    f"LLM request failed ({type(e).__name__}: {e}); "
+                    f"retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                time.sleep(delay)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_seconds": self.total_wait_seconds / self.requests if self.requests else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler, so all nodes share one provider quota"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
+
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    """Rough TPM reservation: ~4 characters per prompt token plus the output allowance"""
+    return len(text) // 4 + max_tokens
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.chat_test import DEFAULT_MODEL
+from utils.sqlite_store import SQLiteStore, env_flag, run_store_cli, shared_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMO_PATH = "./node_memo/memo.sqlite"
+
+
+def fingerprint(**inputs: Any) -> str:
+    """Stable hash of a node's inputs; values must be JSON-serializable"""
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def rag_node_fingerprint(rag_instance: Any, prompt: str, search_results: List[Dict[str, Any]],
+                         model: str = DEFAULT_MODEL, retrieval_queries: Optional[List[str]] = None) -> str:
+    """
+    Fingerprint of a node that answers prompt with RAG over a company's document
+
+    Covers the document text (which already includes indexed web results), the
+    search results themselves, the node prompt and its retrieval queries, the
+    RAG prompt templates and the model, so a change to any of them forces
+    recomputation.
+    """
+    return fingerprint(
+        document=rag_instance.text_fingerprint(),
+        search_results=search_results,
+        prompt=prompt,
+        retrieval_queries=retrieval_queries,
+        rag_prompts=rag_instance.prompts,
+        model=model,
+    )
+
+
+def memo_disabled_by_env() -> bool:
+    """NODE_MEMO_DISABLED=1 recomputes every node for the whole process"""
+    return env_flag("NODE_MEMO_DISABLED")
+
+
+class NodeMemo(SQLiteStore):
+    """
+    Cross-run store of node outputs keyed by (node, company, input fingerprint).
+
+    A company analyzed against several targets produces the same standalone
+    analysis every time; when the fingerprint of a node's inputs (document,
+    search results, prompts, model) matches a stored entry the node returns
+    that output without retrieval or an LLM call.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS node_outputs (
+            node TEXT NOT NULL,
+            company TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            output TEXT NOT NULL,
+            compute_seconds REAL NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (node, company, fingerprint)
+        )
+        """,
+    )
+
+    def __init__(self, path: str = DEFAULT_MEMO_PATH):
+        super().__init__(path)
+        # (node, company, hit, seconds) for the current run
+        self._events: List[Tuple[str, str, bool, float]] = []
+
+    def get(self, node: str, company: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (output, seconds it originally took) or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, compute_seconds FROM node_outputs WHERE node = ? AND company = ? AND fingerprint = ?",
+                (node, company, key),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, node: str, company: str, key: str, output: Any, compute_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO node_outputs VALUES (?, ?, ?, ?, ?, ?)",
+                (node, company, key, json.dumps(output), compute_seconds, time.time()),
+            )
+            self._conn.commit()
+
+    def cached_call(self, node: str, company: str, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Return the stored output for (node, company, key), or run compute and store it
+
+        Args:
+            node (str): Node name
+            company (str): Company the node analyzes
+            key (str): Input fingerprint
+            compute (Callable): Produces the output on a miss; must be JSON-serializable
+
+        Returns:
+            Any: Node output
+        """
+        if memo_disabled_by_env():
+            return compute()
+
+        cached = self.get(node, company, key)
+        if cached is not None:
+            output, seconds = cached
+            self._record(node, company, True, seconds)
+            logger.info(f"Node memo hit for {node} ({company}), skipped ~{seconds:.1f}s of work")
+            return output
+
+        start = time.perf_counter()
+        output = compute()
+        seconds = time.perf_counter() - start
+        self.put(node, company, key, output, seconds)
+        self._record(node, company, False, seconds)
+        return output
+
+    def _record(self, node: str, company: str, hit: bool, seconds: float) -> None:
+        with self._lock:
+            self._events.append((node, company, hit, seconds))
+
+    def start_run(self) -> None:
+        """Reset the per-run hit/miss log"""
+        with self._lock:
+            self._events = []
+
+    def run_report(self) -> str:
+        """Which nodes were served from the memo during the current run"""
+        with self._lock:
+            events = list(self._events)
+        if not events:
+            return "Node memo: no memoized nodes ran"
+
+        hits = [event for event in events if event[2]]
+        lines = [f"Node memo: {len(hits)}/{len(events)} nodes reused"]
+        for node, company, hit, seconds in events:
+            status = f"hit, saved ~{seconds:.1f}s" if hit else f"miss, computed in {seconds:.1f}s"
+            lines.append(f"  {node} [{company}]: {status}")
+        return "\n".join(lines)
+
+    def invalidate(self, node: Optional[str] = None, company: Optional[str] = None) -> int:
+        """Delete stored outputs, optionally limited to one node and/or company"""
+        conditions, params = [], []
+        if node:
+            conditions.append("node = ?")
+            params.append(node)
+        if company:
+            conditions.append("company = ?")
+            params.append(company)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            deleted = self._conn.execute(f"DELETE FROM node_outputs{where}", params).rowcount
+            self._conn.commit()
+        logger.info(f"Invalidated {deleted} memoized node outputs")
+        return deleted
+
+    def entries(self) -> List[Tuple[str, str, int, float]]:
+        """(node, company, entry count, latest created_at) per stored node"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT node, company, COUNT(*), MAX(created_at) FROM node_outputs GROUP BY node, company ORDER BY company, node"
+            ).fetchall()
+
+
+def get_node_memo(path: str = DEFAULT_MEMO_PATH) -> NodeMemo:
+    """Process-wide memo instance for path"""
+    return shared_store(NodeMemo, path)
+
+
+def _print_entries(memo: NodeMemo, args) -> None:
+    for node, company, count, created_at in memo.entries():
+        print(f"{company:<40} {node:<25} {count:>4} entries, latest {time.ctime(created_at)}")
+
+
+if __name__ == "__main__":
+    run_store_cli(
+        "Inspect or invalidate memoized node outputs",
+        DEFAULT_MEMO_PATH,
+        get_node_memo,
+        _print_entries,
+        filters={"node": "Only this node, e.g. DCF_modelling", "company": "Only this company"},
+    )
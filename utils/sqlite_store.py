@@ -0,0 +1,110 @@
+import argparse
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type, TypeVar
+
+StoreT = TypeVar("StoreT", bound="SQLiteStore")
+
+_instances: Dict[Tuple[type, str], Any] = {}
+_instances_lock = threading.Lock()
+
+
+def env_flag(name: str) -> bool:
+    """True when environment variable name is set to 1 / true / yes"""
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def connect(path: str, synchronous: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Open a SQLite database shared by threads, creating its directory
+
+    Args:
+        path (str): Database file
+        synchronous (str, optional): PRAGMA synchronous level, e.g. "NORMAL"; None keeps SQLite's default
+
+    Returns:
+        sqlite3.Connection: Connection in WAL mode, so readers do not block the writer
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
+
+
+class SQLiteStore:
+    """
+    Base of the on-disk caches and stores: one connection per database file,
+    used by every thread under self._lock.
+
+    Subclasses list their CREATE statements in SCHEMA, which run on open.
+    """
+
+    SCHEMA: Sequence[str] = ()
+    # PRAGMA synchronous level; None keeps SQLite's default (FULL)
+    SYNCHRONOUS: Optional[str] = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path, self.SYNCHRONOUS)
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+
+def shared_store(store_cls: Type[StoreT], path: str, *args: Any, **kwargs: Any) -> StoreT:
+    """
+    Process-wide store_cls instance for path, created on first use
+
+    Args:
+        store_cls (Type[SQLiteStore]): Store class
+        path (str): Database file
+        *args, **kwargs: Passed to store_cls when it is created
+
+    Returns:
+        SQLiteStore: The instance every caller in the process shares
+    """
+    key = (store_cls, path)
+    with _instances_lock:
+        store = _instances.get(key)
+        if store is None:
+            store = store_cls(path, *args, **kwargs)
+            _instances[key] = store
+        return store
+
+
+def run_store_cli(description: str, default_path: str, get_store: Callable[[str], Any],
+                  print_entries: Callable[[Any, argparse.Namespace], None],
+                  filters: Dict[str, str], list_filters: Sequence[str] = ()) -> None:
+    """
+    `list` / `invalidate` command line for a store's __main__ block
+
+    Args:
+        description (str): Parser description
+        default_path (str): Default --path
+        get_store (Callable): Opens the store at a path
+        print_entries (Callable): Prints the stored entries for `list`
+        filters (Dict[str, str]): invalidate keyword arguments and their help texts
+        list_filters (Sequence[str]): Filters `list` accepts as well
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--path", default=default_path)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="Show stored entries")
+    invalidate_parser = subparsers.add_parser("invalidate", help="Delete stored entries")
+    for name, help_text in filters.items():
+        invalidate_parser.add_argument(f"--{name}", default=None, help=help_text)
+        if name in list_filters:
+            list_parser.add_argument(f"--{name}", default=None, help=help_text)
+    args = parser.parse_args()
+
+    store = get_store(args.path)
+    if args.command == "list":
+        print_entries(store, args)
+    else:
+        print(f"Deleted {store.invalidate(**{name: getattr(args, name) for name in filters})} entries")